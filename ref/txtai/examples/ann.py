@@ -0,0 +1,105 @@
+"""
+Benchmarks NumPy/Torch ANN search. Compares blocked top n search against scoring and sorting the full index.
+
+Install txtai to run:
+    pip install txtai
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from txtai.ann import ANNFactory
+
+
+def fullsort(ann, queries, limit):
+    """
+    Searches by scoring every row of the index and running a full sort per query.
+
+    Args:
+        ann: ANN instance
+        queries: queries array
+        limit: maximum results
+
+    Returns:
+        list of (id, score) per query
+    """
+
+    # Score full index
+    scores = ann.dot(ann.tensor(queries), ann.backend.T)
+
+    # Get topn ids
+    ids = (-scores).argsort()[:, :limit]
+
+    return [list(zip(ids[x].tolist(), score[ids[x]].tolist())) for x, score in enumerate(scores)]
+
+
+def timer(method, ann, queries, limit, runs):
+    """
+    Runs a search method and returns the average elapsed time per query.
+
+    Args:
+        method: search method
+        ann: ANN instance
+        queries: queries array
+        limit: maximum results
+        runs: number of runs
+
+    Returns:
+        milliseconds per query
+    """
+
+    # Warm up
+    method(ann, queries, limit)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        method(ann, queries, limit)
+
+    return (time.perf_counter() - start) * 1000 / (runs * len(queries))
+
+
+def benchmarks(args):
+    """
+    Runs ANN search benchmarks.
+
+    Args:
+        args: command line arguments
+    """
+
+    # Generate normalized random data
+    generator = np.random.default_rng(0)
+    data = generator.standard_normal((args.rows, args.dimensions), dtype=np.float32)
+    data /= np.linalg.norm(data, axis=1)[:, np.newaxis]
+
+    queries = data[generator.choice(args.rows, args.queries, replace=False)]
+
+    for backend in args.backends.split(","):
+        ann = ANNFactory.create({"backend": backend, "dimensions": args.dimensions})
+        ann.index(data)
+
+        # Validate both methods return the same ids
+        blocked = [[uid for uid, _ in result] for result in ann.search(queries, args.topk)]
+        full = [[uid for uid, _ in result] for result in fullsort(ann, queries, args.topk)]
+        match = np.mean([len(set(x) & set(y)) / len(x) for x, y in zip(blocked, full)])
+
+        print(f"{backend} - {args.rows} rows x {args.dimensions} dims, {args.queries} queries, top {args.topk}, overlap {match:.4f}")
+        print(f"  full sort: {timer(fullsort, ann, queries, args.topk, args.runs):.3f} ms/query")
+        print(f"  blocked:   {timer(lambda x, y, z: x.search(y, z), ann, queries, args.topk, args.runs):.3f} ms/query")
+
+        ann.close()
+
+
+if __name__ == "__main__":
+    # Command line parser
+    parser = argparse.ArgumentParser(description="ANN search benchmarks")
+    parser.add_argument("-b", "--backends", help="comma separated list of backends", metavar="BACKENDS", default="numpy,torch")
+    parser.add_argument("-d", "--dimensions", help="vector dimensions", metavar="DIMENSIONS", type=int, default=384)
+    parser.add_argument("-n", "--rows", help="number of vectors", metavar="ROWS", type=int, default=1000000)
+    parser.add_argument("-q", "--queries", help="number of queries per batch", metavar="QUERIES", type=int, default=32)
+    parser.add_argument("-r", "--runs", help="number of timed runs", metavar="RUNS", type=int, default=3)
+    parser.add_argument("-t", "--topk", help="top k results", metavar="TOPK", type=int, default=10)
+
+    # Run benchmarks
+    benchmarks(parser.parse_args())
@@ -0,0 +1,67 @@
+"""
+Benchmarks bulk inserts into content databases. Reports the number of rows inserted per second for each backend.
+
+Install txtai to run:
+    pip install txtai[database] pyarrow
+"""
+
+import argparse
+import time
+
+from txtai.database import DatabaseFactory
+
+
+def documents(rows, size):
+    """
+    Generates test documents.
+
+    Args:
+        rows: number of documents
+        size: number of words per document
+
+    Returns:
+        list of (id, document, tags)
+    """
+
+    return [(uid, {"text": " ".join(f"word{(uid + x) % 1000}" for x in range(size)), "row": uid}, None) for uid in range(rows)]
+
+
+def benchmarks(args):
+    """
+    Runs database insert benchmarks.
+
+    Args:
+        args: command line arguments
+    """
+
+    data = documents(args.rows, args.words)
+
+    for backend in args.backends.split(","):
+        database = DatabaseFactory.create({"content": backend})
+
+        # Initial insert
+        start = time.perf_counter()
+        database.insert(data)
+        insert = args.rows / (time.perf_counter() - start)
+
+        # Replace all documents
+        start = time.perf_counter()
+        database.insert(data, args.rows)
+        upsert = args.rows / (time.perf_counter() - start)
+
+        print(f"{backend} - {args.rows} rows, {args.words} words per row")
+        print(f"  insert:  {insert:,.0f} rows/sec")
+        print(f"  replace: {upsert:,.0f} rows/sec")
+
+        database.close()
+
+
+if __name__ == "__main__":
+    # Command line parser
+    parser = argparse.ArgumentParser(description="Database insert benchmarks")
+    parser.add_argument("-b", "--backends", help="comma separated list of backends", metavar="BACKENDS", default="sqlite,duckdb")
+    parser.add_argument("-n", "--rows", help="number of rows", metavar="ROWS", type=int, default=100000)
+    parser.add_argument("-w", "--words", help="number of words per row", metavar="WORDS", type=int, default=25)
+
+    # Run benchmarks
+    benchmarks(parser.parse_args())
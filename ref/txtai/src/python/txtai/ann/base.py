@@ -5,6 +5,8 @@ ANN (Approximate Nearest Neighbor) module
 import datetime
 import platform
 
+import numpy as np
+
 from ..version import __version__
 
 
@@ -68,6 +70,12 @@ class ANN:
 
         raise NotImplementedError
 
+    def compact(self):
+        """
+        Reclaims space used by deleted elements. Element ids are preserved. This method does nothing for
+        backends that remove elements on delete.
+        """
+
     def search(self, queries, limit):
         """
         Searches ANN index for query. Returns topn results.
@@ -82,6 +90,38 @@ class ANN:
 
         raise NotImplementedError
 
+    def filtersearch(self, queries, limit, ids):
+        """
+        Searches ANN index for query, only returning results with ids in an allow list. This method runs standard searches
+        with an increasing number of candidates until enough results match the allow list. Backends with native filtering
+        support override this method.
+
+        Args:
+            queries: queries array
+            limit: maximum results
+            ids: list of allowed ids
+
+        Returns:
+            query results
+        """
+
+        allowed, count = set(np.asarray(ids).tolist()), self.count()
+
+        # Maximum number of results is bound by the allow list size
+        limit = min(limit, len(allowed))
+        results, pending, candidates = [[] for _ in range(len(queries))], list(range(len(queries))) if limit else [], limit
+
+        while pending:
+            # Increase number of candidates each pass
+            candidates = min(candidates * 10, count)
+            for x, result in zip(pending, self.search(queries[pending], candidates)):
+                results[x] = [(uid, score) for uid, score in result if uid in allowed][:limit]
+
+            # Rerun queries without enough results while there are more candidates to search
+            pending = [x for x in pending if len(results[x]) < limit] if candidates < count else []
+
+        return results
+
     def count(self):
         """
         Number of elements in the ANN index.
@@ -8,6 +8,7 @@ import numpy as np
 
 from faiss import index_factory, IO_FLAG_MMAP, METRIC_INNER_PRODUCT, read_index, write_index
 from faiss import index_binary_factory, read_index_binary, write_index_binary, IndexBinaryIDMap
+from faiss import IDSelectorBatch, SearchParameters, SearchParametersIVF, try_extract_index_ivf
 
 from .base import ANN
 
@@ -78,14 +79,41 @@ class Faiss(ANN):
         # Run the query
         scores, ids = self.backend.search(queries, limit)
 
-        # Map results to [(id, score)]
-        results = []
-        for x, score in enumerate(scores):
-            # Transform scores
-            score = [1.0 - (x / (self.config["dimensions"] * 8)) for x in score.tolist()] if self.qbits else score.tolist()
+        return self.results(scores, ids)
 
-            # Add results
-            results.append(list(zip(ids[x].tolist(), score)))
+    def filtersearch(self, queries, limit, ids):
+        # Binary indexes don't support search parameters
+        if self.qbits:
+            return super().filtersearch(queries, limit, ids)
+
+        # Restrict search to allowed ids. Maximum number of results is bound by the allow list size.
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        # pylint: disable=E1120
+        selector, limit = IDSelectorBatch(ids), min(limit, len(ids))
+        if not limit:
+            return [[] for _ in range(len(queries))]
+
+        # IVF indexes only search nprobe cells. Search more cells for queries without enough results.
+        ivf, nprobe = try_extract_index_ivf(self.backend), self.nprobe()
+        results, pending = [None] * len(queries), list(range(len(queries)))
+        while pending:
+            # Faiss wraps SWIG constructors to accept keyword arguments
+            # pylint: disable=E1123
+            params = SearchParametersIVF(sel=selector, nprobe=nprobe) if ivf else SearchParameters(sel=selector)
+
+            try:
+                # Run the query
+                scores, indices = self.backend.search(queries[pending], limit, params=params)
+            except RuntimeError:
+                # Index type requires index-specific search parameters
+                return super().filtersearch(queries, limit, ids)
+
+            # Filtered searches return -1 ids when there are less than limit matches
+            for x, result in zip(pending, self.results(scores, indices)):
+                results[x] = [(uid, score) for uid, score in result if uid >= 0]
+
+            pending = [x for x in pending if len(results[x]) < limit] if ivf and nprobe < ivf.nlist else []
+            nprobe = min(nprobe * 2, ivf.nlist) if ivf else nprobe
 
         return results
 
@@ -208,3 +236,25 @@ class Faiss(ANN):
 
         default = 6 if count <= 5000 else round(self.cells(count) / 16)
         return self.setting("nprobe", default)
+
+    def results(self, scores, ids):
+        """
+        Maps search results to a list of (id, score) per query.
+
+        Args:
+            scores: scores array
+            ids: ids array
+
+        Returns:
+            list of (id, score) per query
+        """
+
+        results = []
+        for x, score in enumerate(scores):
+            # Transform scores
+            score = [1.0 - (x / (self.config["dimensions"] * 8)) for x in score.tolist()] if self.qbits else score.tolist()
+
+            # Add results
+            results.append(list(zip(ids[x].tolist(), score)))
+
+        return results
@@ -30,7 +30,7 @@ class HNSW(ANN):
     def load(self, path):
         # Load index
         self.backend = Index(dim=self.config["dimensions"], space=self.config["metric"])
-        self.backend.load_index(path)
+        self.backend.load_index(path, allow_replace_deleted=bool(self.setting("replacedeleted")))
 
     def index(self, embeddings):
         # Inner product is equal to cosine similarity on normalized vectors
@@ -42,8 +42,7 @@ class HNSW(ANN):
         seed = self.setting("randomseed", 100)
 
         # Create index
-        self.backend = Index(dim=self.config["dimensions"], space=self.config["metric"])
-        self.backend.init_index(max_elements=embeddings.shape[0], ef_construction=efconstruction, M=m, random_seed=seed)
+        self.backend = self.create(embeddings.shape[0], efconstruction, m, seed)
 
         # Add items - position in embeddings is used as the id
         self.backend.add_items(embeddings, np.arange(embeddings.shape[0], dtype=np.int64))
@@ -56,14 +55,21 @@ class HNSW(ANN):
     def append(self, embeddings):
         new = embeddings.shape[0]
 
-        # Resize index
-        self.backend.resize_index(self.config["offset"] + new)
+        # Number of deleted slots reused by new elements
+        replace = min(new, self.config["deletes"]) if self.setting("replacedeleted") else 0
+
+        # Resize index, if necessary
+        size = self.backend.get_current_count() + new - replace
+        if size > self.backend.get_max_elements():
+            self.backend.resize_index(size)
 
         # Append new ids - position in embeddings + existing offset is used as the id
-        self.backend.add_items(embeddings, np.arange(self.config["offset"], self.config["offset"] + new, dtype=np.int64))
+        ids = np.arange(self.config["offset"], self.config["offset"] + new, dtype=np.int64)
+        self.backend.add_items(embeddings, ids, replace_deleted=replace > 0)
 
-        # Update id offset and index metadata
+        # Update id offset, delete counter and index metadata
         self.config["offset"] += new
+        self.config["deletes"] -= replace
         self.metadata()
 
     def delete(self, ids):
@@ -76,6 +82,36 @@ class HNSW(ANN):
                 # Ignore label not found error
                 continue
 
+        # Compact index once the ratio of deleted elements exceeds the threshold
+        if self.config["deletes"] and self.config["deletes"] / self.backend.get_current_count() > self.setting("compact", 0.5):
+            self.compact()
+
+    def compact(self):
+        # Get live ids and vectors, deleted elements raise a label not found error
+        ids, embeddings, labels = [], [], self.backend.get_ids_list()
+        for x in range(0, len(labels), 1024):
+            batch = labels[x : x + 1024]
+            try:
+                embeddings.extend(self.backend.get_items(batch))
+                ids.extend(batch)
+            except RuntimeError:
+                # Batch has deleted elements, fall back to single element lookups
+                for uid in batch:
+                    try:
+                        embeddings.append(self.backend.get_items([uid])[0])
+                        ids.append(uid)
+                    except RuntimeError:
+                        continue
+
+        # Rebuild index with live elements only, ids are preserved
+        backend = self.create(max(len(ids), 1), self.setting("efconstruction", 200), self.setting("m", 16), self.setting("randomseed", 100))
+        if ids:
+            backend.add_items(np.array(embeddings, dtype=np.float32), np.array(ids, dtype=np.int64))
+
+        # Replace index and reset delete counter
+        self.backend = backend
+        self.config["deletes"] = 0
+
     def search(self, queries, limit):
         # Set ef query param
         ef = self.setting("efsearch")
@@ -85,16 +121,28 @@ class HNSW(ANN):
         # Run the query
         ids, distances = self.backend.knn_query(queries, k=limit)
 
-        # Map results to [(id, score)]
-        results = []
-        for x, distance in enumerate(distances):
-            # Convert distances to similarity scores
-            scores = [1 - d for d in distance.tolist()]
+        return self.results(ids, distances)
 
-            # Build (id, score) tuples, convert np.int64 to python int
-            results.append(list(zip(ids[x].tolist(), scores)))
+    def filtersearch(self, queries, limit, ids):
+        # Set ef query param
+        ef = self.setting("efsearch")
+        if ef:
+            self.backend.set_ef(ef)
 
-        return results
+        # Maximum number of results is bound by the allow list size
+        allowed = set(np.asarray(ids).tolist())
+        limit = min(limit, len(allowed))
+        if not limit:
+            return [[] for _ in range(len(queries))]
+
+        try:
+            # Run the query, graph traversal skips elements not in the allow list
+            indices, distances = self.backend.knn_query(queries, k=limit, filter=allowed.__contains__)
+        except RuntimeError:
+            # Not enough allowed elements reached with the current ef setting
+            return super().filtersearch(queries, limit, ids)
+
+        return self.results(indices, distances)
 
     def count(self):
         return self.backend.get_current_count() - self.config["deletes"]
@@ -102,3 +150,46 @@ class HNSW(ANN):
     def save(self, path):
         # Write index
         self.backend.save_index(path)
+
+    def create(self, size, efconstruction, m, seed):
+        """
+        Creates a new hnswlib index.
+
+        Args:
+            size: maximum number of elements
+            efconstruction: ef_construction param
+            m: M param
+            seed: random seed
+
+        Returns:
+            hnswlib index
+        """
+
+        backend = Index(dim=self.config["dimensions"], space=self.config["metric"])
+        backend.init_index(
+            max_elements=size, ef_construction=efconstruction, M=m, random_seed=seed, allow_replace_deleted=bool(self.setting("replacedeleted"))
+        )
+
+        return backend
+
+    def results(self, ids, distances):
+        """
+        Maps search results to a list of (id, score) per query.
+
+        Args:
+            ids: ids array
+            distances: distances array
+
+        Returns:
+            list of (id, score) per query
+        """
+
+        results = []
+        for x, distance in enumerate(distances):
+            # Convert distances to similarity scores
+            scores = [1 - d for d in distance.tolist()]
+
+            # Build (id, score) tuples, convert np.int64 to python int
+            results.append(list(zip(ids[x].tolist(), scores)))
+
+        return results
@@ -2,15 +2,17 @@
 NumPy module
 """
 
+import io
+import json
+import os
 import pickle
 
 import numpy as np
 
-from ..version import __pickle__
-
 from .base import ANN
 
 
+# pylint: disable=R0904
 class NumPy(ANN):
     """
     Builds an ANN index backed by a NumPy array.
@@ -21,23 +23,54 @@ class NumPy(ANN):
 
         # Array function definitions
         self.all, self.cat, self.dot, self.zeros = np.all, np.concatenate, np.dot, np.zeros
-        self.argsort, self.xor = np.argsort, np.bitwise_xor
+        self.xor = np.bitwise_xor
 
         # Scalar quantization
         quantize = self.config.get("quantize")
         self.qbits = quantize if quantize and isinstance(quantize, int) and not isinstance(quantize, bool) else None
 
+        # Array row to id mapping, only set after the index is compacted
+        self.ids = None
+
+        # Segments written by the last load or save and rows deleted since those segments were written
+        self.segments, self.tombstones = None, set()
+
     def load(self, path):
-        # Load array from file
-        with open(path, "rb") as handle:
-            self.backend = self.tensor(pickle.load(handle))
+        # Memory map array when enabled, copy-on-write mode shares pages across processes until rows are modified
+        mmap = "c" if self.setting("mmap") else None
+
+        # Load array from file, legacy indexes are stored as pickled arrays
+        backend = np.load(path, mmap_mode=mmap) if NumPy.isnumpy(path) else NumPy.unpickle(path)
+
+        # Only keep rows listed in the segments manifest, rows past the manifest are from an interrupted save
+        segments = NumPy.manifest(path)
+        if segments:
+            backend = backend[: sum(segments)]
+
+        # Clear rows deleted after their segment was written
+        self.tombstones = set(np.load(f"{path}.deletes").tolist()) if os.path.exists(f"{path}.deletes") else set()
+        if self.tombstones:
+            backend[sorted(self.tombstones)] = 0
+
+        # Legacy pickled indexes are a single segment
+        self.backend = self.tensor(backend)
+        self.segments = (os.path.abspath(path), segments if segments else [backend.shape[0]])
+
+        # Load row to id mapping, if the index has been compacted
+        self.ids = np.load(f"{path}.ids", mmap_mode=mmap) if os.path.exists(f"{path}.ids") else None
+
+        # Count deleted rows for indexes saved without a delete counter
+        if "deletes" not in self.config:
+            self.config["deletes"] = int(self.backend.shape[0] - self.live().sum())
 
     def index(self, embeddings):
         # Create index
-        self.backend = self.tensor(embeddings)
+        self.backend, self.ids = self.tensor(embeddings), None
+        self.segments, self.tombstones = None, set()
 
-        # Add id offset and index build metadata
+        # Add id offset, delete counter and index build metadata
         self.config["offset"] = embeddings.shape[0]
+        self.config["deletes"] = 0
         self.metadata(self.settings())
 
     def append(self, embeddings):
@@ -46,44 +79,294 @@ class NumPy(ANN):
         # Append new data to array
         self.backend = self.cat((self.backend, self.tensor(embeddings)), axis=0)
 
+        # Append new ids to row mapping
+        if self.ids is not None:
+            self.ids = np.concatenate((self.ids, np.arange(self.config["offset"], self.config["offset"] + new, dtype=np.int64)))
+
         # Update id offset and index metadata
         self.config["offset"] += new
         self.metadata()
 
     def delete(self, ids):
-        # Filter any index greater than size of array
-        ids = [x for x in ids if x < self.backend.shape[0]]
+        # Get array rows for ids, ignores ids not in the index
+        rows = self.rows(ids)
+
+        # Skip rows that are already deleted
+        if len(rows):
+            rows = rows[self.numpy(~self.all(self.backend[rows] == 0, axis=1))]
+
+        if len(rows):
+            # Clear specified rows, cleared rows are tombstones until the index is compacted
+            self.backend[rows] = self.tensor(self.zeros((len(rows), self.backend.shape[1])))
+            self.config["deletes"] += len(rows)
+
+            # Track deleted rows in saved segments
+            if self.segments:
+                self.tombstones.update(rows[rows < sum(self.segments[1])].tolist())
+
+            # Compact index once the ratio of deleted rows exceeds the threshold
+            if self.config["deletes"] / self.backend.shape[0] > self.setting("compact", 0.5):
+                self.compact()
 
-        # Clear specified ids
-        self.backend[ids] = self.tensor(self.zeros((len(ids), self.backend.shape[1])))
+    def compact(self):
+        # Select live rows
+        live = self.live()
+
+        # Remove deleted rows and keep a mapping from array row to id
+        self.ids = (self.ids if self.ids is not None else np.arange(self.backend.shape[0], dtype=np.int64))[live]
+        self.backend = self.backend[self.tensor(live)]
+
+        # Reset delete counter, rows have moved so the next save rewrites the index
+        self.config["deletes"] = 0
+        self.segments, self.tombstones = None, set()
 
     def search(self, queries, limit):
-        if self.qbits:
-            # Calculate hamming score for integer vectors
-            scores = self.hammingscore(queries)
-        else:
-            # Dot product on normalized vectors is equal to cosine similarity
-            scores = self.dot(self.tensor(queries), self.backend.T)
+        return self.scan(queries, limit)
 
-        # Get topn ids
-        ids = self.argsort(-scores)[:, :limit]
+    def filtersearch(self, queries, limit, ids):
+        # Only score array rows for allowed ids
+        return self.scan(queries, limit, self.rows(ids))
+
+    def scan(self, queries, limit, rows=None):
+        """
+        Scores queries against the index in blocks and keeps a running top n per query.
+
+        Args:
+            queries: queries array
+            limit: maximum results
+            rows: optional array of rows to score, all rows are scored when not set
+
+        Returns:
+            list of (id, score) per query
+        """
+
+        # Convert queries to backend array
+        queries = self.tensor(queries)
+
+        # Number of rows to score per block, bounds memory used by the scores matrix regardless of batch size
+        # Hamming scores expand each row to one element per byte
+        width = self.backend.shape[1] if self.qbits else 1
+        block = max(1, self.setting("blocksize", 1 << 24) // (len(queries) * width))
+
+        # Score index in blocks and keep a running top n per query
+        topscores, topids = None, None
+        for start in range(0, self.backend.shape[0] if rows is None else len(rows), block):
+            # Score block
+            array = self.backend[start : start + block] if rows is None else self.backend[self.tensor(rows[start : start + block])]
+            scores = self.score(queries, array)
+
+            # Get topn ids for block
+            scores, ids = self.topk(scores, limit)
+            ids += start
+
+            # Merge with running topn
+            if topscores is not None:
+                scores, ids = self.topk(self.cat((topscores, scores), axis=1), limit, self.cat((topids, ids), axis=1))
+
+            topscores, topids = scores, ids
+
+        # Empty index
+        if topscores is None:
+            return [[] for _ in range(len(queries))]
+
+        # Map block positions to array rows and array rows to ids
+        topids = self.numpy(topids)
+        topids = rows[topids] if rows is not None else topids
+        topids = self.ids[topids] if self.ids is not None else topids
 
         # Map results to [(id, score)]
         results = []
-        for x, score in enumerate(scores):
-            # Add results
-            results.append(list(zip(ids[x].tolist(), score[ids[x]].tolist())))
+        for x, score in zip(topids.tolist(), topscores.tolist()):
+            results.append(list(zip(x, score)))
 
         return results
 
     def count(self):
-        # Get count of non-zero rows (ignores deleted rows)
-        return self.backend[~self.all(self.backend == 0, axis=1)].shape[0]
+        # Number of rows less deleted rows
+        return self.backend.shape[0] - self.config["deletes"]
 
     def save(self, path):
-        # Save array to file
-        with open(path, "wb") as handle:
-            pickle.dump(self.backend, handle, protocol=__pickle__)
+        # Segments currently at path
+        segments = NumPy.manifest(path)
+
+        # Rows already written to path, only set when the segments at path are unchanged since the last load or save
+        size = sum(segments) if segments and self.segments == (os.path.abspath(path), segments) else None
+
+        # Append rows added since the last load or save to the array file in place as a new segment
+        # Otherwise, write all rows as a single segment
+        if size is None or not self.extend(path, size):
+            # Save array to file
+            NumPy.write(path, self.numpy(self.backend))
+            segments, self.tombstones = [self.backend.shape[0]], set()
+        elif size < self.backend.shape[0]:
+            segments = segments + [self.backend.shape[0] - size]
+
+        # Write segments manifest and deleted rows
+        self.savesegments(path, segments)
+        self.segments = (os.path.abspath(path), segments)
+
+        # Save row to id mapping, if the index has been compacted
+        if self.ids is not None:
+            NumPy.write(f"{path}.ids", self.ids)
+        elif os.path.exists(f"{path}.ids"):
+            os.remove(f"{path}.ids")
+
+    def extend(self, path, size):
+        """
+        Appends rows added since the last load or save to the array file at path in place. New rows are written after the
+        first size rows, then the array header is updated with the new row count. The array header is padded by NumPy, so
+        the row count grows without moving the rows. Existing memory mapped views of path stay valid.
+
+        Args:
+            path: path to ann index
+            size: number of rows already written to path
+
+        Returns:
+            True if path holds all rows, False if the array file must be rewritten
+        """
+
+        # No new rows
+        if size == self.backend.shape[0]:
+            return True
+
+        rows = np.ascontiguousarray(self.numpy(self.backend[size:]))
+        with open(path, "r+b") as handle:
+            # Read array header
+            version = np.lib.format.read_magic(handle)
+            if version != (1, 0):
+                return False
+
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(handle)
+            offset = handle.tell()
+
+            # Build array header with the new row count
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(
+                header, {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran, "shape": (size + rows.shape[0],) + shape[1:]}
+            )
+
+            # Rows can only be appended when the array layout is unchanged and the header keeps its length
+            if fortran or dtype != rows.dtype or shape[1:] != rows.shape[1:] or shape[0] < size or len(header.getvalue()) != offset:
+                return False
+
+            # Write new rows before the header, an interrupted save leaves the previous rows readable
+            handle.seek(offset + size * rows[0].nbytes)
+            handle.write(rows.data)
+            handle.flush()
+
+            handle.seek(0)
+            handle.write(header.getvalue())
+
+        return True
+
+    def savesegments(self, path, segments):
+        """
+        Writes the segments manifest and deleted rows for path.
+
+        Args:
+            path: path to ann index
+            segments: list of row counts per segment
+        """
+
+        # Manifest is only needed when rows were appended to the array file by incremental saves
+        if len(segments) > 1:
+            with open(f"{path}.segments.tmp", "w", encoding="utf-8") as handle:
+                json.dump({"segments": segments}, handle)
+
+            os.replace(f"{path}.segments.tmp", f"{path}.segments")
+        elif os.path.exists(f"{path}.segments"):
+            os.remove(f"{path}.segments")
+
+        # Rows deleted after their segment was written
+        if self.tombstones:
+            NumPy.write(f"{path}.deletes", np.array(sorted(self.tombstones), dtype=np.int64))
+        elif os.path.exists(f"{path}.deletes"):
+            os.remove(f"{path}.deletes")
+
+    @staticmethod
+    def manifest(path):
+        """
+        Reads the list of row counts per segment for the index at path.
+
+        Args:
+            path: path to ann index
+
+        Returns:
+            list of row counts per segment, None if path doesn't exist or isn't a native .npy file
+        """
+
+        if os.path.exists(f"{path}.segments"):
+            with open(f"{path}.segments", "r", encoding="utf-8") as handle:
+                return json.load(handle)["segments"]
+
+        return [np.load(path, mmap_mode="r").shape[0]] if os.path.exists(path) and NumPy.isnumpy(path) else None
+
+    @staticmethod
+    def convert(path):
+        """
+        Converts a legacy pickled array file at path to the native .npy format. The file is converted in place.
+
+        Args:
+            path: path to ann index
+
+        Returns:
+            True if the file was converted, False if it was already in the native format
+        """
+
+        if NumPy.isnumpy(path):
+            return False
+
+        # Load pickled array and write as native array
+        array = NumPy.unpickle(path)
+        NumPy.write(path, np.asarray(array.cpu()) if hasattr(array, "cpu") else array)
+
+        return True
+
+    @staticmethod
+    def isnumpy(path):
+        """
+        Checks if path is a native .npy file.
+
+        Args:
+            path: path to check
+
+        Returns:
+            True if path is a .npy file, False otherwise
+        """
+
+        with open(path, "rb") as handle:
+            return handle.read(len(np.lib.format.MAGIC_PREFIX)) == np.lib.format.MAGIC_PREFIX
+
+    @staticmethod
+    def unpickle(path):
+        """
+        Loads a legacy pickled array.
+
+        Args:
+            path: path to pickle file
+
+        Returns:
+            array
+        """
+
+        with open(path, "rb") as handle:
+            return pickle.load(handle)
+
+    @staticmethod
+    def write(path, array):
+        """
+        Writes array to path as a .npy file. Data is written to a temporary file and then moved into place.
+        This keeps existing memory mapped views of path valid.
+
+        Args:
+            path: output path
+            array: array to write
+        """
+
+        with open(f"{path}.tmp", "wb") as handle:
+            np.save(handle, array, allow_pickle=False)
+
+        os.replace(f"{path}.tmp", path)
 
     def tensor(self, array):
         """
@@ -112,6 +395,102 @@ class NumPy(ANN):
 
         return np.int64(array) if dtype == np.int64 else array
 
+    def numpy(self, array):
+        """
+        Converts a backend array to a NumPy array.
+
+        Args:
+            array: backend array
+
+        Returns:
+            NumPy array
+        """
+
+        return array
+
+    def rows(self, ids):
+        """
+        Maps ids to array rows.
+
+        Args:
+            ids: list of ids
+
+        Returns:
+            array of rows, ids not in the index are omitted
+        """
+
+        ids = np.unique(np.array(ids, dtype=np.int64))
+
+        # Rows are ids until the index is compacted
+        if self.ids is None:
+            return ids[(ids >= 0) & (ids < self.backend.shape[0])]
+
+        # Row mapping is sorted by id, binary search for each id
+        rows = np.searchsorted(self.ids, ids)
+        ids, rows = ids[rows < len(self.ids)], rows[rows < len(self.ids)]
+
+        return rows[self.ids[rows] == ids]
+
+    def live(self):
+        """
+        Builds a mask of rows that haven't been deleted. Deleted rows are all zeros.
+
+        Returns:
+            boolean NumPy array
+        """
+
+        # Scan in blocks to limit memory used by comparison arrays
+        rows = max(1, self.setting("blocksize", 1 << 24) // self.backend.shape[1])
+        blocks = [self.numpy(~self.all(self.backend[x : x + rows] == 0, axis=1)) for x in range(0, self.backend.shape[0], rows)]
+
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=bool)
+
+    def score(self, queries, array):
+        """
+        Scores queries against a block of the index.
+
+        Args:
+            queries: queries array
+            array: block of index rows
+
+        Returns:
+            scores
+        """
+
+        # Calculate hamming score for integer vectors
+        if self.qbits:
+            return self.hammingscore(queries, array)
+
+        # Dot product on normalized vectors is equal to cosine similarity
+        return self.dot(queries, array.T)
+
+    def topk(self, scores, limit, ids=None):
+        """
+        Selects the top n scores per row using a partial sort. Results are sorted by score descending.
+
+        Args:
+            scores: scores matrix
+            limit: maximum results
+            ids: optional ids matrix aligned with scores, defaults to column positions
+
+        Returns:
+            (scores, ids)
+        """
+
+        # Partition the topn scores to the front of each row, only needed when the row has more than limit columns
+        limit = min(limit, scores.shape[1])
+        if limit < scores.shape[1]:
+            indices = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        else:
+            indices = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+
+        # Sort topn scores
+        topn = np.take_along_axis(scores, indices, axis=1)
+        order = np.argsort(-topn, axis=1, kind="stable")
+        indices = np.take_along_axis(indices, order, axis=1)
+
+        return np.take_along_axis(topn, order, axis=1), np.take_along_axis(ids, indices, axis=1) if ids is not None else indices
+
     def settings(self):
         """
         Returns settings for this array.
@@ -122,7 +501,7 @@ class NumPy(ANN):
 
         return {"numpy": np.__version__}
 
-    def hammingscore(self, queries):
+    def hammingscore(self, queries, array):
         """
         Calculates a hamming distance score.
 
@@ -132,6 +511,7 @@ class NumPy(ANN):
 
         Args:
             queries: queries array
+            array: block of index rows
 
         Returns:
             scores
@@ -142,7 +522,7 @@ class NumPy(ANN):
         table = self.tensor(np.array([np.count_nonzero(x & table) for x in np.arange(256)]))
 
         # Number of different bits
-        delta = self.xor(self.tensor(queries[:, None]), self.backend)
+        delta = self.xor(queries[:, None], array)
 
         # Cast to long array
         delta = self.totype(delta, np.int64)
@@ -5,8 +5,6 @@ PyTorch module
 import numpy as np
 import torch
 
-from ..version import __pickle__
-
 from .numpy import NumPy
 
 
@@ -20,7 +18,7 @@ class Torch(NumPy):
 
         # Define array functions
         self.all, self.cat, self.dot, self.zeros = torch.all, torch.cat, torch.mm, torch.zeros
-        self.argsort, self.xor = torch.argsort, torch.bitwise_xor
+        self.xor = torch.bitwise_xor
 
     def tensor(self, array):
         # Convert array to Tensor
@@ -30,8 +28,17 @@ class Torch(NumPy):
         # Load to GPU device, if available
         return array.cuda() if torch.cuda.is_available() else array
 
+    def topk(self, scores, limit, ids=None):
+        # Get topn scores and positions, results are sorted by score descending
+        scores, indices = torch.topk(scores, min(limit, scores.shape[1]), dim=1)
+
+        return scores, torch.gather(ids, 1, indices) if ids is not None else indices
+
     def totype(self, array, dtype):
         return array.long() if dtype == np.int64 else array
 
+    def numpy(self, array):
+        return array.cpu().numpy()
+
     def settings(self):
         return {"torch": torch.__version__}
@@ -11,6 +11,7 @@ try:
     from .extension import Extension
     from .factory import APIFactory
     from .responses import *
+    from .ring import Ring
     from .routers import *
     from .route import EncodingAPIRoute
 except ImportError as missing:
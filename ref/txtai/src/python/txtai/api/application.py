@@ -114,13 +114,17 @@ def lifespan(application):
 
     yield
 
+    # Close embeddings cluster connections on shutdown
+    if INSTANCE.cluster:
+        INSTANCE.cluster.close()
+
 
 def start():
     """
-    Runs application lifespan handler.
+    Runs application lifespan handler startup events.
     """
 
-    list(lifespan(app))
+    next(lifespan(app))
 
 
 # FastAPI instance txtai API instances
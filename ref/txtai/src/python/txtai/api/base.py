@@ -4,6 +4,8 @@ API module
 
 import json
 
+from fastapi.concurrency import run_in_threadpool
+
 from .cluster import Cluster
 
 from ..app import Application
@@ -25,28 +27,66 @@ class API(Application):
             self.cluster = Cluster(self.config["cluster"])
 
     # pylint: disable=W0221
-    def search(self, query, limit=None, weights=None, index=None, parameters=None, graph=False, request=None):
-        # When search is invoked via the API, limit is set from the request
-        # When search is invoked directly, limit is set using the method parameter
-        limit = self.limit(request.query_params.get("limit") if request and hasattr(request, "query_params") else limit)
-        weights = self.weights(request.query_params.get("weights") if request and hasattr(request, "query_params") else weights)
-        index = request.query_params.get("index") if request and hasattr(request, "query_params") else index
-        parameters = request.query_params.get("parameters") if request and hasattr(request, "query_params") else parameters
-        graph = request.query_params.get("graph") if request and hasattr(request, "query_params") else graph
+    def search(self, query, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False, request=None):
+        limit, weights, index, parameters, graph, columnar = self.searchparams(request, limit, weights, index, parameters, graph, columnar)
 
-        # Decode parameters
-        parameters = json.loads(parameters) if parameters and isinstance(parameters, str) else parameters
+        if self.cluster:
+            return self.cluster.search(query, limit, weights, index, parameters, graph, columnar)
+
+        return super().search(query, limit, weights, index, parameters, graph, columnar)
+
+    async def asearch(self, query, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False, request=None):
+        """
+        Async version of search. Cluster searches are awaited on the calling event loop, all other searches
+        run in a worker thread.
+
+        Args:
+            query: input query
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: dict of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} if True
+            request: FastAPI request, overrides method parameters when set
 
+        Returns:
+            list of {id: value, score: value} for index search, list of dict for an index + database search
+        """
+
+        if self.cluster:
+            return await self.cluster.asearch(query, *self.searchparams(request, limit, weights, index, parameters, graph, columnar))
+
+        return await run_in_threadpool(self.search, query, limit, weights, index, parameters, graph, columnar, request)
+
+    def batchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
         if self.cluster:
-            return self.cluster.search(query, limit, weights, index, parameters, graph)
+            return self.cluster.batchsearch(queries, self.limit(limit), weights, index, parameters, graph, columnar)
+
+        return super().batchsearch(queries, limit, weights, index, parameters, graph, columnar)
+
+    async def abatchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
+        """
+        Async version of batchsearch. Cluster searches are awaited on the calling event loop, all other searches
+        run in a worker thread.
+
+        Args:
+            queries: input queries
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: list of dicts of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} per query if True
 
-        return super().search(query, limit, weights, index, parameters, graph)
+        Returns:
+            list of {id: value, score: value} per query for index search, list of dict per query for an index + database search
+        """
 
-    def batchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False):
         if self.cluster:
-            return self.cluster.batchsearch(queries, self.limit(limit), weights, index, parameters, graph)
+            return await self.cluster.abatchsearch(queries, self.limit(limit), weights, index, parameters, graph, columnar)
 
-        return super().batchsearch(queries, limit, weights, index, parameters, graph)
+        return await run_in_threadpool(self.batchsearch, queries, limit, weights, index, parameters, graph, columnar)
 
     def add(self, documents):
         """
@@ -131,6 +171,36 @@ class API(Application):
 
         return super().count()
 
+    def searchparams(self, request, limit, weights, index, parameters, graph, columnar):
+        """
+        Parses search parameters. When search is invoked via the API, parameters are set from the request.
+        When search is invoked directly, parameters are set using the method arguments.
+
+        Args:
+            request: FastAPI request or None
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: dict of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} if True
+
+        Returns:
+            (limit, weights, index, parameters, graph, columnar)
+        """
+
+        # Read parameters from the request, if available
+        if request and hasattr(request, "query_params"):
+            limit, weights, index, parameters, graph, columnar = (
+                request.query_params.get(name) for name in ("limit", "weights", "index", "parameters", "graph", "columnar")
+            )
+
+        # Decode parameters
+        parameters = json.loads(parameters) if parameters and isinstance(parameters, str) else parameters
+        columnar = columnar.lower() == "true" if isinstance(columnar, str) else columnar
+
+        return self.limit(limit), self.weights(weights), index, parameters, graph, columnar
+
     def limit(self, limit):
         """
         Parses the number of results to return from the request. Allows range of 1-250, with a default of 10.
@@ -3,21 +3,33 @@ Cluster module
 """
 
 import asyncio
+import bisect
+import contextvars
 import json
-import random
+import threading
+import time
 import urllib.parse
-import zlib
+import uuid
 
 import aiohttp
 
 from ..database.sql import Aggregate
 
+from .ring import Ring
 
+
+# pylint: disable=R0904
 class Cluster:
     """
     Aggregates multiple embeddings shards into a single logical embeddings instance.
     """
 
+    # Shard latency histogram bucket upper bounds in milliseconds
+    BUCKETS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    # Minimum number of latency samples required before hedging requests by latency percentile
+    SAMPLES = 20
+
     # pylint: disable = W0231
     def __init__(self, config=None):
         """
@@ -35,10 +47,28 @@ class Cluster:
         if "shards" in self.config:
             self.shards = self.config["shards"]
 
+        # Consistent hash ring used to assign documents to shards
+        self.ring = Ring(self.shards, self.config.get("vnodes", 100)) if self.shards else None
+
         # Query aggregator
         self.aggregate = Aggregate()
 
-    def search(self, query, limit=None, weights=None, index=None, parameters=None, graph=False):
+        # Background event loop and persistent HTTP session, created on first request
+        self.loop, self.thread, self.session = None, None, None
+        self.lock = threading.Lock()
+
+        # Search settings - per shard deadline in seconds, replica urls per shard and hedged request latency percentile
+        self.timeout = self.config.get("timeout")
+        self.replicas = self.config.get("replicas", {})
+        self.hedge = self.config.get("hedge")
+
+        # Latency histograms and request counters per shard url
+        self.latency = {}
+
+        # Tracks if the last search in the current context is missing results from one or more shards
+        self.partial = contextvars.ContextVar("partial", default=False)
+
+    def search(self, query, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
         """
         Finds documents most similar to the input query. This method will run either an index search
         or an index + database search depending on if a database is available.
@@ -50,13 +80,56 @@ class Cluster:
             index: index name, if applicable
             parameters: dict of named parameters to bind to placeholders
             graph: return graph results if True
+            columnar: return results as {column: [values]} if True
+
+        Returns:
+            list of {id: value, score: value} for index search, list of dict for an index + database search
+        """
+
+        # Run query, then merge, sort and limit shard results
+        results = self.execute("get", self.searchaction(query, limit, weights, index, parameters, graph, columnar), partial=True)
+        return self.aggregate.merge(query, self.available(results), limit if limit else 10, columnar)
+
+    async def asearch(self, query, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
+        """
+        Async version of search. See search for details on arguments and results.
+
+        Args:
+            query: input query
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: dict of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} if True
 
         Returns:
             list of {id: value, score: value} for index search, list of dict for an index + database search
         """
 
+        # Run query, then merge, sort and limit shard results
+        results = await self.aexecute("get", self.searchaction(query, limit, weights, index, parameters, graph, columnar), partial=True)
+        return self.aggregate.merge(query, self.available(results), limit if limit else 10, columnar)
+
+    def searchaction(self, query, limit, weights, index, parameters, graph, columnar):
+        """
+        Builds a search URL action. Shards run a partial query that is merged into the final results.
+
+        Args:
+            query: input query
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: dict of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} if True
+
+        Returns:
+            url action
+        """
+
         # Build URL
-        action = f"search?query={urllib.parse.quote_plus(query)}"
+        action = f"search?query={urllib.parse.quote_plus(self.aggregate.partial(query, limit))}"
         if limit:
             action += f"&limit={limit}"
         if weights:
@@ -67,19 +140,12 @@ class Cluster:
             action += f"&parameters={json.dumps(parameters) if isinstance(parameters, dict) else parameters}"
         if graph is not None:
             action += f"&graph={graph}"
+        if columnar:
+            action += "&columnar=True"
 
-        # Run query and flatten results into single results list
-        results = []
-        for result in self.execute("get", action):
-            results.extend(result)
-
-        # Combine aggregate functions and sort
-        results = self.aggregate(query, results)
-
-        # Limit results
-        return results[: (limit if limit else 10)]
+        return action
 
-    def batchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False):
+    def batchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
         """
         Finds documents most similar to the input queries. This method will run either an index search
         or an index + database search depending on if a database is available.
@@ -91,13 +157,62 @@ class Cluster:
             index: index name, if applicable
             parameters: list of dicts of named parameters to bind to placeholders
             graph: return graph results if True
+            columnar: return results as {column: [values]} per query if True
+
+        Returns:
+            list of {id: value, score: value} per query for index search, list of dict per query for an index + database search
+        """
+
+        # Run query
+        params = self.batchparams(queries, limit, weights, index, parameters, graph, columnar)
+        batch = self.available(self.execute("post", "batchsearch", [params] * len(self.shards), partial=True))
+
+        # Merge, sort and limit results per query
+        return [self.aggregate.merge(query, [section[x] for section in batch], limit if limit else 10, columnar) for x, query in enumerate(queries)]
+
+    async def abatchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
+        """
+        Async version of batchsearch. See batchsearch for details on arguments and results.
+
+        Args:
+            queries: input queries
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: list of dicts of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} per query if True
 
         Returns:
             list of {id: value, score: value} per query for index search, list of dict per query for an index + database search
         """
 
+        # Run query
+        params = self.batchparams(queries, limit, weights, index, parameters, graph, columnar)
+        batch = self.available(await self.aexecute("post", "batchsearch", [params] * len(self.shards), partial=True))
+
+        # Merge, sort and limit results per query
+        return [self.aggregate.merge(query, [section[x] for section in batch], limit if limit else 10, columnar) for x, query in enumerate(queries)]
+
+    def batchparams(self, queries, limit, weights, index, parameters, graph, columnar):
+        """
+        Builds batch search POST parameters. Shards run partial queries that are merged into the final results.
+
+        Args:
+            queries: input queries
+            limit: maximum results
+            weights: hybrid score weights, if applicable
+            index: index name, if applicable
+            parameters: list of dicts of named parameters to bind to placeholders
+            graph: return graph results if True
+            columnar: return results as {column: [values]} per query if True
+
+        Returns:
+            POST parameters
+        """
+
         # POST parameters
-        params = {"queries": queries}
+        params = {"queries": [self.aggregate.partial(query, limit) for query in queries]}
         if limit:
             params["limit"] = limit
         if weights:
@@ -108,21 +223,35 @@ class Cluster:
             params["parameters"] = parameters
         if graph is not None:
             params["graph"] = graph
+        if columnar:
+            params["columnar"] = columnar
 
-        # Run query
-        batch = self.execute("post", "batchsearch", [params] * len(self.shards))
+        return params
+
+    def degraded(self):
+        """
+        Checks if the last search run in the current context is missing results from one or more shards. Shards
+        that fail or miss the search deadline are skipped.
+
+        Returns:
+            True if the last search returned partial results
+        """
 
-        # Combine results per query
-        results = []
-        for x, query in enumerate(queries):
-            result = []
-            for section in batch:
-                result.extend(section[x])
+        return self.partial.get()
 
-            # Aggregate, sort and limit results
-            results.append(self.aggregate(query, result)[: (limit if limit else 10)])
+    def metrics(self):
+        """
+        Gets request metrics per shard url. Each shard has a latency histogram of successful responses with counts per
+        bucket upper bound in milliseconds, along with response, error, timeout and hedged request counts.
 
-        return results
+        Returns:
+            {shard url: metrics}
+        """
+
+        return {
+            url: {**metrics, "histogram": dict(zip([str(bound) for bound in Cluster.BUCKETS] + ["inf"], metrics["histogram"]))}
+            for url, metrics in list(self.latency.items())
+        }
 
     def add(self, documents):
         """
@@ -159,7 +288,7 @@ class Cluster:
             ids deleted
         """
 
-        return [uid for ids in self.execute("post", "delete", [ids] * len(self.shards)) for uid in ids]
+        return [uid for ids in self.execute("post", "delete", self.shard(ids)) for uid in ids]
 
     def reindex(self, config, function=None):
         """
@@ -184,84 +313,407 @@ class Cluster:
 
     def shard(self, documents):
         """
-        Splits documents into equal sized shards.
+        Splits documents into shards using the consistent hash ring. Documents without an id are assigned a
+        new uuid, so that all documents can be found by id.
 
         Args:
-            documents: input documents
+            documents: input documents or ids
 
         Returns:
-            list of evenly sized shards with the last shard having the remaining elements
+            list of documents per shard
         """
 
         shards = [[] for _ in range(len(self.shards))]
         for document in documents:
             uid = document.get("id") if isinstance(document, dict) else document
-            if uid and isinstance(uid, str):
-                # Quick int hash of string to help derive shard id
-                uid = zlib.adler32(uid.encode("utf-8"))
-            elif uid is None:
-                # Get random shard id when uid isn't set
-                uid = random.randint(0, len(shards) - 1)
+            if uid is None:
+                # Generate id for documents without one
+                uid = str(uuid.uuid4())
+                document = {**document, "id": uid}
 
-            shards[uid % len(self.shards)].append(document)
+            # pylint: disable=E1102
+            shards[self.ring(uid)].append(document)
 
         return shards
 
-    def execute(self, method, action, data=None):
+    def rebalance(self, sources=None, batch=1000):
+        """
+        Moves documents to the shards that own them on the hash ring. Run this method after shards are added to or
+        removed from the cluster configuration. Only documents stored on the wrong shard are moved.
+
+        Each shard is scanned in batches of ids. Documents stored on the wrong shard are exported, added to their
+        new shard and then deleted from the source shard. This method requires content storage to be enabled on
+        each shard.
+
+        Args:
+            sources: optional list of additional shard urls to move documents from, i.e. shards being removed
+            batch: number of documents to scan at a time
+
+        Returns:
+            number of documents moved
+        """
+
+        moved = 0
+        for source in self.shards + [shard for shard in sources or [] if shard not in self.shards]:
+            for indexids in self.misplaced(source, batch):
+                # Export documents and add to new shards
+                documents = self.export(source, indexids)
+                ids = [document["id"] for document in documents]
+                shards = self.shard(documents)
+                self.execute("post", "add", shards)
+                self.execute("get", "upsert", shards=[shard for x, shard in enumerate(self.shards) if shards[x]])
+
+                # Delete documents from source shard
+                self.execute("post", "delete", [ids], [source])
+                moved += len(documents)
+
+        return moved
+
+    def misplaced(self, source, batch):
+        """
+        Scans a shard for documents that are owned by a different shard.
+
+        Args:
+            source: shard url
+            batch: number of documents to scan at a time
+
+        Returns:
+            generator of indexid lists, one list per batch
+        """
+
+        last = -1
+        while True:
+            # Scan batch of ids ordered by indexid
+            query = f"select indexid, id from txtai where indexid > {last} order by indexid limit {batch}"
+            rows = self.execute("get", f"search?query={urllib.parse.quote_plus(query)}", shards=[source])[0]
+            if not rows:
+                break
+
+            # Find rows owned by other shards
+            # pylint: disable=E1102
+            indexids = [row["indexid"] for row in rows if self.shards[self.ring(row["id"])] != source]
+            if indexids:
+                yield indexids
+
+            last = rows[-1]["indexid"]
+
+    def export(self, source, indexids):
+        """
+        Exports documents from a shard.
+
+        Args:
+            source: shard url
+            indexids: list of indexids to export
+
+        Returns:
+            list of documents
+        """
+
+        # Select document content
+        query = f"select id, text, data, tags from txtai where indexid in ({', '.join(str(int(x)) for x in indexids)}) limit {len(indexids)}"
+        rows = self.execute("get", f"search?query={urllib.parse.quote_plus(query)}", shards=[source])[0]
+
+        # Rebuild documents, segmented documents are only exported once
+        documents = {}
+        for row in rows:
+            data = json.loads(row["data"]) if isinstance(row["data"], str) else row["data"]
+
+            # Use original document data if available, otherwise use section text. Data stored without an id keeps
+            # the source id, this prevents a new id from being generated when the document is moved.
+            document = data if data else {"id": row["id"], "text": row["text"]}
+            document.setdefault("id", row["id"])
+            if row["tags"] and "tags" not in document:
+                document["tags"] = row["tags"]
+
+            documents[row["id"]] = document
+
+        return list(documents.values())
+
+    def execute(self, method, action, data=None, shards=None, partial=False):
         """
-        Executes a HTTP action asynchronously.
+        Executes a HTTP action against all shards. Requests run on the background event loop, this method blocks
+        until all requests complete.
 
         Args:
             method: get or post
             action: url action to perform
             data: post parameters
+            shards: list of shard urls, defaults to all shards
+            partial: read-only request that allows partial results if True, see run
 
         Returns:
             json results if any
         """
 
-        # Get urls
-        urls = [f"{shard}/{action}" for shard in self.shards]
-        close = False
+        return self.submit(method, action, data, shards, partial).result()
 
-        # Use existing loop if available, otherwise create one
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            close = True
+    async def aexecute(self, method, action, data=None, shards=None, partial=False):
+        """
+        Executes a HTTP action against all shards. This method can be awaited from any event loop, requests run on the
+        background event loop.
 
-        try:
-            return loop.run_until_complete(self.run(urls, method, data))
-        finally:
-            # Close loop if it was created in this method
-            if close:
-                loop.close()
+        Args:
+            method: get or post
+            action: url action to perform
+            data: post parameters
+            shards: list of shard urls, defaults to all shards
+            partial: read-only request that allows partial results if True, see run
+
+        Returns:
+            json results if any
+        """
+
+        return await asyncio.wrap_future(self.submit(method, action, data, shards, partial))
+
+    def submit(self, method, action, data, shards, partial):
+        """
+        Submits a HTTP action to the background event loop.
+
+        Args:
+            method: get or post
+            action: url action to perform
+            data: post parameters
+            shards: list of shard urls, defaults to all shards
+            partial: read-only request that allows partial results if True, see run
+
+        Returns:
+            concurrent.futures.Future
+        """
+
+        return asyncio.run_coroutine_threadsafe(self.run(shards if shards else self.shards, action, method, data, partial), self.start())
+
+    def start(self):
+        """
+        Starts the background event loop, if necessary. The event loop runs in a daemon thread and is shared by all requests.
 
-    async def run(self, urls, method, data):
+        Returns:
+            event loop
+        """
+
+        with self.lock:
+            if not self.loop:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.loop.run_forever, name="cluster", daemon=True)
+                self.thread.start()
+
+        return self.loop
+
+    def close(self):
+        """
+        Closes the HTTP session and stops the background event loop.
+        """
+
+        with self.lock:
+            if self.loop:
+                # Close session on the event loop that created it
+                if self.session:
+                    asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+
+                # Stop and close event loop
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.thread.join()
+                self.loop.close()
+
+                self.loop, self.thread, self.session = None, None, None
+
+    async def connect(self):
+        """
+        Gets the persistent HTTP session, creating it if necessary. Connections are kept alive between requests and
+        the number of open connections to each shard is limited. This method must run on the background event loop.
+
+        Returns:
+            ClientSession
+        """
+
+        if not self.session:
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                limit_per_host=self.config.get("connections", 100),
+                keepalive_timeout=self.config.get("keepalive", 60),
+                ttl_dns_cache=self.config.get("dnscache", 300),
+            )
+
+            self.session = aiohttp.ClientSession(connector=connector, raise_for_status=True)
+
+        return self.session
+
+    async def run(self, shards, action, method, data, partial):
         """
         Runs an async action.
 
+        Partial requests are read-only requests. Each shard must respond before the search deadline, requests are
+        hedged to shard replicas and results are None for shards that fail or miss the deadline. Otherwise, any
+        failure raises an exception.
+
         Args:
-            urls: run against this list of urls
+            shards: run against this list of shard urls
+            action: url action to perform
             method: get or post
             data: list of data for each url or None
+            partial: allows partial results if True
 
         Returns:
             json results if any
         """
 
-        async with aiohttp.ClientSession(raise_for_status=True) as session:
-            tasks = []
+        # Get persistent session
+        session = await self.connect()
+
+        tasks = []
+        for x, shard in enumerate(shards):
+            if method == "get" or not data or data[x]:
+                request = (session, shard, action, method, data[x] if data else None)
+                tasks.append(asyncio.ensure_future(self.hedged(*request) if partial else self.request(*request)))
+
+        results = await asyncio.gather(*tasks)
+
+        # Raise an error when all shards fail
+        if partial and results and all(isinstance(result, Exception) for result in results):
+            raise results[0]
+
+        return [None if isinstance(result, Exception) else result for result in results]
+
+    async def hedged(self, session, shard, action, method, data):
+        """
+        Runs a read-only request against a shard. Requests are sent to the next shard replica when a request fails
+        or takes longer than the hedge latency percentile. The first successful response is returned.
+
+        Args:
+            session: ClientSession
+            shard: shard url
+            action: url action to perform
+            method: get or post
+            data: data to POST
+
+        Returns:
+            json results or the last exception when all requests fail or the deadline is reached
+        """
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout else None
+        replicas = list(self.replicas.get(shard, []))
+
+        # Hedge delay for this shard
+        delay = self.percentile(shard, self.hedge) if self.hedge else None
+
+        pending, error = {asyncio.ensure_future(self.request(session, shard, action, method, data))}, None
+        while pending:
+            # Wait for the first request to complete, the hedge delay or the deadline
+            timeouts = ([delay] if replicas and delay is not None else []) + ([deadline - loop.time()] if deadline else [])
+            done, pending = await asyncio.wait(pending, timeout=max(0, min(timeouts)) if timeouts else None, return_when=asyncio.FIRST_COMPLETED)
 
-            for x, url in enumerate(urls):
-                if method == "post":
-                    if not data or data[x]:
-                        tasks.append(asyncio.ensure_future(self.post(session, url, data[x] if data else None)))
+            for task in done:
+                if task.exception():
+                    error = task.exception()
                 else:
-                    tasks.append(asyncio.ensure_future(self.get(session, url)))
+                    # Cancel remaining requests and return first successful response
+                    for request in pending:
+                        request.cancel()
+
+                    return task.result()
+
+            # Deadline reached
+            if deadline and loop.time() >= deadline:
+                self.metric(shard, "timeouts")
+                error = asyncio.TimeoutError(f"{shard} missed search deadline")
+                break
+
+            # Send request to next replica after a failure or when the hedge delay is reached
+            if replicas and (done or not pending or delay is not None):
+                self.metric(shard, "hedged")
+                pending.add(asyncio.ensure_future(self.request(session, replicas.pop(0), action, method, data)))
+
+        # Cancel remaining requests
+        for request in pending:
+            request.cancel()
+
+        return error
+
+    async def request(self, session, url, action, method, data):
+        """
+        Runs a HTTP request and records the request latency.
+
+        Args:
+            session: ClientSession
+            url: shard url
+            action: url action to perform
+            method: get or post
+            data: data to POST
+
+        Returns:
+            json results if any
+        """
+
+        start = time.perf_counter()
+
+        try:
+            result = await (self.post(session, f"{url}/{action}", data) if method == "post" else self.get(session, f"{url}/{action}"))
+        except Exception:
+            # Cancelled hedged requests aren't counted as errors, CancelledError isn't an Exception subclass
+            self.metric(url, "errors")
+            raise
+
+        # Record latency in milliseconds
+        self.metric(url, "responses", bisect.bisect_left(Cluster.BUCKETS, (time.perf_counter() - start) * 1000))
+        return result
+
+    def metric(self, url, name, bucket=None):
+        """
+        Updates a shard request metric. This method runs on the background event loop.
+
+        Args:
+            url: shard url
+            name: metric name
+            bucket: latency histogram bucket to increment, if applicable
+        """
+
+        metrics = self.latency.get(url)
+        if not metrics:
+            metrics = {"responses": 0, "errors": 0, "timeouts": 0, "hedged": 0, "histogram": [0] * (len(Cluster.BUCKETS) + 1)}
+            self.latency[url] = metrics
+
+        metrics[name] += 1
+        if bucket is not None:
+            metrics["histogram"][bucket] += 1
+
+    def percentile(self, url, percentile):
+        """
+        Estimates a shard latency percentile from the shard latency histogram.
+
+        Args:
+            url: shard url
+            percentile: percentile to estimate, 0 - 100
+
+        Returns:
+            latency in seconds or None if there aren't enough latency samples
+        """
+
+        metrics = self.latency.get(url)
+        if not metrics or metrics["responses"] < Cluster.SAMPLES:
+            return None
+
+        # Find first bucket where the cumulative count reaches percentile
+        total, target = 0, metrics["responses"] * percentile / 100
+        for x, count in enumerate(metrics["histogram"]):
+            total += count
+            if total >= target:
+                return Cluster.BUCKETS[min(x, len(Cluster.BUCKETS) - 1)] / 1000
+
+        return Cluster.BUCKETS[-1] / 1000
+
+    def available(self, results):
+        """
+        Filters out missing shard results and flags partial results in the current context.
+
+        Args:
+            results: list of results per shard, None for shards without results
+
+        Returns:
+            list of available results
+        """
 
-            return await asyncio.gather(*tasks)
+        self.partial.set(any(result is None for result in results))
+        return [result for result in results if result is not None]
 
     async def get(self, session, url):
         """
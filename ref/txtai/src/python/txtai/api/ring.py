@@ -0,0 +1,59 @@
+"""
+Ring module
+"""
+
+import bisect
+import hashlib
+
+
+class Ring:
+    """
+    Consistent hash ring. Each node is placed on the ring multiple times as virtual nodes. Keys are assigned to the
+    next virtual node on the ring. Adding or removing a node only moves the keys assigned to that node.
+    """
+
+    def __init__(self, nodes, vnodes=100):
+        """
+        Creates a new Ring.
+
+        Args:
+            nodes: list of node names
+            vnodes: number of virtual nodes per node
+        """
+
+        self.nodes = list(nodes)
+        self.vnodes = vnodes
+
+        # Sorted virtual node hashes and node positions
+        points = sorted((self.hash(f"{node}#{x}"), position) for position, node in enumerate(self.nodes) for x in range(vnodes))
+        self.hashes = [point for point, _ in points]
+        self.positions = [position for _, position in points]
+
+    def __call__(self, key):
+        """
+        Gets the node position for key.
+
+        Args:
+            key: input key
+
+        Returns:
+            node position
+        """
+
+        # Find next virtual node, wrap around at the end of the ring
+        x = bisect.bisect(self.hashes, self.hash(key)) % len(self.hashes)
+        return self.positions[x]
+
+    def hash(self, key):
+        """
+        Hashes key to a 64-bit integer. Keys are converted to strings, numeric ids and string ids with the same value
+        have the same hash.
+
+        Args:
+            key: input key
+
+        Returns:
+            hash value
+        """
+
+        return int.from_bytes(hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest(), "big")
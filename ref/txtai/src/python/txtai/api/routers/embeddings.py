@@ -21,7 +21,7 @@ router = APIRouter(route_class=EncodingAPIRoute)
 
 
 @router.get("/search")
-def search(query: str, request: Request):
+async def search(query: str, request: Request):
     """
     Finds documents most similar to the input query. This method will run either an index search
     or an index + database search depending on if a database is available.
@@ -31,25 +31,26 @@ def search(query: str, request: Request):
         request: FastAPI request
 
     Returns:
-        list of {id: value, score: value} for index search, list of dict for an index + database search
+        list of {id: value, score: value} for index search, list of dict for an index + database search,
+        {column: [values]} when the columnar query parameter is true
     """
 
-    # Execute search
-    results = application.get().search(query, request=request)
+    # Execute search, cluster searches are awaited on the event loop
+    results = await application.get().asearch(query, request=request)
 
     # Encode using standard FastAPI encoder but skip certain classes
     results = jsonable_encoder(
         results, custom_encoder={bytes: lambda x: x, BytesIO: lambda x: x, PIL.Image.Image: lambda x: x, Graph: lambda x: x.savedict()}
     )
 
-    # Return raw response to prevent duplicate encoding
+    # Return raw response to prevent duplicate encoding, flag partial cluster results
     response = ResponseFactory.create(request)
-    return response(results)
+    return response(results, headers=degraded())
 
 
 # pylint: disable=W0621
 @router.post("/batchsearch")
-def batchsearch(
+async def batchsearch(
     request: Request,
     queries: List[str] = Body(...),
     limit: int = Body(default=None),
@@ -57,6 +58,7 @@ def batchsearch(
     index: str = Body(default=None),
     parameters: List[dict] = Body(default=None),
     graph: bool = Body(default=False),
+    columnar: bool = Body(default=False),
 ):
     """
     Finds documents most similar to the input queries. This method will run either an index search
@@ -69,22 +71,35 @@ def batchsearch(
         index: index name, if applicable
         parameters: list of dicts of named parameters to bind to placeholders
         graph: return graph results if True
+        columnar: return results as {column: [values]} per query if True
 
     Returns:
         list of {id: value, score: value} per query for index search, list of dict per query for an index + database search
     """
 
-    # Execute search
-    results = application.get().batchsearch(queries, limit, weights, index, parameters, graph)
+    # Execute search, cluster searches are awaited on the event loop
+    results = await application.get().abatchsearch(queries, limit, weights, index, parameters, graph, columnar)
 
     # Encode using standard FastAPI encoder but skip certain classes
     results = jsonable_encoder(
         results, custom_encoder={bytes: lambda x: x, BytesIO: lambda x: x, PIL.Image.Image: lambda x: x, Graph: lambda x: x.savedict()}
     )
 
-    # Return raw response to prevent duplicate encoding
+    # Return raw response to prevent duplicate encoding, flag partial cluster results
     response = ResponseFactory.create(request)
-    return response(results)
+    return response(results, headers=degraded())
+
+
+def degraded():
+    """
+    Gets response headers for cluster searches that are missing results from one or more shards.
+
+    Returns:
+        headers dict or None
+    """
+
+    cluster = getattr(application.get(), "cluster", None)
+    return {"X-Degraded": "true"} if cluster and cluster.degraded() else None
 
 
 @router.post("/add")
@@ -309,7 +309,7 @@ class Application:
         # Attempt to resolve action as a callable function
         return PipelineFactory.create({}, function)
 
-    def search(self, query, limit=10, weights=None, index=None, parameters=None, graph=False):
+    def search(self, query, limit=10, weights=None, index=None, parameters=None, graph=False, columnar=False):
         """
         Finds documents most similar to the input query. This method will run either an index search
         or an index + database search depending on if a database is available.
@@ -321,6 +321,7 @@ class Application:
             index: index name, if applicable
             parameters: dict of named parameters to bind to placeholders
             graph: return graph results if True
+            columnar: return results as {column: [values]} if True
 
         Returns:
             list of {id: value, score: value} for index search, list of dict for an index + database search
@@ -328,14 +329,17 @@ class Application:
 
         if self.embeddings:
             with self.lock:
-                results = self.embeddings.search(query, limit, weights, index, parameters, graph)
+                results = self.embeddings.search(query, limit, weights, index, parameters, graph, columnar)
 
             # Unpack (id, score) tuple, if necessary. Otherwise, results are dictionaries.
-            return results if graph else [{"id": r[0], "score": float(r[1])} if isinstance(r, tuple) else r for r in results]
+            if graph or isinstance(results, dict):
+                return results
+
+            return [{"id": r[0], "score": float(r[1])} if isinstance(r, tuple) else r for r in results]
 
         return None
 
-    def batchsearch(self, queries, limit=10, weights=None, index=None, parameters=None, graph=False):
+    def batchsearch(self, queries, limit=10, weights=None, index=None, parameters=None, graph=False, columnar=False):
         """
         Finds documents most similar to the input queries. This method will run either an index search
         or an index + database search depending on if a database is available.
@@ -347,6 +351,7 @@ class Application:
             index: index name, if applicable
             parameters: list of dicts of named parameters to bind to placeholders
             graph: return graph results if True
+            columnar: return results as {column: [values]} per query if True
 
         Returns:
             list of {id: value, score: value} per query for index search, list of dict per query for an index + database search
@@ -354,12 +359,15 @@ class Application:
 
         if self.embeddings:
             with self.lock:
-                search = self.embeddings.batchsearch(queries, limit, weights, index, parameters, graph)
+                search = self.embeddings.batchsearch(queries, limit, weights, index, parameters, graph, columnar)
 
             results = []
             for result in search:
                 # Unpack (id, score) tuple, if necessary. Otherwise, results are dictionaries.
-                results.append(result if graph else [{"id": r[0], "score": float(r[1])} if isinstance(r, tuple) else r for r in result])
+                if not graph and not isinstance(result, dict):
+                    result = [{"id": r[0], "score": float(r[1])} if isinstance(r, tuple) else r for r in result]
+
+                results.append(result)
             return results
 
         return None
@@ -12,6 +12,7 @@ from .sql import SQL, SQLError, Token
 logger = logging.getLogger(__name__)
 
 
+# pylint: disable=R0904
 class Database:
     """
     Base class for database instances. This class encapsulates a content database used for
@@ -113,7 +114,7 @@ class Database:
 
         raise NotImplementedError
 
-    def search(self, query, similarity=None, limit=None, parameters=None, indexids=False):
+    def search(self, query, similarity=None, limit=None, parameters=None, indexids=False, columnar=False):
         """
         Runs a search against the database. Supports the following methods:
 
@@ -134,10 +135,13 @@ class Database:
             similarity: similarity results as [(indexid, score)]
             limit: maximum number of results to return
             parameters: dict of named parameters to bind to placeholders
+            indexids: results are returned as [(indexid, score)] regardless of select clause parameters if True
+            columnar: results are returned as {column: [values]} if True
 
         Returns:
             query results as a list of dicts
             list of ([indexid, score]) if indexids is True
+            dict of {column: [values]} if columnar is True
         """
 
         # Parse query if necessary
@@ -161,7 +165,44 @@ class Database:
         query["where"] = where
 
         # Run query
-        return self.query(query, limit, parameters, indexids)
+        return self.query(query, limit, parameters, indexids, columnar)
+
+    def batchsearch(self, queries, similarity=None, limit=None, parameters=None, indexids=False, columnar=False):
+        """
+        Runs a batch of searches against the database. See search for the supported query types.
+
+        Args:
+            queries: list of input queries
+            similarity: list of similarity results per query, each is a list of [(indexid, score)] per similar clause
+            limit: maximum number of results to return per query
+            parameters: list of dicts of named parameters to bind to placeholders
+            indexids: results are returned as [(indexid, score)] regardless of select clause parameters if True
+            columnar: results are returned as {column: [values]} if True
+
+        Returns:
+            list of query results per query
+        """
+
+        return [
+            self.search(query, similarity[x] if similarity else None, limit, parameters[x] if parameters else None, indexids, columnar)
+            for x, query in enumerate(queries)
+        ]
+
+    # pylint: disable=W0613
+    def filter(self, query, parameters=None):
+        """
+        Resolves the index ids matching the filtering clauses of a query. Filters are resolved before an index search
+        and pushed down into the index search.
+
+        Args:
+            query: parsed query
+            parameters: dict of named parameters to bind to placeholders
+
+        Returns:
+            list of index ids or None if query filters can't be resolved before an index search
+        """
+
+        return None
 
     def parse(self, query):
         """
@@ -202,7 +243,7 @@ class Database:
 
         raise NotImplementedError
 
-    def query(self, query, limit, parameters, indexids):
+    def query(self, query, limit, parameters, indexids, columnar=False):
         """
         Executes query against database.
 
@@ -211,6 +252,7 @@ class Database:
             limit: maximum number of results to return
             parameters: dict of named parameters to bind to placeholders
             indexids: results are returned as [(indexid, score)] regardless of select clause parameters if True
+            columnar: results are returned as {column: [values]} if True
 
         Returns:
             query results
@@ -229,8 +271,11 @@ class Database:
         # Database configuration
         self.config = config
 
+        # Maximum number of cached parsed queries and query statements
+        self.cachesize = config.get("querycache", 1024)
+
         # SQL parser
-        self.sql = SQL(self)
+        self.sql = SQL(self, cachesize=self.cachesize)
 
         # Load objects encoder
         encoder = self.config.get("objects")
@@ -322,6 +367,16 @@ class Database:
         except Exception as ex:
             raise SQLError(ex) from None
 
+    def metrics(self):
+        """
+        Gets query cache metrics.
+
+        Returns:
+            {cache name: {hits, misses, maxsize, currsize}}
+        """
+
+        return {"queries": self.sql.cache.cache_info()._asdict()} if self.sql.cache else {}
+
     def setting(self, name, default=None):
         """
         Looks up database specific setting.
@@ -10,7 +10,7 @@ try:
     from sqlalchemy import StaticPool, Text, cast, create_engine, insert, text as textsql
     from sqlalchemy.orm import Session, aliased
 
-    from .schema import Base, Batch, Document, Object, Section, SectionBase, Score
+    from .schema import Base, Batch, Document, Object, QueryBatch, QueryScore, Section, SectionBase, Score
 
     ORM = True
 except ImportError:
@@ -104,6 +104,17 @@ class Client(RDBMS):
         if scores:
             self.connection.execute(insert(Score), [{"indexid": i, "score": sum(s) / len(s)} for i, s in scores.items()])
 
+    def createqueries(self):
+        # Create temporary query batch and scores tables, if necessary
+        Base.metadata.tables["querybatch"].create(self.connection.bind, checkfirst=True)
+        Base.metadata.tables["queryscores"].create(self.connection.bind, checkfirst=True)
+
+    def insertqueries(self, batch, scores):
+        if batch:
+            self.connection.execute(insert(QueryBatch), [{"qid": qid, "indexid": i, "batch": b} for qid, i, b in batch])
+        if scores:
+            self.connection.execute(insert(QueryScore), [{"qid": qid, "indexid": i, "score": score} for qid, i, score in scores])
+
     def connect(self, path=None):
         # Connection URL
         content = self.config.get("content")
@@ -15,6 +15,13 @@ try:
 except ImportError:
     DUCKDB = False
 
+try:
+    import pyarrow
+
+    PYARROW = True
+except ImportError:
+    PYARROW = False
+
 from .embedded import Embedded
 from .schema import Statement
 
@@ -24,9 +31,11 @@ class DuckDB(Embedded):
     Database instance backed by DuckDB.
     """
 
-    # Delete single document and object
-    DELETE_DOCUMENT = "DELETE FROM documents WHERE id = ?"
-    DELETE_OBJECT = "DELETE FROM objects WHERE id = ?"
+    # Delete existing documents and objects with ids in insert buffer
+    DELETE_BUFFER = "DELETE FROM %s WHERE id IN (SELECT id FROM buffer)"
+
+    # Append insert buffer to table
+    INSERT_BUFFER = "INSERT INTO %s SELECT * FROM buffer"
 
     def __init__(self, config):
         super().__init__(config)
@@ -38,19 +47,33 @@ class DuckDB(Embedded):
         # Call parent method with DuckDB compatible arguments
         return super().execute(function, *self.formatargs(args))
 
-    def insertdocument(self, uid, data, tags, entry):
-        # Delete existing document
-        self.cursor.execute(DuckDB.DELETE_DOCUMENT, [uid])
-
-        # Call parent method
-        super().insertdocument(uid, data, tags, entry)
-
-    def insertobject(self, uid, data, tags, entry):
-        # Delete existing object
-        self.cursor.execute(DuckDB.DELETE_OBJECT, [uid])
-
-        # Call parent method
-        super().insertobject(uid, data, tags, entry)
+    def insertrows(self, table, rows):
+        # Documents and objects replace existing rows, keep the last row for each id
+        replace = table != "sections"
+        if replace:
+            rows = list({str(row[0]): row for row in rows}.values())
+
+        if PYARROW:
+            # Load rows into an Arrow table. Ids are stored as text.
+            columns = ["indexid", "id", "text", "tags", "entry"] if table == "sections" else ["id", "data", "tags", "entry"]
+            position = columns.index("id")
+            values = {column: [str(row[x]) for row in rows] if x == position else [row[x] for row in rows] for x, column in enumerate(columns)}
+
+            # Register Arrow table as a view and run set-based delete and insert statements
+            self.connection.register("buffer", pyarrow.table(values))
+            if replace:
+                self.cursor.execute(DuckDB.DELETE_BUFFER % table)
+
+            self.cursor.execute(DuckDB.INSERT_BUFFER % table)
+            self.connection.unregister("buffer")
+        else:
+            # Delete existing rows with a set-based delete
+            if replace:
+                self.batch(ids=[row[0] for row in rows])
+                self.cursor.execute(Statement.DELETE_DOCUMENTS if table == "documents" else Statement.DELETE_OBJECTS)
+
+            # Call parent method
+            super().insertrows(table, rows)
 
     def connect(self, path=":memory:"):
         # Create connection and start a transaction
@@ -79,6 +102,16 @@ class DuckDB(Embedded):
             yield from rows
             rows = self.cursor.fetchmany(batch)
 
+    def columns(self):
+        # Column types
+        types = [str(column[1]) for column in self.cursor.description]
+
+        # Retrieve results as NumPy arrays, which DuckDB fills a column at a time, and convert each array to a list
+        columns = [column.tolist() for column in self.cursor.fetchnumpy().values()]
+
+        # Binary columns are returned as bytearrays, convert to bytes to match row results
+        return [[bytes(x) if x is not None else x for x in column] if dtype == "BLOB" else column for column, dtype in zip(columns, types)]
+
     def addfunctions(self):
         # DuckDB doesn't currently support scalar functions
         return
@@ -2,11 +2,17 @@
 RDBMS module
 """
 
+import bisect
 import datetime
 import json
+import operator
+import re
+
+from functools import lru_cache
 
 from .base import Database
 from .schema import Statement
+from .sql import Token
 
 
 # pylint: disable=R0904
@@ -16,6 +22,12 @@ class RDBMS(Database):
     database instance.
     """
 
+    # Maximum number of buffered rows per table before rows are inserted
+    BUFFER = 10000
+
+    # Maximum number of index ids a filter resolves before an index search
+    FILTER = 10000
+
     def __init__(self, config):
         """
         Creates a new Database.
@@ -30,17 +42,35 @@ class RDBMS(Database):
         self.connection = None
         self.cursor = None
 
+        # Buffered rows to insert per table
+        self.buffers = {}
+
+        # Indexed document field columns
+        self.fields = {}
+
+        # Least recently used cache of query statements
+        self.statements = lru_cache(maxsize=self.cachesize)(self.statement) if self.cachesize else self.statement
+
     def load(self, path):
         # Load an existing database. Thread locking must be handled externally.
         self.session(path)
 
+        # Resolve existing indexed document fields
+        self.indexfields(False)
+
     def insert(self, documents, index=0):
         # Initialize connection if not open
         self.initialize()
 
+        # Create indexed document fields, if necessary
+        self.indexfields()
+
         # Get entry date
         entry = datetime.datetime.now()
 
+        # Clear rows buffered by a previous insert that didn't complete
+        self.buffers = {}
+
         # Insert documents
         for uid, document, tags in documents:
             if isinstance(document, dict):
@@ -62,6 +92,9 @@ class RDBMS(Database):
                 self.loadsection(index, uid, document, tags, entry)
                 index += 1
 
+        # Insert buffered rows
+        self.flush()
+
         # Post processing logic
         self.finalize()
 
@@ -129,6 +162,14 @@ class RDBMS(Database):
         self.cursor.execute(Statement.COUNT_IDS)
         return self.cursor.fetchone()[0]
 
+    def metrics(self):
+        # Add query statement cache metrics
+        metrics = super().metrics()
+        if self.cachesize:
+            metrics["statements"] = self.statements.cache_info()._asdict()
+
+        return metrics
+
     def resolve(self, name, alias=None):
         # Standard column names
         sections = ["indexid", "id", "tags", "entry"]
@@ -148,7 +189,7 @@ class RDBMS(Database):
             return self.expressions[name]
 
         # Name is already resolved, skip
-        if name.startswith(self.jsonprefix()) or any(f"s.{s}" == name for s in sections):
+        if name.startswith(self.jsonprefix()) or any(f"s.{s}" == name for s in sections) or name in self.fields.values():
             return name
 
         # Standard columns - need prefixes
@@ -159,9 +200,58 @@ class RDBMS(Database):
         if name.lower() in noprefix:
             return name
 
+        # Indexed document fields
+        if name in self.fields:
+            return self.fields[name]
+
         # Other columns come from documents.data JSON
         return self.jsoncolumn(name)
 
+    def batchsearch(self, queries, similarity=None, limit=None, parameters=None, indexids=False, columnar=False):
+        # Parse queries
+        queries = [self.parse(query) if isinstance(query, str) else query for query in queries]
+
+        # Group queries with similarity results by query shape. Queries with bind parameters run individually.
+        groups = {}
+        for x, query in enumerate(queries):
+            shape = self.shape(query) if similarity and similarity[x] and not (parameters and parameters[x]) else None
+            groups.setdefault(shape, []).append(x)
+
+        results = [None] * len(queries)
+        for shape, group in groups.items():
+            if shape and len(group) > 1:
+                # Run a single statement for all queries with the same shape
+                for x, result in zip(group, self.batchquery(queries[group[0]], [similarity[x] for x in group], limit, indexids, columnar)):
+                    results[x] = result
+            else:
+                # Run queries individually
+                for x in group:
+                    results[x] = self.search(
+                        queries[x], similarity[x] if similarity else None, limit, parameters[x] if parameters else None, indexids, columnar
+                    )
+
+        return results
+
+    def filter(self, query, parameters=None):
+        # Get filtering predicate for similarity queries
+        predicate = self.predicate(query.get("where")) if "select" in query and query.get("similar") else None
+        if not predicate:
+            return None
+
+        # Only push down predicates resolved through an index, other predicates scan the full table
+        statement = f"{Statement.TABLE_CLAUSE % 's.indexid'} WHERE {predicate}"
+        if not self.indexed(statement, parameters):
+            return None
+
+        # Select index ids matching predicate, stop once the maximum number of ids is exceeded
+        statement = f"{statement} LIMIT {RDBMS.FILTER + 1}"
+        args = (statement, parameters) if parameters else (statement,)
+        self.execute(self.cursor.execute, *args)
+
+        # Filters that match too many ids run as standard searches
+        indexids = [row[0] for row in self.rows()]
+        return indexids if len(indexids) <= RDBMS.FILTER else None
+
     def embed(self, similarity, batch):
         # Load similarity results id batch
         self.batch(indexids=[i for i, _ in similarity[batch]], batch=batch)
@@ -174,7 +264,7 @@ class RDBMS(Database):
         return Statement.IDS_CLAUSE % batch
 
     # pylint: disable=R0912
-    def query(self, query, limit, parameters, indexids):
+    def query(self, query, limit, parameters, indexids, columnar=False):
         # Extract query components
         select = query.get("select", self.defaults())
         where = query.get("where")
@@ -186,7 +276,52 @@ class RDBMS(Database):
         if indexids:
             select = f"{self.resolve('indexid')}, {self.resolve('score')}"
 
+        # Query limit
+        limit = (qlimit if qlimit else limit) if qlimit is not None or limit else None
+
         # Build query text
+        query = self.statements(select, where, groupby, having, orderby, bool(similarity), limit, offset)
+
+        # Clear scores when no similar clauses present
+        if not similarity:
+            self.scores(None)
+
+        # Runs a user query through execute method, which has common user query handling logic
+        args = (query, parameters) if parameters else (query,)
+        self.execute(self.cursor.execute, *args)
+
+        # Retrieve column list from query
+        columns = [c[0] for c in self.cursor.description]
+
+        # Map column values and return, if necessary
+        if columnar and not indexids:
+            return self.mapcolumns(columns, self.columns())
+
+        # Map results and return
+        results = [self.result(columns, row) for row in self.rows()]
+
+        # Transform results, if necessary
+        return [(x["indexid"], x["score"]) for x in results] if indexids else results
+
+    def statement(self, select, where, groupby, having, orderby, similarity, limit, offset):
+        """
+        Builds a query statement from parsed query clauses. Statements are cached and the same statement text is
+        built for the same clauses, which lets databases reuse prepared statements.
+
+        Args:
+            select: select clause
+            where: where clause
+            groupby: group by clause
+            having: having clause
+            orderby: order by clause
+            similarity: True if similarity scores are available
+            limit: query limit
+            offset: query offset
+
+        Returns:
+            query statement
+        """
+
         query = Statement.TABLE_CLAUSE % select
         if where is not None:
             query += f" WHERE {where}"
@@ -202,42 +337,204 @@ class RDBMS(Database):
             query += " ORDER BY score DESC"
 
         # Apply query limit
-        if qlimit is not None or limit:
-            query += f" LIMIT {qlimit if qlimit else limit}"
+        if limit is not None:
+            query += f" LIMIT {limit}"
 
             # Apply offset
             if offset is not None:
                 query += f" OFFSET {offset}"
 
-        # Clear scores when no similar clauses present
-        if not similarity:
-            self.scores(None)
+        return query
+
+    def shape(self, query):
+        """
+        Gets the shape of a parsed query. Queries with the same shape only differ by their similar clauses and can run as a
+        single batch statement.
+
+        Args:
+            query: parsed query
+
+        Returns:
+            query shape or None if this query can't run as a batch statement
+        """
+
+        # Detect aggregates, distinct and order by aliases
+        select, orderby = query.get("select", ""), query.get("orderby")
+        aggregate = re.search(r"\b(distinct|count|sum|avg|min|max|total|group_concat|string_agg|array_agg|list|median)\b", select, re.IGNORECASE)
+        alias = orderby and re.search(r"\bas\b", select, re.IGNORECASE)
+
+        # Queries with aggregates, distinct, wildcard selections or order by aliases run individually
+        if query.get("groupby") or query.get("having") or "*" in select or aggregate or alias:
+            return None
+
+        return tuple(query.get(key) for key in ["select", "where", "orderby", "limit", "offset"]) + (len(query.get("similar", [])),)
+
+    def predicate(self, where):
+        """
+        Gets the filtering predicate of a where clause with similar clauses. The predicate is the where clause without
+        similar clauses. Similar clauses must be top level AND conditions, otherwise the where clause can't be split.
+
+        Args:
+            where: where clause
+
+        Returns:
+            filtering predicate or None if where clause can't be split
+        """
+
+        # Split where clause into top level AND conditions, skip quoted strings and parenthesized expressions
+        conditions, start, depth, quote, lower = [], 0, 0, None, where.lower()
+        for x, c in enumerate(where):
+            if quote:
+                quote = None if c == quote else quote
+            elif c in ("'", '"'):
+                quote = c
+            elif c in ("(", ")"):
+                depth += 1 if c == "(" else -1
+            elif not depth and x >= start and lower.startswith(" or ", x):
+                return None
+            elif not depth and x >= start and lower.startswith(" and ", x):
+                conditions.append(where[start:x])
+                start = x + 5
+
+        conditions.append(where[start:])
+
+        # Remove similar clauses. Predicates can't depend on similar clauses or scores.
+        conditions = [condition for condition in conditions if not re.match(rf"^\s*{Token.SIMILAR_TOKEN}\d+\s*$", condition)]
+        predicate = " and ".join(conditions)
+        if Token.SIMILAR_TOKEN in predicate or re.search(r"\bscore\b", predicate, re.IGNORECASE):
+            return None
+
+        return predicate if conditions else None
+
+    # pylint: disable=W0613
+    def indexed(self, statement, parameters):
+        """
+        Checks if a statement is resolved through indexes without scanning a full table.
+
+        Args:
+            statement: SQL statement
+            parameters: dict of named parameters to bind to placeholders
+
+        Returns:
+            True if statement only reads rows through indexes
+        """
+
+        return False
+
+    def batchquery(self, query, similarity, limit, indexids, columnar=False):
+        """
+        Executes a batch of queries with the same shape as a single statement against database.
+
+        Args:
+            query: parsed query, shared by all queries in the batch
+            similarity: list of similarity results per query, each is a list of [(indexid, score)] per similar clause
+            limit: maximum number of results to return per query
+            indexids: results are returned as [(indexid, score)] regardless of select clause parameters if True
+            columnar: results are returned as {column: [values]} if True
+
+        Returns:
+            list of query results per query
+        """
+
+        # Load similarity results for all queries
+        self.queries(similarity)
+
+        # Extract query components
+        select = query.get("select", self.defaults())
+        where = query.get("where")
+        orderby, qlimit, offset = query.get("orderby"), query.get("limit"), query.get("offset")
+
+        # Select "indexid, score" when indexids is True
+        if indexids:
+            select = f"{self.resolve('indexid')}, {self.resolve('score')}"
+
+        # Add in similar results
+        if "select" in query:
+            for x in range(len(similarity[0])):
+                where = where.replace(f"{Token.SIMILAR_TOKEN}{x}", Statement.QUERY_IDS_CLAUSE % x)
+        else:
+            where = Statement.QUERY_IDS_CLAUSE % 0
+
+        # Build query text, rows are numbered per query using the query order
+        statement = Statement.QUERY_TABLE_CLAUSE % (select, orderby if orderby is not None else "score DESC")
+        statement += f" WHERE {where}"
+
+        # Apply query limit and offset to each query
+        start = int(offset) if offset is not None and (qlimit is not None or limit) else 0
+        statement = Statement.QUERY_ROWS_CLAUSE % (statement, start)
+        if qlimit is not None or limit:
+            statement += f" AND __rownum <= {start + int(qlimit if qlimit else limit)}"
+
+        statement += " ORDER BY __qid, __rownum"
 
         # Runs a user query through execute method, which has common user query handling logic
-        args = (query, parameters) if parameters else (query,)
-        self.execute(self.cursor.execute, *args)
+        self.execute(self.cursor.execute, statement)
 
-        # Retrieve column list from query
-        columns = [c[0] for c in self.cursor.description]
+        # Retrieve column list from query, query id and row number columns are the last two columns
+        columns = [c[0] for c in self.cursor.description][:-2]
 
-        # Map results and return
-        results = []
+        # Map column values to each query, rows are ordered by query id
+        if columnar and not indexids:
+            values = self.columns()
+            bounds = [bisect.bisect_left(values[-2], x) for x in range(len(similarity) + 1)]
+            return [self.mapcolumns(columns, [v[bounds[x] : bounds[x + 1]] for v in values[:-2]]) for x in range(len(similarity))]
+
+        # Map results to each query
+        results = [[] for _ in similarity]
         for row in self.rows():
-            result = {}
+            results[row[-2]].append(self.result(columns, row))
 
-            # Copy columns to result. In cases with duplicate column names, find one with a value
-            for x, column in enumerate(columns):
-                if column not in result or result[column] is None:
-                    # Decode object
-                    if self.encoder and column == self.object:
-                        result[column] = self.encoder.decode(row[x])
-                    else:
-                        result[column] = row[x]
+        # Transform results, if necessary
+        return [[(x["indexid"], x["score"]) for x in result] for result in results] if indexids else results
 
-            results.append(result)
+    def result(self, columns, row):
+        """
+        Maps a result row to a dict.
 
-        # Transform results, if necessary
-        return [(x["indexid"], x["score"]) for x in results] if indexids else results
+        Args:
+            columns: list of column names
+            row: result row
+
+        Returns:
+            dict of column name: value
+        """
+
+        result = {}
+
+        # Copy columns to result. In cases with duplicate column names, find one with a value
+        for x, column in enumerate(columns):
+            if column not in result or result[column] is None:
+                # Decode object
+                if self.encoder and column == self.object:
+                    result[column] = self.encoder.decode(row[x])
+                else:
+                    result[column] = row[x]
+
+        return result
+
+    def mapcolumns(self, columns, values):
+        """
+        Maps result column values to a dict.
+
+        Args:
+            columns: list of column names
+            values: list of values per column
+
+        Returns:
+            dict of column name: list of values
+        """
+
+        result = {}
+
+        # Copy columns to result. In cases with duplicate column names, fill missing values from the duplicate column.
+        for column, value in zip(columns, values):
+            # Decode objects
+            if self.encoder and column == self.object:
+                value = [self.encoder.decode(x) for x in value]
+
+            result[column] = [x if x is not None else y for x, y in zip(result[column], value)] if column in result else list(value)
+
+        return result
 
     def initialize(self):
         """
@@ -270,6 +567,7 @@ class RDBMS(Database):
         # Create temporary tables - session scope
         self.createbatch()
         self.createscores()
+        self.createqueries()
 
     def createtables(self):
         """
@@ -281,6 +579,15 @@ class RDBMS(Database):
         self.cursor.execute(Statement.CREATE_SECTIONS % "sections")
         self.cursor.execute(Statement.CREATE_SECTIONS_INDEX)
 
+    def indexfields(self, create=True):
+        """
+        Resolves columns for indexed document fields set in the indexed configuration parameter. Filters on indexed fields
+        use these columns instead of extracting fields from the JSON of each document. Default method is no-op.
+
+        Args:
+            create: creates missing columns if True, otherwise only resolves existing columns
+        """
+
     def finalize(self):
         """
         Post processing logic run after inserting a batch of documents. Default method is no-op.
@@ -328,7 +635,7 @@ class RDBMS(Database):
             entry: generated entry date
         """
 
-        self.cursor.execute(Statement.INSERT_DOCUMENT, [uid, data, tags, entry])
+        self.buffer("documents", (uid, data, tags, entry))
 
     def loadobject(self, uid, obj, tags, entry):
         """
@@ -356,7 +663,7 @@ class RDBMS(Database):
             entry: generated entry date
         """
 
-        self.cursor.execute(Statement.INSERT_OBJECT, [uid, data, tags, entry])
+        self.buffer("objects", (uid, data, tags, entry))
 
     def loadsection(self, index, uid, text, tags, entry):
         """
@@ -385,7 +692,45 @@ class RDBMS(Database):
         """
 
         # Save text section
-        self.cursor.execute(Statement.INSERT_SECTION, [index, uid, text, tags, entry])
+        self.buffer("sections", (index, uid, text, tags, entry))
+
+    def buffer(self, table, row):
+        """
+        Buffers a row to insert. Rows are inserted in bulk when the buffer is full and after all documents are processed.
+
+        Args:
+            table: table name
+            row: row values
+        """
+
+        rows = self.buffers.setdefault(table, [])
+        rows.append(row)
+
+        # Insert rows when buffer is full
+        if len(rows) >= RDBMS.BUFFER:
+            self.flush()
+
+    def flush(self):
+        """
+        Inserts all buffered rows.
+        """
+
+        buffers, self.buffers = self.buffers, {}
+        for table, rows in buffers.items():
+            if rows:
+                self.insertrows(table, rows)
+
+    def insertrows(self, table, rows):
+        """
+        Inserts a list of rows into table.
+
+        Args:
+            table: table name - documents, objects or sections
+            rows: list of rows
+        """
+
+        statements = {"documents": Statement.INSERT_DOCUMENT, "objects": Statement.INSERT_OBJECT, "sections": Statement.INSERT_SECTION}
+        self.cursor.executemany(statements[table], rows)
 
     def reindexstart(self):
         """
@@ -492,6 +837,59 @@ class RDBMS(Database):
         if scores:
             self.cursor.executemany(Statement.INSERT_SCORE, [(i, sum(s) / len(s)) for i, s in scores.items()])
 
+    def queries(self, similarity):
+        """
+        Loads similarity results for a batch of queries to temporary tables for efficient query processing.
+
+        Args:
+            similarity: list of similarity results per query, each is a list of [(indexid, score)] per similar clause
+        """
+
+        # Delete query batches and scores
+        self.cursor.execute(Statement.DELETE_QUERY_BATCH)
+        self.cursor.execute(Statement.DELETE_QUERY_SCORES)
+
+        batch, scores = [], []
+        for qid, clauses in enumerate(similarity):
+            # Add a row with no indexid for each query, ensures queries with no similarity results are still run
+            batch.append((qid, None, None))
+
+            # Add similarity results id batches and average scores per id, needed for multiple similar() clauses
+            averages = {}
+            for x, clause in enumerate(clauses):
+                for i, score in clause:
+                    batch.append((qid, i, x))
+                    averages.setdefault(i, []).append(score)
+
+            scores.extend((qid, i, sum(s) / len(s)) for i, s in averages.items())
+
+        # Add query batches and scores
+        self.insertqueries(batch, scores)
+
+    def createqueries(self):
+        """
+        Creates temporary query batch and scores tables.
+        """
+
+        # Create or Replace temporary query batch and scores tables
+        self.cursor.execute(Statement.CREATE_QUERY_BATCH)
+        self.cursor.execute(Statement.CREATE_QUERY_BATCH_INDEX)
+        self.cursor.execute(Statement.CREATE_QUERY_SCORES)
+
+    def insertqueries(self, batch, scores):
+        """
+        Inserts query batches and scores.
+
+        Args:
+            batch: list of (query id, indexid, batch)
+            scores: list of (query id, indexid, score)
+        """
+
+        if batch:
+            self.cursor.executemany(Statement.INSERT_QUERY_BATCH, batch)
+        if scores:
+            self.cursor.executemany(Statement.INSERT_QUERY_SCORE, scores)
+
     def defaults(self):
         """
         Returns a list of default columns when there is no select clause.
@@ -561,6 +959,18 @@ class RDBMS(Database):
 
         raise NotImplementedError
 
+    def columns(self):
+        """
+        Returns current cursor results for last executed query as a list of values per column.
+
+        Returns:
+            list of values per column
+        """
+
+        # Transpose rows into columns
+        rows = list(self.rows())
+        return [list(map(operator.itemgetter(x), rows)) for x in range(len(self.cursor.description))]
+
     def addfunctions(self):
         """
         Adds custom functions in current connection.
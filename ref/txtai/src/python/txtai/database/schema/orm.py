@@ -4,7 +4,7 @@ ORM Module
 
 # Conditional import
 try:
-    from sqlalchemy import Column, DateTime, Float, JSON, Integer, LargeBinary, String, Text
+    from sqlalchemy import Column, DateTime, Float, Index, JSON, Integer, LargeBinary, String, Text
     from sqlalchemy.orm import DeclarativeBase
 
     ORM = True
@@ -54,6 +54,31 @@ if ORM:
         indexid = Column(Integer, primary_key=True, autoincrement=False)
         score = Column(Float)
 
+    class QueryBatch(Base):
+        """
+        Query batch temporary table mapping.
+        """
+
+        __tablename__ = "querybatch"
+        __table_args__ = (Index("querybatch_qid", "qid", "batch"), {"prefixes": ["TEMPORARY"]})
+
+        autoid = Column(Integer, primary_key=True, autoincrement=True)
+        qid = Column(Integer)
+        indexid = Column(Integer)
+        batch = Column(Integer)
+
+    class QueryScore(Base):
+        """
+        Query scores temporary table mapping.
+        """
+
+        __tablename__ = "queryscores"
+        __table_args__ = {"prefixes": ["TEMPORARY"]}
+
+        qid = Column(Integer, primary_key=True, autoincrement=False)
+        indexid = Column(Integer, primary_key=True, autoincrement=False)
+        score = Column(Float)
+
     class Document(Base):
         """
         Documents table mapping.
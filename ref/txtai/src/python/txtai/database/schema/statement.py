@@ -32,6 +32,32 @@ class Statement:
     DELETE_SCORES = "DELETE FROM scores"
     INSERT_SCORE = "INSERT INTO scores VALUES (?, ?)"
 
+    # Temporary table for working with id batches for a batch of queries
+    CREATE_QUERY_BATCH = """
+        CREATE TEMP TABLE IF NOT EXISTS querybatch (
+            qid INTEGER,
+            indexid INTEGER,
+            batch INTEGER
+        )
+    """
+
+    CREATE_QUERY_BATCH_INDEX = "CREATE INDEX IF NOT EXISTS querybatch_qid ON querybatch(qid, batch)"
+    DELETE_QUERY_BATCH = "DELETE FROM querybatch"
+    INSERT_QUERY_BATCH = "INSERT INTO querybatch VALUES (?, ?, ?)"
+
+    # Temporary table for joining similarity scores for a batch of queries
+    CREATE_QUERY_SCORES = """
+        CREATE TEMP TABLE IF NOT EXISTS queryscores (
+            qid INTEGER,
+            indexid INTEGER,
+            score REAL,
+            PRIMARY KEY (qid, indexid)
+        )
+    """
+
+    DELETE_QUERY_SCORES = "DELETE FROM queryscores"
+    INSERT_QUERY_SCORE = "INSERT INTO queryscores VALUES (?, ?, ?)"
+
     # Documents - stores full content
     CREATE_DOCUMENTS = """
         CREATE TABLE IF NOT EXISTS documents (
@@ -96,3 +122,14 @@ class Statement:
         + "LEFT JOIN scores sc ON s.indexid = sc.indexid"
     )
     IDS_CLAUSE = "s.indexid in (SELECT indexid from batch WHERE batch=%s)"
+
+    # Partial sql clauses for a batch of queries. Each query is numbered by __rownum within its query id.
+    QUERY_TABLE_CLAUSE = (
+        "SELECT %s, q.qid AS __qid, ROW_NUMBER() OVER (PARTITION BY q.qid ORDER BY %s) AS __rownum "
+        + "FROM (SELECT DISTINCT qid FROM querybatch) q CROSS JOIN sections s "
+        + "LEFT JOIN documents d ON s.id = d.id "
+        + "LEFT JOIN objects o ON s.id = o.id "
+        + "LEFT JOIN queryscores sc ON q.qid = sc.qid AND s.indexid = sc.indexid"
+    )
+    QUERY_IDS_CLAUSE = "s.indexid in (SELECT indexid from querybatch WHERE qid=q.qid AND batch=%s)"
+    QUERY_ROWS_CLAUSE = "SELECT * FROM (%s) r WHERE __rownum > %d"
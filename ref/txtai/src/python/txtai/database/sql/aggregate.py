@@ -2,8 +2,11 @@
 Aggregate module
 """
 
+import functools
+import heapq
 import itertools
 import operator
+import re
 
 from .base import SQL
 
@@ -13,6 +16,15 @@ class Aggregate(SQL):
     Aggregates partial results from queries. Partial results come from queries when working with sharded indexes.
     """
 
+    # Alias prefix for counts selected alongside averages, used to merge shard averages
+    AVGCOUNT = "__avgcount"
+
+    # Top level clause keywords and quoted strings, used to locate clauses in query text
+    CLAUSES = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"|\[[^\]]*\]|[()]|\b(?:from|group\s+by|having|order\s+by|limit|offset)\b", re.IGNORECASE)
+
+    # Aggregate function call with an optional alias
+    FUNCTION = re.compile(r"^(count|sum|total|min|max|avg)\((.*)\)(?:\s+(?:as\s+)?[^\s()]+)?$", re.IGNORECASE)
+
     def __init__(self, database=None):
         # Always return token lists as this method requires them
         super().__init__(database, True)
@@ -23,15 +35,19 @@ class Aggregate(SQL):
 
         Args:
             query: input query
-            results: query results
+            results: query results, either a list of dicts or {column: [values]}
 
         Returns:
-            aggregated query results
+            aggregated query results, in the same format as the input results
         """
 
         # Parse query
         query = super().__call__(query)
 
+        # Columnar results
+        if isinstance(results, dict):
+            return self.columnar(query, results)
+
         # Check if this is a SQL query
         if "select" in query:
             # Get list of unique and aggregate columns. If no aggregate columns or order by found, skip
@@ -48,6 +64,40 @@ class Aggregate(SQL):
         # Otherwise, run default sort
         return self.defaultsort(results)
 
+    def columnar(self, query, results):
+        """
+        Analyzes columnar query results, combines aggregate function results and applies ordering. Rows are
+        grouped and ordered using row positions, values are only copied once into the final columns.
+
+        Args:
+            query: parsed query
+            results: query results as {column: [values]}
+
+        Returns:
+            aggregated query results as {column: [values]}
+        """
+
+        columns = list(results.keys())
+        size = len(results[columns[0]]) if columns else 0
+
+        # Check if this is a SQL query
+        if "select" in query and size:
+            # Merge aggregate columns
+            aggcolumns = self.aggcolumns(columns)
+            if aggcolumns:
+                results = self.aggregatecolumns(query, results, columns, aggcolumns)
+                size = len(results[columns[0]])
+
+            # Apply order by clause
+            if query["orderby"]:
+                return self.select(results, self.orderpositions(query, results, size))
+
+        # Otherwise, run default sort using score column, if present
+        if "score" in results:
+            return self.select(results, sorted(range(size), key=results["score"].__getitem__, reverse=True))
+
+        return results
+
     def aggcolumns(self, columns):
         """
         Filters columns for columns that have an aggregate function call.
@@ -132,6 +182,43 @@ class Aggregate(SQL):
 
         return [results]
 
+    def aggregatecolumns(self, query, results, columns, aggcolumns):
+        """
+        Merges aggregate columns in columnar results.
+
+        Args:
+            query: input query
+            results: query results as {column: [values]}
+            columns: list of select columns
+            aggcolumns: list of aggregate columns
+
+        Returns:
+            results with aggregates merged as {column: [values]}
+        """
+
+        # Group row positions, if necessary
+        positions = range(len(results[columns[0]]))
+        groupby = [column for column in columns if column.lower() in query["groupby"]] if query["groupby"] else None
+        if groupby:
+            keys = list(zip(*(results[column] for column in groupby)))
+            groups = [list(value) for _, value in itertools.groupby(sorted(positions, key=keys.__getitem__), keys.__getitem__)]
+        else:
+            groups = [positions]
+
+        # Compute column values
+        output = {}
+        for column in columns:
+            values = results[column]
+            if column in aggcolumns:
+                # Calculate aggregate value
+                function = aggcolumns[column]
+                output[column] = [function([values[x] for x in group]) for group in groups]
+            else:
+                # Non aggregate column value repeat, use first value
+                output[column] = [values[group[0]] for group in groups]
+
+        return output
+
     def orderby(self, query, results):
         """
         Applies an order by clause to results.
@@ -145,20 +232,74 @@ class Aggregate(SQL):
         """
 
         # Sort in reverse order
-        for clause in query["orderby"][::-1]:
-            # Order by columns must be selected
+        for clause, reverse in self.ordering(query)[::-1]:
+            # Order by columns must be in select clause
+            if clause in query["select"]:
+                results = sorted(results, key=operator.itemgetter(clause), reverse=reverse)
+
+        return results
+
+    def orderpositions(self, query, results, size):
+        """
+        Applies an order by clause to columnar results.
+
+        Args:
+            query: input query
+            results: query results as {column: [values]}
+            size: number of rows
+
+        Returns:
+            row positions ordered using order by clause
+        """
+
+        positions = range(size)
+
+        # Sort in reverse order
+        for clause, reverse in self.ordering(query)[::-1]:
+            # Order by columns must be in select clause
+            if clause in query["select"] and clause in results:
+                positions = sorted(positions, key=results[clause].__getitem__, reverse=reverse)
+
+        return list(positions)
+
+    def ordering(self, query):
+        """
+        Parses order by clauses.
+
+        Args:
+            query: parsed query
+
+        Returns:
+            list of (column, reverse)
+        """
+
+        ordering = []
+        for clause in query.get("orderby") or []:
+            # Parse sort direction
             reverse = False
             if clause.lower().endswith(" asc"):
-                clause = clause.rsplit(" ")[0]
+                clause = clause[:-4].strip()
             elif clause.lower().endswith(" desc"):
-                clause = clause.rsplit(" ")[0]
+                clause = clause[:-5].strip()
                 reverse = True
 
-            # Order by columns must be in select clause
-            if clause in query["select"]:
-                results = sorted(results, key=operator.itemgetter(clause), reverse=reverse)
+            ordering.append((clause, reverse))
 
-        return results
+        return ordering
+
+    def select(self, results, positions):
+        """
+        Selects rows from columnar results.
+
+        Args:
+            results: query results as {column: [values]}
+            positions: list of row positions to select
+
+        Returns:
+            selected rows as {column: [values]}
+        """
+
+        return {column: [values[x] for x in positions] for column, values in results.items()}
 
     def defaultsort(self, results):
         """
@@ -176,3 +317,309 @@ class Aggregate(SQL):
             return sorted(results, key=lambda x: x["score"], reverse=True)
 
         return results
+
+    def partial(self, query, limit=None):
+        """
+        Rewrites a query to run against each shard of a sharded index. Shard results are partial results that are
+        combined with the merge method.
+
+          - Averages also select a count, which lets shard averages be merged as a weighted average
+          - Limits are pushed down to shards when the final results only need the top rows of each shard
+
+        Args:
+            query: input query
+            limit: default maximum results
+
+        Returns:
+            query to run against each shard
+        """
+
+        # Parse query
+        parsed = super().__call__(query)
+
+        # Only SQL queries are rewritten
+        if "select" not in parsed:
+            return query
+
+        positions = self.positions(query)
+        functions = self.functions(parsed["select"])
+
+        # Select a count for each average
+        counts = [f"count({argument}) {Aggregate.AVGCOUNT}{x}" for x, (function, argument) in enumerate(functions) if function == "avg"]
+        if counts and "from" in positions:
+            start = positions["from"]
+            query = f"{query[:start].rstrip()}, {', '.join(counts)} {query[start:]}"
+            positions = self.positions(query)
+
+        # Limit can't be pushed down when it isn't a number (i.e. a bind parameter)
+        limit, offset = self.limit(parsed, limit)
+        if limit is None and (parsed["limit"] or parsed["offset"]):
+            return query
+
+        # Remove limit and offset clauses, the offset is applied when merging results
+        end = min((positions[x] for x in ("limit", "offset") if x in positions), default=len(query))
+        query = query[:end].rstrip()
+
+        # Shards return the top limit + offset rows
+        if not any(function for function, _ in functions):
+            return f"{query} limit {limit + offset}" if limit else query
+
+        # Grouped results can only be limited when ordered by group columns. Otherwise, the limit is removed and shards
+        # return up to the default request limit of groups. A larger SQL limit would also raise the number of similar
+        # query candidates selected on each shard.
+        if parsed["groupby"]:
+            ordering = self.ordering(parsed)
+            if limit and ordering and all(column.lower() in parsed["groupby"] for column, _ in ordering):
+                return f"{query} limit {limit + offset}"
+
+        # Aggregates without a group by clause return a single row
+        return query
+
+    def merge(self, query, results, limit=None, columnar=False):
+        """
+        Merges partial results from each shard into the final query results. Shard results must come from running the
+        query returned by the partial method.
+
+        Aggregate results are merged by group in a single pass. Other results are combined with a k-way merge of the
+        ordered shard results and only the top rows are read.
+
+        Args:
+            query: input query
+            results: list of partial results per shard
+            limit: default maximum results
+            columnar: shard results are {column: [values]} if True, results are returned in the same format
+
+        Returns:
+            merged query results
+        """
+
+        # Convert columnar results to rows
+        columns = next((list(result.keys() if columnar else result[0].keys()) for result in results if result), [])
+        if columnar:
+            results = [[dict(zip(result.keys(), row)) for row in zip(*result.values())] for result in results]
+
+        # Parse query
+        parsed = super().__call__(query)
+        functions = self.functions(parsed["select"]) if "select" in parsed else []
+
+        # Get final limit and offset
+        limit, offset = self.limit(parsed, limit) if "select" in parsed else (limit, 0)
+        offset = offset if offset else 0
+
+        if any(function for function, _ in functions):
+            # Merge aggregate groups and sort
+            rows = self.mergegroups(parsed, results, columns, functions)
+            rows = rows[offset : offset + limit] if limit else rows[offset:]
+        else:
+            # Merge ordered shard results
+            rows = list(itertools.islice(self.mergerows(parsed, results, columns), offset, offset + limit if limit else None))
+
+        # Convert rows to columns
+        if columnar:
+            columns = [column for column in columns if not column.startswith(Aggregate.AVGCOUNT)]
+            return {column: [row[column] for row in rows] for column in columns}
+
+        return rows
+
+    def mergegroups(self, query, results, columns, functions):
+        """
+        Merges partial aggregate results by group and sorts the merged groups.
+
+        Args:
+            query: parsed query
+            results: list of partial results per shard
+            columns: list of result columns
+            functions: list of (function, argument) per select column
+
+        Returns:
+            merged rows
+        """
+
+        # Aggregate result columns mapped to (function, average count column). Select columns come first in results.
+        aggregates = {
+            columns[x]: (function, f"{Aggregate.AVGCOUNT}{x}") for x, (function, _) in enumerate(functions) if function and x < len(columns)
+        }
+        groupby = [column for column in columns if column.lower() in query["groupby"]] if query["groupby"] else []
+
+        # Merge rows with the same group values
+        groups = {}
+        for row in itertools.chain(*results):
+            key = tuple(row[column] for column in groupby)
+            if key in groups:
+                group = groups[key]
+                for column, (function, count) in aggregates.items():
+                    group[column] = self.combine(function, group[column], row[column], group.get(count), row.get(count))
+                    if count in group:
+                        group[count] = (group[count] or 0) + (row.get(count) or 0)
+            else:
+                groups[key] = dict(row)
+
+        # Remove average count columns
+        rows = [{column: value for column, value in row.items() if not column.startswith(Aggregate.AVGCOUNT)} for row in groups.values()]
+
+        # Sort results using order by clause, group columns or default sort
+        if query["orderby"]:
+            return self.orderby(query, rows)
+
+        if groupby:
+            return sorted(rows, key=functools.cmp_to_key(self.comparator([(column, False) for column in groupby])))
+
+        return self.defaultsort(rows)
+
+    def mergerows(self, query, results, columns):
+        """
+        Runs a k-way merge of ordered shard results. Shards return results ordered by the order by clause or by score
+        descending when there is no order by clause.
+
+        Args:
+            query: parsed query
+            results: list of results per shard
+            columns: list of result columns
+
+        Returns:
+            iterator of merged rows
+        """
+
+        # Order by columns must be in results
+        ordering = [(column, reverse) for column, reverse in self.ordering(query) if column in columns]
+        if not ordering and not query.get("orderby") and "score" in columns:
+            ordering = [("score", True)]
+
+        if ordering:
+            return heapq.merge(*results, key=functools.cmp_to_key(self.comparator(ordering)))
+
+        return itertools.chain(*results)
+
+    def comparator(self, ordering):
+        """
+        Creates a comparison function for rows. Null values sort first.
+
+        Args:
+            ordering: list of (column, reverse)
+
+        Returns:
+            comparison function
+        """
+
+        def compare(x, y):
+            for column, reverse in ordering:
+                a, b = x[column], y[column]
+                if a != b:
+                    result = -1 if a is None or (b is not None and a < b) else 1
+                    return -result if reverse else result
+
+            return 0
+
+        return compare
+
+    def combine(self, function, x, y, xcount, ycount):
+        """
+        Combines two partial aggregate values.
+
+        Args:
+            function: aggregate function name
+            x: first value
+            y: second value
+            xcount: number of values aggregated in x, used for averages
+            ycount: number of values aggregated in y, used for averages
+
+        Returns:
+            combined value
+        """
+
+        # Aggregate functions ignore null values
+        if x is None or y is None:
+            return y if x is None else x
+
+        if function in ("count", "sum", "total"):
+            return x + y
+        if function == "min":
+            return min(x, y)
+        if function == "max":
+            return max(x, y)
+
+        # Weighted average, falls back to an unweighted average when counts aren't available
+        xcount, ycount = (xcount, ycount) if xcount and ycount else (1, 1)
+        return (x * xcount + y * ycount) / (xcount + ycount)
+
+    def functions(self, select):
+        """
+        Parses aggregate functions from select columns.
+
+        Args:
+            select: list of select columns
+
+        Returns:
+            list of (function name, function argument) per select column, (None, None) for other columns
+        """
+
+        functions = []
+        for column in select:
+            match = Aggregate.FUNCTION.match(column.strip())
+            if match and self.balanced(match.group(2)):
+                functions.append((match.group(1).lower(), match.group(2)))
+            else:
+                functions.append((None, None))
+
+        return functions
+
+    def balanced(self, text):
+        """
+        Checks if all parentheses in text are balanced.
+
+        Args:
+            text: input text
+
+        Returns:
+            True if parentheses are balanced
+        """
+
+        depth = 0
+        for char in text:
+            depth += 1 if char == "(" else -1 if char == ")" else 0
+            if depth < 0:
+                return False
+
+        return not depth
+
+    def limit(self, query, limit):
+        """
+        Gets the limit and offset for a query. Query limit and offset clauses take precedence over the default limit.
+
+        Args:
+            query: parsed query
+            limit: default maximum results
+
+        Returns:
+            (limit, offset), (None, None) if limit or offset aren't numbers
+        """
+
+        values = [clause[0].strip() if clause else None for clause in (query["limit"], query["offset"])]
+        if any(value and not value.isdigit() for value in values):
+            return (None, None)
+
+        qlimit, offset = values
+        return (int(qlimit) if qlimit else limit, int(offset) if offset else 0)
+
+    def positions(self, query):
+        """
+        Finds the positions of top level clause keywords in query text. Keywords in strings and sub-queries are skipped.
+
+        Args:
+            query: input query
+
+        Returns:
+            {clause: position}
+        """
+
+        positions, depth = {}, 0
+        for match in Aggregate.CLAUSES.finditer(query):
+            token = match.group().lower()
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif not depth and token[0] not in "'\"[":
+                positions.setdefault(" ".join(token.split()), match.start())
+
+        return positions
@@ -2,6 +2,7 @@
 SQL module
 """
 
+from functools import lru_cache
 from io import StringIO
 from shlex import shlex
 
@@ -16,18 +17,22 @@ class SQL:
     # List of clauses to parse
     CLAUSES = ["select", "from", "where", "group", "having", "order", "limit", "offset"]
 
-    def __init__(self, database=None, tolist=False):
+    def __init__(self, database=None, tolist=False, cachesize=None):
         """
         Creates a new SQL query parser.
 
         Args:
             database: database instance that provides resolver callback, if any
             tolist: outputs expression lists if True, expression text otherwise, defaults to False
+            cachesize: maximum number of parsed queries to cache, caching is disabled if not set
         """
 
         # Expression parser
         self.expression = Expression(database.resolve if database else self.defaultresolve, tolist)
 
+        # Least recently used cache of parsed queries
+        self.cache = lru_cache(maxsize=cachesize)(self.translate) if cachesize else None
+
     def __call__(self, query):
         """
         Parses an input SQL query and normalizes column names in the query clauses. This method will also embed
@@ -40,6 +45,24 @@ class SQL:
             {clause name: clause text}
         """
 
+        # Return a copy of cached clauses, callers modify parsed clauses
+        # pylint: disable=E1102
+        if self.cache and isinstance(query, str):
+            return self.copy(self.cache(query))
+
+        return self.translate(query)
+
+    def translate(self, query):
+        """
+        Parses an input SQL query into query clauses.
+
+        Args:
+            query: input query
+
+        Returns:
+            {clause name: clause text}
+        """
+
         clauses = None
         if self.issql(query):
             # Ignore multiple statements
@@ -69,6 +92,19 @@ class SQL:
         # Return clauses, default to full query if this is not a SQL query
         return clauses if clauses else {"similar": [[query]]}
 
+    def copy(self, clauses):
+        """
+        Copies parsed query clauses.
+
+        Args:
+            clauses: parsed query clauses
+
+        Returns:
+            copy of clauses
+        """
+
+        return {name: [list(x) if isinstance(x, list) else x for x in value] if isinstance(value, list) else value for name, value in clauses.items()}
+
     # pylint: disable=W0613
     def defaultresolve(self, name, alias=None):
         """
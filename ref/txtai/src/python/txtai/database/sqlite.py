@@ -2,20 +2,38 @@
 SQLite module
 """
 
+import logging
 import os
 import sqlite3
 
 from .embedded import Embedded
 
+# Logging configuration
+logger = logging.getLogger(__name__)
+
 
 class SQLite(Embedded):
     """
     Database instance backed by SQLite.
     """
 
+    # Number of pages copied per backup step
+    PAGES = 4096
+
+    # Approximate number of rows sampled per index when updating query planner statistics
+    SAMPLE = 1000
+
+    # Indexed document fields are stored as generated columns with an index
+    CREATE_FIELD = 'ALTER TABLE documents ADD COLUMN "%s" AS (%s) VIRTUAL'
+    CREATE_FIELD_INDEX = 'CREATE INDEX IF NOT EXISTS "documents_%s" ON documents("%s")'
+    SELECT_DOCUMENT_COLUMNS = "SELECT * FROM documents LIMIT 0"
+    ANALYZE = "ANALYZE"
+    ANALYSIS_LIMIT = "PRAGMA analysis_limit=%d"
+    EXPLAIN = "EXPLAIN QUERY PLAN %s"
+
     def connect(self, path=""):
-        # Create connection
-        connection = sqlite3.connect(path, check_same_thread=False)
+        # Create connection, size prepared statement cache to hold all cached query statements
+        connection = sqlite3.connect(path, check_same_thread=False, cached_statements=max(self.cachesize, 128))
 
         # Enable WAL mode, if necessary
         if self.setting("wal"):
@@ -37,6 +55,43 @@ class SQLite(Embedded):
             for name, argcount, fn in self.functions:
                 self.connection.create_function(name, argcount, fn)
 
+    def indexfields(self, create=True):
+        self.fields, fields = {}, self.config.get("indexed")
+        if fields:
+            # Get existing documents columns
+            self.cursor.execute(SQLite.SELECT_DOCUMENT_COLUMNS)
+            columns = {column[0] for column in self.cursor.description}
+
+            for field in fields:
+                # Column name for field
+                column = f"data.{field}"
+                identifier = column.replace('"', '""')
+
+                # Create generated column and index. Column values are computed with the same expression as unindexed fields.
+                if create and column not in columns:
+                    self.cursor.execute(SQLite.CREATE_FIELD % (identifier, self.jsoncolumn(field)))
+                    self.cursor.execute(SQLite.CREATE_FIELD_INDEX % (identifier, identifier))
+                    columns.add(column)
+
+                # Resolve field to column
+                if column in columns:
+                    self.fields[field] = f'd."{identifier}"'
+
+    def indexed(self, statement, parameters):
+        # Statement is resolved through indexes when the query plan has no table scans
+        statement = SQLite.EXPLAIN % statement
+        args = (statement, parameters) if parameters else (statement,)
+        self.execute(self.cursor.execute, *args)
+
+        return not any(row[-1].startswith("SCAN") for row in self.cursor)
+
+    def finalize(self):
+        # Update query planner statistics so filters on indexed fields use field indexes. Statistics are estimated
+        # from a sample of rows, which keeps the cost of each insert batch constant as the database grows.
+        if self.fields:
+            self.cursor.execute(SQLite.ANALYSIS_LIMIT % SQLite.SAMPLE)
+            self.cursor.execute(SQLite.ANALYZE)
+
     def copy(self, path):
         # Delete existing file, if necessary
         if os.path.exists(path):
@@ -45,13 +100,59 @@ class SQLite(Embedded):
         # Create database. Thread locking must be handled externally.
         connection = self.connect(path)
 
+        # Commit pending changes, the backup API can only copy committed pages
         if self.connection.in_transaction:
-            # The backup call will hang if there are uncommitted changes, need to copy over
-            # with iterdump (which is much slower)
+            self.connection.commit()
+
+        try:
+            # Copy database with the SQLite C API
+            self.connection.backup(connection, pages=SQLite.PAGES, progress=self.progress)
+        except sqlite3.OperationalError:
+            # Source database is locked by another connection, fallback to copying a snapshot
+            connection.close()
+            self.snapshot(path)
+            connection = self.connect(path)
+
+        return connection
+
+    def progress(self, status, remaining, total):
+        """
+        Backup progress callback. Logs progress for large databases.
+
+        Args:
+            status: SQLite status code of the last backup step
+            remaining: number of pages left to copy
+            total: total number of pages
+        """
+
+        # Backup is blocked by a lock on the source database (SQLITE_BUSY, SQLITE_LOCKED), stop backup
+        if status in (5, 6):
+            raise sqlite3.OperationalError("database is locked")
+
+        # Log progress when multiple backup steps are required
+        if total > SQLite.PAGES:
+            logger.info("Copied %d of %d database pages", total - remaining, total)
+
+    def snapshot(self, path):
+        """
+        Writes the current database, including uncommitted changes, to path.
+
+        Args:
+            path: path to write database
+        """
+
+        # Serialize database to a single in-memory image and write to path, requires Python 3.11+
+        if hasattr(self.connection, "serialize"):
+            with open(path, "wb") as output:
+                output.write(self.connection.serialize())
+
+        # Fallback to dumping each statement, which is much slower
+        else:
+            logger.warning("Copying database with uncommitted changes via iterdump, upgrade to Python 3.11+ for faster copies")
+
+            connection = self.connect(path)
             for sql in self.connection.iterdump():
                 connection.execute(sql)
-        else:
-            # Database is up to date, can do a more efficient copy with SQLite C API
-            self.connection.backup(connection)
 
-        return connection
+            connection.commit()
+            connection.close()
@@ -8,6 +8,9 @@ import os
 import shutil
 import tempfile
 
+from functools import partial
+from threading import RLock, Thread
+
 import numpy as np
 
 from ..ann import ANNFactory
@@ -81,12 +84,57 @@ class Embeddings:
         # Models cache
         self.models = models
 
+        # Component loaders for components that haven't been loaded yet
+        self.loaders = None
+
+        # Component loader thread locks - one lock guards the loaders and one lock per component guards loading
+        self.lock, self.locks = RLock(), None
+
         # Merge configuration into single dictionary
         config = {**config, **kwargs} if config and kwargs else kwargs if kwargs else config
 
         # Set initial configuration
         self.configure(config)
 
+    def __getattr__(self, name):
+        """
+        Loads a lazily loaded component on first use.
+
+        Args:
+            name: component name
+
+        Returns:
+            component
+        """
+
+        loaders, locks = self.__dict__.get("loaders"), self.__dict__.get("locks")
+        if not loaders or name not in loaders:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        # Only threads loading the same component wait on each other
+        with locks[name]:
+            # Component was loaded by another thread
+            if name in self.__dict__:
+                return self.__dict__[name]
+
+            # Component is currently loading in this thread
+            loader = loaders[name]
+            if not loader:
+                raise RuntimeError(f"Component '{name}' accessed while it is loading")
+
+            # Load component
+            loaders[name] = None
+            try:
+                component = loader()
+            except Exception:
+                loaders[name] = loader
+                raise
+
+            setattr(self, name, component)
+            del loaders[name]
+
+            return component
+
     def score(self, documents):
         """
         Builds a term weighting scoring index. Only used by word vectors models.
@@ -115,7 +163,7 @@ class Embeddings:
         transform = Transform(self, Action.REINDEX if reindex else Action.INDEX)
         stream = Stream(self, Action.REINDEX if reindex else Action.INDEX)
 
-        with tempfile.NamedTemporaryFile(mode="wb", suffix=".npy") as buffer:
+        with tempfile.NamedTemporaryFile(mode="w+b", suffix=".npy") as buffer:
             # Load documents into database and transform to vectors
             ids, dimensions, embeddings = transform(stream(documents), buffer)
             if embeddings is not None:
@@ -169,7 +217,7 @@ class Embeddings:
         transform = Transform(self, Action.UPSERT)
         stream = Stream(self, Action.UPSERT)
 
-        with tempfile.NamedTemporaryFile(mode="wb", suffix=".npy") as buffer:
+        with tempfile.NamedTemporaryFile(mode="w+b", suffix=".npy") as buffer:
             # Load documents into database and transform to vectors
             ids, _, embeddings = transform(stream(documents), buffer)
             if embeddings is not None:
@@ -182,7 +230,7 @@ class Embeddings:
 
             # Save indexids-ids mapping for indexes with no database
             if ids and not self.database:
-                self.ids = self.createids(self.ids + ids)
+                self.ids += ids
 
         # Scoring upsert, if necessary
         # This must occur before graph upsert in order to be available to the graph
@@ -226,12 +274,12 @@ class Embeddings:
             self.database.delete(deletes)
         elif self.ann or self.scoring:
             # Find existing ids
-            for uid in ids:
-                indices.extend([index for index, value in enumerate(self.ids) if uid == value])
+            for index, uid in self.ids.find(ids):
+                indices.append(index)
+                deletes.append(uid)
 
             # Clear embeddings ids
             for index in indices:
-                deletes.append(self.ids[index])
                 self.ids[index] = None
 
         # Delete indices for all indexes and data stores
@@ -342,12 +390,12 @@ class Embeddings:
         if self.database:
             return self.database.count()
         if self.ids:
-            return len([uid for uid in self.ids if uid is not None])
+            return self.ids.count()
 
         # Default to 0 when no suitable method found
         return 0
 
-    def search(self, query, limit=None, weights=None, index=None, parameters=None, graph=False):
+    def search(self, query, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
         """
         Finds documents most similar to the input query. This method will run either an index search
         or an index + database search depending on if a database is available.
@@ -359,17 +407,19 @@ class Embeddings:
             index: index name, if applicable
             parameters: dict of named parameters to bind to placeholders
             graph: return graph results if True
+            columnar: return results as {column: [values]} if True
 
         Returns:
             list of (id, score) for index search
             list of dict for an index + database search
             graph when graph is set to True
+            {column: [values]} when columnar is set to True
         """
 
-        results = self.batchsearch([query], limit, weights, index, [parameters], graph)
+        results = self.batchsearch([query], limit, weights, index, [parameters], graph, columnar)
         return results[0] if results else results
 
-    def batchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False):
+    def batchsearch(self, queries, limit=None, weights=None, index=None, parameters=None, graph=False, columnar=False):
         """
         Finds documents most similar to the input queries. This method will run either an index search
         or an index + database search depending on if a database is available.
@@ -381,18 +431,20 @@ class Embeddings:
             index: index name, if applicable
             parameters: list of dicts of named parameters to bind to placeholders
             graph: return graph results if True
+            columnar: return results as {column: [values]} per query if True
 
         Returns:
             list of (id, score) per query for index search
             list of dict per query for an index + database search
             list of graph per query when graph is set to True
+            list of {column: [values]} per query when columnar is set to True
         """
 
         # Determine if graphs should be returned
-        graph = graph if self.graph else False
+        graph = graph if graph and self.graph else False
 
         # Execute search
-        results = Search(self, indexids=graph)(queries, limit, weights, index, parameters)
+        results = Search(self, indexids=graph, columnar=columnar)(queries, limit, weights, index, parameters)
 
         # Create subgraphs using results, if necessary
         return [self.graph.filter(x) for x in results] if graph else results
@@ -547,46 +599,47 @@ class Embeddings:
         # Apply config overrides
         self.config = {**self.config, **config} if config else self.config
 
-        # Approximate nearest neighbor index - stores dense vectors
-        self.ann = self.createann()
-        if self.ann:
-            self.ann.load(f"{path}/embeddings")
-
-        # Dimensionality reduction model - word vectors only
-        if self.config.get("pca"):
-            self.reducer = Reducer()
-            self.reducer.load(f"{path}/lsa")
-
-        # Index ids when content is disabled
-        self.ids = self.createids()
-        if self.ids:
-            self.ids.load(f"{path}/ids")
-
-        # Document database - stores document content
-        self.database = self.createdatabase()
-        if self.database:
-            self.database.load(f"{path}/documents")
-
-        # Sparse vectors - stores term sparse arrays
-        self.scoring = self.createscoring()
-        if self.scoring:
-            self.scoring.load(f"{path}/scoring")
-
-        # Subindexes
-        self.indexes = self.createindexes()
-        if self.indexes:
-            self.indexes.load(f"{path}/indexes")
-
-        # Graph network - stores relationships
-        self.graph = self.creategraph()
-        if self.graph:
-            self.graph.load(f"{path}/graph")
-
-        # Dense vectors - transforms data to embeddings vectors
-        self.model = self.loadvectors()
-
-        # Query model
-        self.query = self.loadquery()
+        # Components in load order as (name, create method, component path)
+        components = [
+            # Approximate nearest neighbor index - stores dense vectors
+            ("ann", self.createann, "embeddings"),
+            # Dimensionality reduction model - word vectors only
+            ("reducer", self.createreducer, "lsa"),
+            # Index ids when content is disabled
+            ("ids", self.createids, "ids"),
+            # Document database - stores document content
+            ("database", self.createdatabase, "documents"),
+            # Sparse vectors - stores term sparse arrays
+            ("scoring", self.createscoring, "scoring"),
+            # Subindexes
+            ("indexes", self.createindexes, "indexes"),
+            # Graph network - stores relationships
+            ("graph", self.creategraph, "graph"),
+            # Dense vectors - transforms data to embeddings vectors
+            ("model", self.loadvectors, None),
+            # Query model
+            ("query", self.loadquery, None),
+        ]
+
+        if self.config.get("lazy"):
+            # Defer loading components until first use
+            with self.lock:
+                self.loaders, self.locks = {}, {}
+                for name, create, directory in components:
+                    self.__dict__.pop(name, None)
+                    self.loaders[name] = partial(self.loadcomponent, create, f"{path}/{directory}" if directory else None)
+                    self.locks[name] = RLock()
+
+            # Load components in a background thread, if enabled
+            prefetch = self.config.get("prefetch")
+            if prefetch:
+                names = [name for name, _, _ in components] if prefetch is True else prefetch
+                Thread(target=self.prefetch, args=(names,), daemon=True).start()
+        else:
+            # Load all components
+            self.loaders = None
+            for name, create, directory in components:
+                setattr(self, name, self.loadcomponent(create, f"{path}/{directory}" if directory else None))
 
     def save(self, path, cloud=None, **kwargs):
         """
@@ -657,6 +710,13 @@ class Embeddings:
         Closes this embeddings index and frees all resources.
         """
 
+        # Discard components that haven't been loaded
+        with self.lock:
+            for name in list(self.loaders) if self.loaders else []:
+                setattr(self, name, None)
+
+            self.loaders = None
+
         self.config, self.archive = None, None
         self.reducer, self.query, self.model, self.models = None, None, None, None
         self.ids = None
@@ -688,12 +748,16 @@ class Embeddings:
 
     def info(self):
         """
-        Prints the current embeddings index configuration.
+        Prints the current embeddings index configuration and database query cache metrics.
         """
 
         if self.config:
+            # Add database query cache metrics
+            metrics = self.database.metrics() if self.database else None
+            config = {**self.config, "metrics": {"database": metrics}} if metrics else self.config
+
             # Print configuration
-            print(json.dumps(self.config, sort_keys=True, default=str, indent=2))
+            print(json.dumps(config, sort_keys=True, default=str, indent=2))
 
     def issparse(self):
         """
@@ -903,6 +967,48 @@ class Embeddings:
 
         return None
 
+    def loadcomponent(self, create, path):
+        """
+        Creates a component and loads it from path.
+
+        Args:
+            create: component create method
+            path: component path, None if component is fully created from config
+
+        Returns:
+            component, if enabled in config
+        """
+
+        component = create()
+        if component and path:
+            component.load(path)
+
+        return component
+
+    def loaded(self, name):
+        """
+        Gets a component without loading it, if it is lazily loaded.
+
+        Args:
+            name: component name
+
+        Returns:
+            component, None if the component hasn't been loaded
+        """
+
+        return self.__dict__.get(name)
+
+    def prefetch(self, names):
+        """
+        Loads lazily loaded components. This method is run in a background thread when prefetch is enabled.
+
+        Args:
+            names: list of component names to load
+        """
+
+        for name in names:
+            getattr(self, name)
+
     def checkarchive(self, path):
         """
         Checks if path is an archive file.
@@ -958,9 +1064,10 @@ class Embeddings:
             new database, if enabled in config
         """
 
-        # Free existing database resources
-        if self.database:
-            self.database.close()
+        # Free existing database resources, a database that hasn't been loaded yet has no resources
+        database = self.loaded("database")
+        if database:
+            database.close()
 
         config = self.config.copy()
 
@@ -990,6 +1097,16 @@ class Embeddings:
 
         return None
 
+    def createreducer(self):
+        """
+        Creates a dimensionality reduction model from config.
+
+        Returns:
+            new reducer, if enabled in config
+        """
+
+        return Reducer() if self.config.get("pca") else None
+
     def createids(self, ids=None):
         """
         Creates indexids when content is disabled.
@@ -1032,9 +1149,10 @@ class Embeddings:
             new scoring, if enabled in config
         """
 
-        # Free existing resources
-        if self.scoring:
-            self.scoring.close()
+        # Free existing resources, a scoring that hasn't been loaded yet has no resources
+        scoring = self.loaded("scoring")
+        if scoring:
+            scoring.close()
 
         if "scoring" in self.config:
             # Expand scoring to a dictionary, if necessary
@@ -2,14 +2,22 @@
 IndexIds module
 """
 
+import hashlib
+import os
 import pickle
 
+import numpy as np
+
 from ...version import __pickle__
 
 
 class IndexIds:
     """
     Stores index ids when content is disabled.
+
+    Saved ids are stored in a columnar format. Integer ids are stored as an int64 array and string ids are stored as an offsets
+    array plus a UTF-8 data blob. Each format has a sorted array of lookup keys to support id lookups with a binary search. Arrays
+    are memory mapped on load. Ids added after loading are kept in memory along with a reverse index of id to internal index ids.
     """
 
     def __init__(self, embeddings, ids=None):
@@ -22,19 +30,77 @@ class IndexIds:
         """
 
         self.config = embeddings.config
-        self.ids = ids
+
+        # Stored ids loaded from disk, ids added since load, reverse index for ids added since load and deleted internal ids
+        self.stored, self.ids, self.index, self.deletes = None, [], {}, set()
+
+        if ids is not None:
+            self += ids
 
     def __iter__(self):
-        yield from self.ids
+        for x in range(self.length()):
+            yield self[x]
 
     def __getitem__(self, index):
-        return self.ids[index]
+        if index in self.deletes:
+            return None
+
+        size = self.size()
+        return self.value(index) if index < size else self.ids[index - size]
 
     def __setitem__(self, index, value):
-        self.ids[index] = value
+        # Stored ids are read-only, only deletes are supported
+        size = self.size()
+        if index < size and value is not None:
+            raise ValueError("Stored ids can only be deleted")
+
+        # Replace current value for ids added since load
+        if index >= size:
+            self.unlink(index, self.ids[index - size])
+            self.ids[index - size] = value
+
+        # Add internal index id for new value
+        self.link(index, value)
 
     def __add__(self, ids):
-        return self.ids + ids
+        return list(self) + ids
+
+    def __iadd__(self, ids):
+        # Append ids to end of list
+        for uid in ids:
+            self.ids.append(uid)
+            self.link(self.length() - 1, uid)
+
+        return self
+
+    def find(self, ids):
+        """
+        Finds internal index ids for a list of ids.
+
+        Args:
+            ids: list of ids
+
+        Returns:
+            list of (internal index id, id)
+        """
+
+        indices = []
+        for uid in ids:
+            # Search stored ids then ids added since load
+            matches = [index for index in self.search(uid) if index not in self.deletes] + self.index.get(uid, [])
+            indices.extend([(index, uid) for index in matches])
+
+        return indices
+
+    def count(self):
+        """
+        Number of ids that haven't been deleted.
+
+        Returns:
+            count
+        """
+
+        return self.length() - len(self.deletes)
 
     def load(self, path):
         """
@@ -44,13 +110,25 @@ class IndexIds:
             path: path to load
         """
 
+        self.stored, self.ids, self.index, self.deletes = None, [], {}, set()
+
         if "ids" in self.config:
-            # Legacy ids format
-            self.ids = self.config.pop("ids")
+            # Legacy config ids format
+            self += self.config.pop("ids")
+        elif os.path.exists(f"{path}/ids.pickle"):
+            # Ids that can't be stored in a columnar format are pickled and kept in memory
+            with open(f"{path}/ids.pickle", "rb") as handle:
+                self += pickle.load(handle)
+        elif os.path.isdir(path):
+            # Columnar ids format
+            self.stored = {name[:-4]: np.load(os.path.join(path, name), mmap_mode="r") for name in os.listdir(path) if name.endswith(".npy")}
+            self.deletes = set(self.stored.pop("deletes").tolist())
         else:
-            # Standard ids format
+            # Legacy pickled ids format
             with open(path, "rb") as handle:
-                self.ids = pickle.load(handle)
+                data = pickle.load(handle)
+
+            self += data["ids"] if isinstance(data, dict) else data
 
     def save(self, path):
         """
@@ -60,5 +138,222 @@ class IndexIds:
             path: path to save
         """
 
-        with open(path, "wb") as handle:
-            pickle.dump(self.ids, handle, protocol=__pickle__)
+        # Remove legacy ids file
+        if os.path.isfile(path):
+            os.remove(path)
+
+        os.makedirs(path, exist_ok=True)
+
+        # Build arrays
+        arrays = self.columns()
+
+        # Remove files from previous saves not part of this save
+        names = {"ids.pickle" if name == "list" else f"{name}.npy" for name in arrays}
+        for name in os.listdir(path):
+            if name not in names:
+                os.remove(os.path.join(path, name))
+
+        # Write arrays
+        for name, array in arrays.items():
+            if name == "list":
+                with open(f"{path}/ids.pickle", "wb") as handle:
+                    pickle.dump(array, handle, protocol=__pickle__)
+            else:
+                self.write(f"{path}/{name}.npy", array)
+
+    def length(self):
+        """
+        Number of internal index ids, including deleted ids.
+
+        Returns:
+            number of internal index ids
+        """
+
+        return self.size() + len(self.ids)
+
+    def size(self):
+        """
+        Number of stored ids.
+
+        Returns:
+            number of stored ids
+        """
+
+        if not self.stored:
+            return 0
+
+        return len(self.stored["ids"]) if "ids" in self.stored else len(self.stored["offsets"]) - 1
+
+    def value(self, index):
+        """
+        Gets a stored id.
+
+        Args:
+            index: internal index id
+
+        Returns:
+            id
+        """
+
+        if "ids" in self.stored:
+            return int(self.stored["ids"][index])
+
+        # Decode string from UTF-8 data blob
+        offsets = self.stored["offsets"]
+        return self.stored["data"][offsets[index] : offsets[index + 1]].tobytes().decode("utf-8")
+
+    def search(self, uid):
+        """
+        Searches stored ids for uid.
+
+        Args:
+            uid: id
+
+        Returns:
+            list of internal index ids
+        """
+
+        if not self.stored:
+            return []
+
+        # Get lookup key, ids with a different type than stored ids never match
+        key = self.key(uid, "ids" in self.stored)
+        if key is None:
+            return []
+
+        # Binary search sorted keys
+        keys, order = self.stored["keys"], self.stored["order"]
+        start, end = np.searchsorted(keys, key, side="left"), np.searchsorted(keys, key, side="right")
+
+        # Integer keys are exact, string keys are hashes that need to be confirmed
+        indices = order[start:end].tolist()
+        return indices if "ids" in self.stored else [index for index in indices if self.value(index) == uid]
+
+    def columns(self):
+        """
+        Builds columnar arrays for all ids.
+
+        Returns:
+            dict of name: array
+        """
+
+        # Deleted ids are stored as an empty value and tracked in the deletes array
+        deletes = np.array(sorted(self.deletes), dtype=np.int64)
+
+        # Columnar formats require all ids to have the same type
+        numeric = all(self.key(uid, True) is not None for uid in self.ids if uid is not None)
+        strings = all(isinstance(uid, str) for uid in self.ids if uid is not None)
+
+        # Start from stored arrays or empty arrays when there are no stored ids
+        stored = self.stored
+        if not stored and (numeric or strings):
+            stored = {"keys": np.zeros(0, dtype=np.int64), "order": np.zeros(0, dtype=np.int64)}
+            if numeric:
+                stored["ids"] = np.zeros(0, dtype=np.int64)
+            else:
+                stored.update({"offsets": np.zeros(1, dtype=np.int64), "data": np.zeros(0, dtype=np.uint8)})
+
+        # Append to arrays when all ids match the stored id type
+        if stored and ("ids" in stored and numeric or "offsets" in stored and strings):
+            return {**self.append(stored, "ids" in stored), "deletes": deletes}
+
+        # Fallback to a pickled list
+        return {"list": list(self)}
+
+    def append(self, stored, numeric):
+        """
+        Appends ids added since load to stored arrays.
+
+        Args:
+            stored: stored arrays
+            numeric: True if ids are integers, False if ids are strings
+
+        Returns:
+            dict of name: array
+        """
+
+        size, ids = self.size(), self.ids
+
+        if numeric:
+            # Integer ids are their own lookup key
+            keys = np.array([0 if uid is None else int(uid) for uid in ids], dtype=np.int64)
+            arrays = {"ids": np.concatenate((stored["ids"], keys))}
+        else:
+            # Encode strings to a UTF-8 data blob with offsets
+            data = [b"" if uid is None else uid.encode("utf-8") for uid in ids]
+            offsets = stored["offsets"][-1] + np.cumsum([len(x) for x in data], dtype=np.int64)
+            arrays = {
+                "offsets": np.concatenate((stored["offsets"], offsets)),
+                "data": np.concatenate((stored["data"], np.frombuffer(b"".join(data), dtype=np.uint8))),
+            }
+            keys = np.array([0 if uid is None else self.key(uid, False) for uid in ids], dtype=np.int64)
+
+        # Merge new keys into sorted lookup keys
+        keys = np.concatenate((stored["keys"], keys))
+        order = np.concatenate((stored["order"], np.arange(size, size + len(ids), dtype=np.int64)))
+        sort = np.argsort(keys, kind="stable")
+
+        return {**arrays, "keys": keys[sort], "order": order[sort]}
+
+    def key(self, uid, numeric):
+        """
+        Gets the lookup key for uid.
+
+        Args:
+            uid: id
+            numeric: True for integer ids, False for string ids
+
+        Returns:
+            int64 key or None if uid doesn't match the id type
+        """
+
+        if numeric:
+            return int(uid) if isinstance(uid, (int, np.integer)) and not isinstance(uid, bool) and -(2**63) <= uid < 2**63 else None
+
+        # 64-bit hash of UTF-8 string
+        return int.from_bytes(hashlib.blake2b(uid.encode("utf-8"), digest_size=8).digest(), "little", signed=True) if isinstance(uid, str) else None
+
+    def write(self, path, array):
+        """
+        Writes array to path. Data is written to a temporary file and then moved into place, keeping existing
+        memory mapped views of path valid.
+
+        Args:
+            path: output path
+            array: array to write
+        """
+
+        with open(f"{path}.tmp", "wb") as handle:
+            np.save(handle, array, allow_pickle=False)
+
+        os.replace(f"{path}.tmp", path)
+
+    def link(self, index, uid):
+        """
+        Adds an internal index id to the reverse index. None values mark deleted ids and aren't indexed.
+
+        Args:
+            index: internal index id
+            uid: id
+        """
+
+        if uid is None:
+            self.deletes.add(index)
+        else:
+            self.deletes.discard(index)
+            self.index.setdefault(uid, []).append(index)
+
+    def unlink(self, index, uid):
+        """
+        Removes an internal index id from the reverse index.
+
+        Args:
+            index: internal index id
+            uid: id
+        """
+
+        if uid is not None:
+            indices = self.index[uid]
+            indices.remove(index)
+            if not indices:
+                del self.index[uid]
@@ -2,9 +2,6 @@
 Transform module
 """
 
-import os
-import pickle
-
 import numpy as np
 
 from .action import Action
@@ -63,7 +60,7 @@ class Transform:
 
         Args:
             documents: iterable of (id, data, tags)
-            buffer: file path used for memmap buffer
+            buffer: open file used for memmap buffer
 
         Returns:
             (document ids, dimensions, embeddings)
@@ -85,14 +82,14 @@ class Transform:
 
         Args:
             documents: iterable of (id, data, tags)
-            buffer: file path used for memmap buffer
+            buffer: open file used for memmap buffer
 
         Returns:
             (document ids, dimensions, embeddings)
         """
 
-        # Consume stream and transform documents to vectors
-        ids, dimensions, batches, stream = self.model.index(self.stream(documents), self.batch)
+        # Consume stream and transform documents to vectors, vectors are written directly to buffer
+        ids, dimensions, _, _ = self.model.index(self.stream(documents), self.batch, buffer)
 
         # Check that embeddings are available and load as a memmap
         embeddings = None
@@ -100,17 +97,9 @@ class Transform:
             # Determine dtype
             dtype = np.uint8 if self.qbits else np.float32
 
-            # Write batches
-            embeddings = np.memmap(buffer, dtype=dtype, shape=(len(ids), dimensions), mode="w+")
-            with open(stream, "rb") as queue:
-                x = 0
-                for _ in range(batches):
-                    batch = pickle.load(queue)
-                    embeddings[x : x + batch.shape[0]] = batch
-                    x += batch.shape[0]
-
-        # Remove temporary file
-        os.remove(stream)
+            # Map buffer, no copy required
+            buffer.flush()
+            embeddings = np.memmap(buffer, dtype=dtype, shape=(len(ids), dimensions), mode="r+")
 
         return (ids, dimensions, embeddings)
 
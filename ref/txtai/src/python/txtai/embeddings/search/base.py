@@ -5,6 +5,7 @@ Search module
 import logging
 
 from .errors import IndexNotFoundError
+from .fusion import Fusion
 from .scan import Scan
 
 # Logging configuration
@@ -16,7 +17,7 @@ class Search:
     Executes a batch search action. A search can be both index and/or database driven.
     """
 
-    def __init__(self, embeddings, indexids=False, indexonly=False):
+    def __init__(self, embeddings, indexids=False, indexonly=False, columnar=False):
         """
         Creates a new search action.
 
@@ -24,20 +25,39 @@ class Search:
             embeddings: embeddings instance
             indexids: searches return indexids when True, otherwise run standard search
             indexonly: always runs an index search even when a database is available
+            columnar: searches return {column: [values]} per query when True, ignored when searches return indexids
         """
 
         self.embeddings = embeddings
         self.indexids = indexids or indexonly
         self.indexonly = indexonly
+        self.columnar = columnar and not self.indexids
 
         # Alias embeddings attributes
-        self.ann = embeddings.ann
         self.batchtransform = embeddings.batchtransform
-        self.database = embeddings.database
-        self.ids = embeddings.ids
-        self.indexes = embeddings.indexes
-        self.query = embeddings.query
-        self.scoring = embeddings.scoring if embeddings.issparse() else None
+
+    def __getattr__(self, name):
+        """
+        Aliases embeddings components on first use. This keeps components not used by a search from being loaded
+        when embeddings components are lazily loaded.
+
+        Args:
+            name: component name
+
+        Returns:
+            component
+        """
+
+        if name in ("ann", "database", "ids", "indexes", "query"):
+            component = getattr(self.embeddings, name)
+        elif name == "scoring":
+            component = self.embeddings.scoring if self.embeddings.issparse() else None
+        else:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        # Cache alias
+        setattr(self, name, component)
+        return component
 
     def __call__(self, queries, limit=None, weights=None, index=None, parameters=None):
         """
@@ -53,6 +73,7 @@ class Search:
 
         Returns:
             list of (id, score) per query for index search, list of dict per query for an index + database search
+            {column: [values]} per query when columnar is True
         """
 
         # Default input parameters
@@ -60,21 +81,23 @@ class Search:
         weights = weights if weights is not None else 0.5
 
         # Return empty results if there is no database and indexes
-        if not self.ann and not self.scoring and not self.indexes and not self.database:
-            return [[]] * len(queries)
-
-        # Default index name if only subindexes set
-        if not index and not self.ann and not self.scoring and self.indexes:
-            index = self.indexes.default()
+        if not self.database and not self.ann and not self.scoring and not self.indexes:
+            return [{"id": [], "score": []} for _ in queries] if self.columnar else [[]] * len(queries)
 
         # Database search
         if not self.indexonly and self.database:
             return self.dbsearch(queries, limit, weights, index, parameters)
 
         # Default vector index query (sparse, dense or hybrid)
-        return self.search(queries, limit, weights, index)
+        results = self.search(queries, limit, weights, index)
+
+        # Map (id, score) results to columns, if necessary
+        if self.columnar:
+            return [{"id": [uid for uid, _ in result], "score": [float(score) for _, score in result]} for result in results]
+
+        return results
 
-    def search(self, queries, limit, weights, index):
+    def search(self, queries, limit, weights, index, ids=None):
         """
         Executes an index search. When only a sparse index is enabled, this is a a keyword search. When only
         a dense index is enabled, this is an ann search. When both are enabled, this is a hybrid search.
@@ -86,18 +109,23 @@ class Search:
             limit: maximum results
             weights: hybrid score weights
             index: index name
+            ids: list of allowed index ids, searches all index ids when None
 
         Returns:
             list of (id, score) per query
         """
 
+        # Default index name if only subindexes set
+        if not index and not self.ann and not self.scoring and self.indexes:
+            index = self.indexes.default()
+
         # Run against specified subindex
         if index:
             return self.subindex(queries, limit, weights, index)
 
         # Run against base index
-        dense = self.dense(queries, limit) if self.ann else None
-        sparse = self.sparse(queries, limit) if self.scoring else None
+        dense = self.dense(queries, limit, ids) if self.ann else None
+        sparse = self.sparse(queries, limit, ids) if self.scoring else None
 
         # Combine scores together
         if dense and sparse:
@@ -105,34 +133,18 @@ class Search:
             if isinstance(weights, (int, float)):
                 weights = [weights, 1 - weights]
 
-            # Create weighted scores
-            results = []
-            for vectors in zip(dense, sparse):
-                uids = {}
-                for v, scores in enumerate(vectors):
-                    for r, (uid, score) in enumerate(scores if weights[v] > 0 else []):
-                        # Initialize score
-                        if uid not in uids:
-                            uids[uid] = 0.0
-
-                        # Create hybrid score
-                        #  - Convex Combination when sparse scores are normalized
-                        #  - Reciprocal Rank Fusion (RRF) when sparse scores aren't normalized
-                        if self.scoring.isnormalized():
-                            uids[uid] += score * weights[v]
-                        else:
-                            uids[uid] += (1.0 / (r + 1)) * weights[v]
-
-                results.append(sorted(uids.items(), key=lambda x: x[1], reverse=True)[:limit])
-
-            return results
+            # Create hybrid scores
+            #  - Convex Combination when sparse scores are normalized
+            #  - Reciprocal Rank Fusion (RRF) when sparse scores aren't normalized
+            method = self.embeddings.config.get("fusion", "convex" if self.scoring.isnormalized() else "rrf")
+            return self.resolve(Fusion(method, weights)([dense, sparse], limit))
 
         # Raise an error if when no indexes are available
         if not sparse and not dense:
             raise IndexNotFoundError("No indexes available")
 
-        # Return single query results
-        return dense if dense else sparse
+        # Return single query results, filtered sparse results are limited here
+        return self.resolve(dense if dense else [r[:limit] for r in sparse])
 
     def subindex(self, queries, limit, weights, index):
         """
@@ -156,13 +168,14 @@ class Search:
         results = self.indexes[index].batchsearch(queries, limit, weights)
         return self.resolve(results)
 
-    def dense(self, queries, limit):
+    def dense(self, queries, limit, ids=None):
         """
         Executes an dense vector search with an approximate nearest neighbor index.
 
         Args:
             queries: list of queries
             limit: maximum results
+            ids: list of allowed index ids, searches all index ids when None
 
         Returns:
             list of (id, score) per query
@@ -171,28 +184,32 @@ class Search:
         # Convert queries to embedding vectors
         embeddings = self.batchtransform((None, query, None) for query in queries)
 
-        # Search approximate nearest neighbor index
-        results = self.ann.search(embeddings, limit)
+        # Search approximate nearest neighbor index, filter pushed down to the index when allowed ids are set
+        results = self.ann.search(embeddings, limit) if ids is None else self.ann.filtersearch(embeddings, limit, ids)
 
         # Require scores to be greater than 0
-        results = [[(i, score) for i, score in r if score > 0] for r in results]
+        return [[(i, score) for i, score in r if score > 0] for r in results]
 
-        return self.resolve(results)
-
-    def sparse(self, queries, limit):
+    def sparse(self, queries, limit, ids=None):
         """
         Executes a sparse vector search with a term frequency sparse array.
 
         Args:
             queries: list of queries
             limit: maximum results
+            ids: list of allowed index ids, searches all index ids when None
 
         Returns:
-            list of (id, score) per query
+            list of (id, score) per query, filtered results aren't limited so that hybrid scores are fused before limiting
         """
 
         # Search term frequency sparse index
-        return self.resolve(self.scoring.batchsearch(queries, limit))
+        if ids is None:
+            return self.scoring.batchsearch(queries, limit)
+
+        # Sparse indexes don't support filters, search extra candidates and keep allowed ids
+        allowed = set(ids)
+        return [[(i, score) for i, score in r if i in allowed] for r in self.scoring.batchsearch(queries, limit * 10)]
 
     def resolve(self, results):
         """
@@ -232,19 +249,45 @@ class Search:
         # Override limit with query limit, if applicable
         limit = max(limit, self.limit(queries))
 
+        # Resolve allowed index ids for query filters when filter push-down is enabled
+        filters = self.filters(queries, parameters) if self.embeddings.config.get("filter") and self.ann else None
+
         # Bulk index scan
-        scan = Scan(self.search, limit, weights, index)(queries, parameters)
+        scan = Scan(self.search, limit, weights, index, bool(self.ann and self.scoring))(queries, parameters, filters)
+
+        # Group index search results by query
+        similarity = [[] for _ in queries]
+        for x, result in scan:
+            similarity[x].append(result)
 
         # Combine index search results with database search results
-        results = []
+        return self.database.batchsearch(queries, similarity, limit, parameters, self.indexids, self.columnar)
+
+    def filters(self, queries, parameters):
+        """
+        Resolves allowed index ids for each query with a filtering clause. Queries with the same filter share the
+        same list of allowed index ids.
+
+        Args:
+            queries: list of parsed queries
+            parameters: list of dicts of named parameters to bind to placeholders
+
+        Returns:
+            list of allowed index ids per query, None for queries that can't be filtered before an index search
+        """
+
+        cache, filters = {}, []
         for x, query in enumerate(queries):
-            # Run the database query, get matching bulk searches for current query
-            result = self.database.search(
-                query, [r for y, r in scan if x == y], limit, parameters[x] if parameters and parameters[x] else None, self.indexids
-            )
-            results.append(result)
+            params = parameters[x] if parameters else None
 
-        return results
+            # Resolve filter once per unique where clause and bind parameters
+            key = (query.get("where"), repr(sorted(params.items())) if params else None)
+            if key not in cache:
+                cache[key] = self.database.filter(query, params)
+
+            filters.append(cache[key])
+
+        return filters
 
     def parse(self, queries):
         """
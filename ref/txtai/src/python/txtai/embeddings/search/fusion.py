@@ -0,0 +1,140 @@
+"""
+Fusion module
+"""
+
+import numpy as np
+
+
+class Fusion:
+    """
+    Combines scores from multiple indexes into a single hybrid score. Results for a batch of queries are flattened into
+    arrays of (query id, index, id, score, rank) and fused together with vectorized operations.
+
+    The following fusion methods are supported:
+
+      - rrf: Reciprocal Rank Fusion (RRF), weighted sum of 1 / (rank + 1)
+      - convex: Convex Combination, weighted sum of scores
+      - dbsf: Distribution-Based Score Fusion (DBSF), weighted sum of scores normalized to [0, 1] using the mean +/- 3 standard
+              deviations of the scores for each query and index
+    """
+
+    def __init__(self, method, weights):
+        """
+        Creates a new fusion instance.
+
+        Args:
+            method: fusion method - rrf, convex or dbsf
+            weights: list of weights, one per index
+        """
+
+        if method not in ("rrf", "convex", "dbsf"):
+            raise ValueError(f"Unsupported fusion method: {method}")
+
+        self.method = method
+        self.weights = weights
+
+    def __call__(self, results, limit):
+        """
+        Fuses results from multiple indexes.
+
+        Args:
+            results: list of results per index, each is a list of (id, score) per query
+            limit: maximum results
+
+        Returns:
+            list of (id, score) per query
+        """
+
+        # Number of queries
+        size = len(results[0])
+
+        # Flatten results to arrays
+        qids, sources, ids, scores, ranks = self.flatten(results)
+        if not ids.size:
+            return [[] for _ in range(size)]
+
+        # Calculate score for each result
+        weights = np.array(self.weights, dtype=np.float64)[sources]
+        if self.method == "rrf":
+            values = weights / (ranks + 1)
+        elif self.method == "dbsf":
+            values = weights * self.normalize(qids * len(results) + sources, scores)
+        else:
+            values = weights * scores
+
+        # Group results by (query id, id) and sum scores
+        keys = qids * (int(ids.max()) + 1) + ids
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        fused = np.bincount(inverse.reshape(-1), weights=values)
+        qids, ids = qids[first], ids[first]
+
+        # Sort by query id, then score descending. Ties are ordered by first occurrence.
+        order = np.lexsort((first, -fused, qids))
+        qids, ids, fused = qids[order], ids[order], fused[order]
+
+        # Split into top results per query
+        bounds = np.searchsorted(qids, np.arange(size + 1))
+        return [
+            list(zip(ids[start : min(start + limit, end)].tolist(), fused[start : min(start + limit, end)].tolist()))
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def flatten(self, results):
+        """
+        Flattens results into arrays. Results from indexes with a weight of 0 are skipped.
+
+        Args:
+            results: list of results per index, each is a list of (id, score) per query
+
+        Returns:
+            (query ids, index ids, ids, scores, ranks)
+        """
+
+        # Result lengths per (query, index) and concatenated results
+        lengths, rows = [], []
+        for query in zip(*results):
+            for v, result in enumerate(query):
+                result = result if self.weights[v] > 0 else []
+                lengths.append(len(result))
+                rows.extend(result)
+
+        if not rows:
+            return (np.zeros(0, dtype=np.int64),) * 5
+
+        # Query and index ids for each result
+        lengths = np.array(lengths, dtype=np.int64)
+        groups = np.repeat(np.arange(len(lengths)), lengths)
+        qids, sources = groups // len(results), groups % len(results)
+
+        # Rank of each result within its (query, index) group
+        ranks = np.arange(len(rows)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        # Split rows into ids and scores
+        ids = np.fromiter((uid for uid, _ in rows), dtype=np.int64, count=len(rows))
+        scores = np.fromiter((score for _, score in rows), dtype=np.float64, count=len(rows))
+
+        return qids, sources, ids, scores, ranks
+
+    def normalize(self, groups, scores):
+        """
+        Normalizes scores with the distribution of scores in each group. Scores are scaled from [mean - 3 * std, mean + 3 * std]
+        to [0, 1]. Groups with a single distinct score are set to 1.
+
+        Args:
+            groups: group id for each score
+            scores: scores
+
+        Returns:
+            normalized scores
+        """
+
+        # Mean and standard deviation of each group
+        counts = np.maximum(np.bincount(groups), 1)
+        mean = np.bincount(groups, weights=scores) / counts
+        std = np.sqrt(np.bincount(groups, weights=(scores - mean[groups]) ** 2) / counts)
+
+        # Scale scores using group distribution limits
+        low, scale = (mean - 3 * std)[groups], (6 * std)[groups]
+        normalized = np.divide(scores - low, scale, out=np.ones(len(scores)), where=scale > 0)
+
+        return np.clip(normalized, 0.0, 1.0)
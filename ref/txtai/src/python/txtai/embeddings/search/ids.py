@@ -53,9 +53,5 @@ class Ids:
             internal ids
         """
 
-        # Find existing ids
-        indices = []
-        for uid in ids:
-            indices.extend([(index, value) for index, value in enumerate(self.ids) if uid == value])
-
-        return indices
+        # Find existing ids using reverse index
+        return self.ids.find(ids)
@@ -8,7 +8,7 @@ class Scan:
     Scans indexes for query matches.
     """
 
-    def __init__(self, search, limit, weights, index):
+    def __init__(self, search, limit, weights, index, hybrid=False):
         """
         Creates a new scan instance.
 
@@ -17,6 +17,7 @@ class Scan:
             limit: maximum results
             weights: default hybrid score weights
             index: default index name
+            hybrid: True if the base index is a hybrid index
         """
 
         # Index search function
@@ -34,13 +35,17 @@ class Scan:
         # Default index
         self.index = index
 
-    def __call__(self, queries, parameters):
+        # Hybrid index flag
+        self.hybrid = hybrid
+
+    def __call__(self, queries, parameters, filters=None):
         """
         Executes a scan for a list of queries.
 
         Args:
             queries: list of queries to run
             parameters: list of dicts of named parameters to bind to placeholders
+            filters: list of allowed index ids per query, None entries run unfiltered
 
         Returns:
             list of (id, score) per query
@@ -54,24 +59,28 @@ class Scan:
 
         # Group by index and run
         for index, iqueries in self.parse(queries, parameters).items():
-            # Query limit to pass to batch search
-            candidates = [query.candidates for query in iqueries if query.candidates]
-            if not candidates and not default:
-                default = self.default(queries)
+            # Index to run query against
+            index = index if index else self.index
 
-            candidates = max(candidates) if candidates else default
+            # Group by query filter, filters only apply to the base index
+            for ids, fqueries in self.filter(iqueries, None if index else filters):
+                # Query limit to pass to batch search. Filtered searches only return matching rows, default to the query limit.
+                # Filtered hybrid searches keep the default, scores are fused across the top candidates of each index.
+                limited = ids is not None and not self.hybrid
+                candidates = [query.candidates for query in fqueries if query.candidates]
+                if not candidates and not limited and not default:
+                    default = self.default(queries)
 
-            # Query weights to pass to batch search
-            weights = [query.weights for query in iqueries if query.weights is not None]
-            weights = max(weights) if weights else self.weights
+                candidates = max(candidates) if candidates else self.limit if limited else default
 
-            # Index to run query against
-            index = index if index else self.index
+                # Query weights to pass to batch search
+                weights = [query.weights for query in fqueries if query.weights is not None]
+                weights = max(weights) if weights else self.weights
 
-            # Run index searches
-            for x, result in enumerate(self.search([query.text for query in iqueries], candidates, weights, index)):
-                # Save query id and results to later join to original query
-                results[iqueries[x].uid] = (iqueries[x].qid, result)
+                # Run index searches
+                for x, result in enumerate(self.search([query.text for query in fqueries], candidates, weights, index, ids)):
+                    # Save query id and results to later join to original query
+                    results[fqueries[x].uid] = (fqueries[x].qid, result)
 
         # Sort by query uid and return results
         return [result for _, result in sorted(results.items())]
@@ -110,6 +119,26 @@ class Scan:
 
         return results
 
+    def filter(self, clauses, filters):
+        """
+        Groups query clauses by the filter of the query they are a part of. Queries with the same filter share
+        the same list of allowed index ids.
+
+        Args:
+            clauses: list of query clauses
+            filters: list of allowed index ids per query
+
+        Returns:
+            list of (allowed index ids, query clauses)
+        """
+
+        groups = {}
+        for clause in clauses:
+            ids = filters[clause.qid] if filters else None
+            groups.setdefault(id(ids), (ids, []))[1].append(clause)
+
+        return list(groups.values())
+
     def bind(self, similar, parameters):
         """
         Resolves bind parameters for a similar function call.
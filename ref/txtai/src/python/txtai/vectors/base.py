@@ -2,13 +2,11 @@
 Vectors module
 """
 
-import pickle
+import contextlib
 import tempfile
 
 import numpy as np
 
-from ..version import __pickle__
-
 
 class Vectors:
     """
@@ -101,23 +99,27 @@ class Vectors:
 
         return model
 
-    def index(self, documents, batchsize=500):
+    def index(self, documents, batchsize=500, buffer=None):
         """
-        Converts a list of documents to a temporary file with embeddings arrays. Returns a tuple of document ids,
-        number of dimensions and temporary file with embeddings.
+        Converts a list of documents to a file with embeddings arrays. Returns a tuple of document ids,
+        number of dimensions, number of batches and the file with embeddings.
+
+        Embeddings are written as raw row-major data with no header. This file can be directly memory mapped with
+        shape (len(ids), dimensions) and dtype uint8 for quantized vectors and float32 otherwise.
 
         Args:
             documents: list of (id, data, tags)
             batchsize: index batch size
+            buffer: optional open file to write embeddings, defaults to a new temporary file
 
         Returns:
-            (ids, dimensions, stream)
+            (ids, dimensions, batches, stream)
         """
 
         ids, dimensions, batches, stream = [], None, 0, None
 
         # Convert all documents to embedding arrays, stream embeddings to disk to control memory usage
-        with tempfile.NamedTemporaryFile(mode="wb", suffix=".npy", delete=False) as output:
+        with self.output(buffer) as output:
             stream = output.name
             batch = []
             for document in documents:
@@ -195,10 +197,35 @@ class Vectors:
         embeddings = self.vectorize(documents)
         if embeddings is not None:
             dimensions = embeddings.shape[1]
-            pickle.dump(embeddings, output, protocol=__pickle__)
+            self.write(embeddings, output)
 
         return (ids, dimensions)
 
+    def output(self, buffer):
+        """
+        Gets the output file for an index operation.
+
+        Args:
+            buffer: open file to write embeddings, if None a new temporary file is created
+
+        Returns:
+            file context manager
+        """
+
+        # Callers that pass a buffer own it, don't close it
+        return contextlib.nullcontext(buffer) if buffer else tempfile.NamedTemporaryFile(mode="wb", suffix=".npy", delete=False)
+
+    def write(self, embeddings, output):
+        """
+        Appends an embeddings batch to output as raw data.
+
+        Args:
+            embeddings: embeddings batch
+            output: output file
+        """
+
+        output.write(np.ascontiguousarray(embeddings, dtype=np.uint8 if self.qbits else np.float32).tobytes())
+
     def prepare(self, data, category=None):
         """
         Prepares input data for vector model.
@@ -4,8 +4,6 @@ Word Vectors module
 
 import logging
 import os
-import pickle
-import tempfile
 
 from errno import ENOENT
 from multiprocessing import Pool
@@ -22,7 +20,6 @@ except ImportError:
     WORDS = False
 
 from ..pipeline import Tokenizer
-from ..version import __pickle__
 
 from .base import Vectors
 
@@ -99,10 +96,10 @@ class WordVectors(Vectors):
 
         return np.array(embeddings, dtype=np.float32)
 
-    def index(self, documents, batchsize=1):
+    def index(self, documents, batchsize=1, buffer=None):
         # Use default single process indexing logic
         if "parallel" in self.config and not self.config["parallel"]:
-            return super().index(documents, batchsize)
+            return super().index(documents, batchsize, buffer)
 
         # Customize indexing logic with multiprocessing pool to efficiently build vectors
         ids, dimensions, batches, stream = [], None, 0, None
@@ -112,7 +109,7 @@ class WordVectors(Vectors):
 
         # Convert all documents to embedding arrays, stream embeddings to disk to control memory usage
         with Pool(os.cpu_count(), initializer=create, initargs=args) as pool:
-            with tempfile.NamedTemporaryFile(mode="wb", suffix=".npy", delete=False) as output:
+            with self.output(buffer) as output:
                 stream = output.name
                 embeddings = []
                 for uid, embedding in pool.imap(transform, documents):
@@ -124,14 +121,14 @@ class WordVectors(Vectors):
                     embeddings.append(embedding)
 
                     if len(embeddings) == batchsize:
-                        pickle.dump(np.array(embeddings, dtype=np.float32), output, protocol=__pickle__)
+                        self.write(np.array(embeddings, dtype=np.float32), output)
                         batches += 1
 
                         embeddings = []
 
                 # Final embeddings batch
                 if embeddings:
-                    pickle.dump(np.array(embeddings, dtype=np.float32), output, protocol=__pickle__)
+                    self.write(np.array(embeddings, dtype=np.float32), output)
                     batches += 1
 
         return (ids, dimensions, batches, stream)
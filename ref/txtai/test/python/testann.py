@@ -3,6 +3,7 @@ ANN module tests
 """
 
 import os
+import pickle
 import tempfile
 import unittest
 
@@ -10,9 +11,11 @@ from unittest.mock import patch
 
 import numpy as np
 
-from txtai.ann import ANNFactory, ANN
+from txtai.ann import ANNFactory, ANN, NumPy
+from txtai.version import __pickle__
 
 
+# pylint: disable=R0904
 class TestANN(unittest.TestCase):
     """
     ANN tests.
@@ -33,6 +36,26 @@ class TestANN(unittest.TestCase):
         # Test with custom settings
         self.runTests("annoy", {"annoy": {"ntrees": 2, "searchk": 1}}, False)
 
+    def testCompact(self):
+        """
+        Test compacting indexes with deleted elements
+        """
+
+        for name in ["numpy", "torch", "hnsw"]:
+            # Delete enough rows to trigger compaction. HNSW uses a fixed seed and a wider search so the exact match is found.
+            params = {"compact": 0.1, "efsearch": 200, "randomseed": 0} if name == "hnsw" else {"compact": 0.1}
+            model = self.delete(name, {name: params}, list(range(2000)))
+            self.assertEqual(model.count(), 8000)
+            self.assertEqual(model.config["deletes"], 0)
+
+            # Ids are preserved after compaction, first array row is now id 2000
+            query = model.backend[0:1] if name != "hnsw" else model.backend.get_items([2000])
+            self.assertEqual(model.search(np.array(query), 1)[0][0][0], 2000)
+
+            # Deleting an id already deleted has no effect
+            model.delete([0, 2000])
+            self.assertEqual(model.count(), 7999)
+
     def testCustomBackend(self):
         """
         Test resolving a custom backend
@@ -73,6 +96,36 @@ class TestANN(unittest.TestCase):
         # Test to with mmap enabled
         self.runTests("faiss", {"faiss": {"mmap": True}}, False)
 
+    def testFilter(self):
+        """
+        Test searching with an allow list of ids
+        """
+
+        allowed = list(range(5, 10000, 100))
+        for name in ["annoy", "faiss", "hnsw", "numpy", "torch"]:
+            model = self.backend(name)
+
+            # Results only include allowed ids
+            results = model.filtersearch(np.random.rand(2, 300).astype(np.float32), 10, allowed)
+            self.assertEqual([len(result) for result in results], [10, 10])
+            self.assertTrue(all(uid in allowed for result in results for uid, _ in result))
+
+        # Filtered search on a flat index returns the top allowed ids
+        model = self.backend("numpy")
+        query = model.backend[5:6]
+        ids = np.argsort(-np.dot(query, model.backend[allowed].T), kind="stable")[0, :10]
+        self.assertEqual([uid for uid, _ in model.filtersearch(query, 10, allowed)[0]], [allowed[x] for x in ids])
+
+        # Empty allow list
+        self.assertEqual(model.filtersearch(query, 10, []), [[]])
+
+        # Filtered search on compacted indexes
+        for name in ["numpy", "torch"]:
+            model = self.delete(name, {name: {"compact": 0.1}}, list(range(2000)))
+            results = model.filtersearch(model.numpy(model.backend[1000:1001]), 3, [1500, 3000, 3001, 4000])
+            self.assertEqual(len(results[0]), 3)
+            self.assertEqual(results[0][0][0], 3000)
+
     def testHnsw(self):
         """
         Test Hnswlib backend
@@ -88,6 +141,20 @@ class TestANN(unittest.TestCase):
         # Test with custom settings
         self.runTests("hnsw", {"hnsw": {"efconstruction": 100, "m": 4, "randomseed": 0, "efsearch": 5}})
 
+    def testHnswReplaceDeleted(self):
+        """
+        Test Hnswlib backend reusing deleted slots
+        """
+
+        self.runTests("hnsw", {"hnsw": {"replacedeleted": True}})
+
+        # Deleted slots are reused by new elements
+        model = self.delete("hnsw", {"hnsw": {"replacedeleted": True}}, list(range(100)))
+        model.append(np.random.rand(150, 300).astype(np.float32))
+
+        self.assertEqual(model.count(), 10050)
+        self.assertEqual(model.backend.get_current_count(), 10050)
+
     def testNotImplemented(self):
         """
         Test exceptions for non-implemented methods
@@ -110,6 +177,167 @@ class TestANN(unittest.TestCase):
 
         self.runTests("numpy")
 
+    def testNumPyCustom(self):
+        """
+        Test NumPy backend with custom settings
+        """
+
+        # Test with small block size
+        self.runTests("numpy", {"numpy": {"blocksize": 1000}})
+
+        # Blocked search returns the same results as a full sort
+        model = self.backend("numpy", {"numpy": {"blocksize": 999}})
+        query = model.backend[:5]
+
+        ids = np.argsort(-np.dot(query, model.backend.T), kind="stable")[:, :10]
+        self.assertEqual([[uid for uid, _ in result] for result in model.search(query, 10)], ids.tolist())
+
+    def testNumPyConvert(self):
+        """
+        Test converting a legacy pickled NumPy index
+        """
+
+        model = self.backend("numpy")
+
+        # Generate temp file path
+        index = os.path.join(tempfile.gettempdir(), "ann.pickle")
+
+        # Write legacy pickle format
+        with open(index, "wb") as handle:
+            pickle.dump(model.backend, handle, protocol=__pickle__)
+
+        # Legacy format loads
+        model.load(index)
+        self.assertEqual(model.count(), 10000)
+
+        # Convert to native format and validate
+        self.assertTrue(NumPy.convert(index))
+        self.assertFalse(NumPy.convert(index))
+        self.assertTrue(NumPy.isnumpy(index))
+
+        model.load(index)
+        self.assertEqual(model.count(), 10000)
+
+    def testNumPyLegacy(self):
+        """
+        Test updating a legacy pickled index
+        """
+
+        for name in ["numpy", "torch"]:
+            model = self.backend(name)
+
+            # Generate temp file path
+            index = os.path.join(tempfile.gettempdir(), f"ann.{name}.pickle")
+
+            # Write legacy pickle format
+            with open(index, "wb") as handle:
+                pickle.dump(model.backend, handle, protocol=__pickle__)
+
+            # Load legacy index, delete and append data
+            model = ANNFactory.create(model.config)
+            model.load(index)
+            model.delete([1, 2])
+
+            data = np.random.rand(10, 300).astype(np.float32)
+            self.normalize(data)
+            model.append(data)
+            self.assertEqual(model.count(), 10008)
+
+            # Save and reload as native format
+            model.save(index)
+            model = ANNFactory.create(model.config)
+            model.load(index)
+
+            self.assertTrue(NumPy.isnumpy(index))
+            self.assertEqual(model.count(), 10008)
+            self.assertEqual(model.search(data[-1:], 1)[0][0][0], 10009)
+
+    @unittest.skipIf(os.name == "nt", "mmap not supported on Windows")
+    def testNumPyMmap(self):
+        """
+        Test NumPy backend with mmap enabled
+        """
+
+        self.runTests("numpy", {"numpy": {"mmap": True}})
+
+        # Test that loaded index is memory mapped and supports updates
+        model = self.save("numpy", {"numpy": {"mmap": True}})
+        self.assertIsInstance(model.backend, np.memmap)
+
+        model.delete([0, 1])
+        self.assertEqual(model.count(), 9998)
+
+    def testNumPySegments(self):
+        """
+        Test NumPy backend incremental saves
+        """
+
+        model = self.backend("numpy")
+
+        # Generate temp file path
+        index = os.path.join(tempfile.gettempdir(), "annsegments")
+
+        # Initial save writes a single segment
+        model.save(index)
+        self.assertFalse(os.path.exists(f"{index}.segments"))
+
+        # Append data, delete saved rows and save again
+        data = np.random.rand(500, 300).astype(np.float32)
+        self.normalize(data)
+
+        model.append(data)
+        model.delete([0, 1, 10250])
+        model.save(index)
+
+        # New rows are appended to the array file and deletes are written separately
+        self.assertEqual(np.load(index, mmap_mode="r").shape, (10500, 300))
+        self.assertEqual(np.load(f"{index}.deletes").tolist(), [0, 1])
+
+        # Reload and validate
+        model = ANNFactory.create(model.config)
+        model.load(index)
+
+        self.assertEqual(model.count(), 10497)
+        self.assertEqual(model.search(data[-1:], 1)[0][0][0], 10499)
+        self.assertEqual(model.search(model.backend[1:2], 1)[0][0][1], 0)
+
+        # Rows written by an interrupted save are ignored
+        model.append(data)
+        model.extend(index, 10500)
+
+        model = ANNFactory.create(model.config)
+        model.load(index)
+        self.assertEqual(model.backend.shape[0], 10500)
+
+    @unittest.skipIf(os.name == "nt", "mmap not supported on Windows")
+    def testNumPySegmentsMmap(self):
+        """
+        Test NumPy backend incremental saves with mmap enabled
+        """
+
+        model = self.backend("numpy", {"numpy": {"mmap": True}})
+
+        # Generate temp file path
+        index = os.path.join(tempfile.gettempdir(), "annsegments.mmap")
+
+        # Save, append data and save again to the same path
+        model.save(index)
+        model.load(index)
+
+        data = np.random.rand(500, 300).astype(np.float32)
+        self.normalize(data)
+
+        model.append(data)
+        model.save(index)
+
+        # Incrementally saved index is still memory mapped
+        model = ANNFactory.create(model.config)
+        model.load(index)
+
+        self.assertIsInstance(model.backend, np.memmap)
+        self.assertEqual(model.count(), 10500)
+        self.assertEqual(model.search(data[-1:], 1)[0][0][0], 10499)
+
     @patch("sqlalchemy.orm.Query.limit")
     def testPGVector(self, query):
         """
@@ -154,6 +382,14 @@ class TestANN(unittest.TestCase):
 
         self.runTests("torch")
 
+    @unittest.skipIf(os.name == "nt", "mmap not supported on Windows")
+    def testTorchMmap(self):
+        """
+        Test Torch backend with mmap enabled
+        """
+
+        self.runTests("torch", {"torch": {"mmap": True}})
+
     def runTests(self, name, params=None, update=True):
         """
         Runs a series of standard backend tests.
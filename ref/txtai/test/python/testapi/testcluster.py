@@ -2,19 +2,23 @@
 Cluster API module tests
 """
 
+import asyncio
 import json
 import os
+import re
 import tempfile
+import time
 import unittest
 import urllib.parse
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from threading import Thread
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 
-from txtai.api import application
+from txtai.api import application, Cluster, Ring
+from txtai.database.sql import Aggregate
 
 # Configuration for an embeddings cluster
 CLUSTER = """
@@ -30,20 +34,60 @@ class RequestHandler(BaseHTTPRequestHandler):
     Test HTTP handler.
     """
 
+    # Stores POST requests as (port, path, data)
+    posts = []
+
+    # pylint: disable=R0912
     def do_GET(self):
         """
         GET request handler.
         """
 
+        # Slow and failed requests on the second shard
+        if self.server.server_port == 8003:
+            if "slow" in self.path:
+                time.sleep(1)
+            elif "error" in self.path:
+                self.send_error(500)
+                return
+
         if self.path == "/count":
             response = 26
         elif self.path.startswith("/search?query=select"):
-            if "group+by+id" in self.path:
+            # Each shard stores 10 documents, ids start at 0 for the first shard and 10 for the second shard
+            start = 0 if self.server.server_port == 8002 else 10
+
+            if "indexid+%3E+-1" in self.path:
+                response = [{"indexid": x, "id": str(start + x)} for x in range(10)]
+            elif "indexid+%3E" in self.path:
+                response = []
+            elif "indexid+in" in self.path:
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["query"][0]
+                indexids = re.search(r"in \(([\d, ]+)\)", query).group(1).split(", ")
+
+                # Legacy documents on odd indexids store data without an id
+                response = [
+                    {
+                        "id": str(start + int(x)),
+                        "text": None,
+                        "data": json.dumps({"text": "test"} if int(x) % 2 else {"id": start + int(x), "text": "test"}),
+                        "tags": None,
+                    }
+                    for x in indexids
+                ]
+            elif "group+by+id" in self.path:
                 response = [{"count(*)": 26}]
             elif "group+by+text" in self.path:
                 response = [{"count(*)": 12, "text": "This is a test"}, {"count(*)": 14, "text": "And another test"}]
             elif "group+by+txt" in self.path:
                 response = [{"count(*)": 12, "txt": "This is a test"}, {"count(*)": 14, "txt": "And another test"}]
+            elif "avg(score)" in self.path:
+                # Shards return a count for each average
+                response = [{"avg(score)": 0.5, "__avgcount0": 1}] if self.server.server_port == 8002 else [{"avg(score)": 0.2, "__avgcount0": 3}]
+            elif "order+by+id" in self.path:
+                # Shards return limit + offset rows
+                ids = sorted(range(self.server.server_port % 2, 10, 2), reverse="desc" in self.path)
+                response = [{"id": x} for x in ids][:3] if "limit+3" in self.path else []
             else:
                 if self.server.server_port == 8002:
                     response = [{"count(*)": 12, "min(indexid)": 0, "max(indexid)": 11, "avg(indexid)": 6.3}]
@@ -54,6 +98,10 @@ class RequestHandler(BaseHTTPRequestHandler):
         else:
             response = {"result": "ok"}
 
+        # Return columnar results, if necessary
+        if "columnar=True" in self.path:
+            response = {column: [row[column] for row in response] for column in response[0]}
+
         # Convert response to string
         response = json.dumps(response).encode("utf-8")
 
@@ -70,13 +118,14 @@ class RequestHandler(BaseHTTPRequestHandler):
         POST request handler.
         """
 
+        # Read and store POST data
+        data = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        RequestHandler.posts.append((self.server.server_port, self.path, data))
+
         if self.path.startswith("/batchsearch"):
             response = [[{"id": 4, "score": 0.40}], [{"id": 1, "score": 0.40}]]
         elif self.path.startswith("/delete"):
-            if self.server.server_port == 8002:
-                response = [0]
-            else:
-                response = []
+            response = [int(uid) for uid in data]
         else:
             response = {"result": "ok"}
 
@@ -124,13 +173,13 @@ class TestCluster(unittest.TestCase):
 
         cls.client = TestCluster.start()
 
-        cls.httpd1 = HTTPServer(("127.0.0.1", 8002), RequestHandler)
+        cls.httpd1 = ThreadingHTTPServer(("127.0.0.1", 8002), RequestHandler)
 
         server1 = Thread(target=cls.httpd1.serve_forever)
         server1.setDaemon(True)
         server1.start()
 
-        cls.httpd2 = HTTPServer(("127.0.0.1", 8003), RequestHandler)
+        cls.httpd2 = ThreadingHTTPServer(("127.0.0.1", 8003), RequestHandler)
 
         server2 = Thread(target=cls.httpd2.serve_forever)
         server2.setDaemon(True)
@@ -146,6 +195,8 @@ class TestCluster(unittest.TestCase):
         Shutdown mock http server.
         """
 
+        application.get().cluster.close()
+
         cls.httpd1.shutdown()
         cls.httpd2.shutdown()
 
@@ -183,6 +234,29 @@ class TestCluster(unittest.TestCase):
         self.client.post("add", json=[{"text": "test"}])
         self.assertEqual(self.client.get("index").status_code, 200)
 
+    def testRebalance(self):
+        """
+        Test cluster rebalance
+        """
+
+        cluster = application.get().cluster
+        RequestHandler.posts.clear()
+
+        # Expected documents to move per shard
+        ports = [8002, 8003]
+        moved = {}
+        for position, (port, start) in enumerate(zip(ports, [0, 10])):
+            moved[port] = [x for x in range(start, start + 10) if cluster.ring(x) != position]
+
+        self.assertEqual(cluster.rebalance(), sum(len(ids) for ids in moved.values()))
+
+        # Documents are added to the owning shard and deleted from the source shard, documents without an id in data keep their id
+        added = [(port, int(document["id"])) for port, path, data in RequestHandler.posts if path == "/add" for document in data]
+        deleted = [(port, int(uid)) for port, path, data in RequestHandler.posts if path == "/delete" for uid in data]
+
+        self.assertEqual(sorted(added), sorted((ports[cluster.ring(uid)], uid) for ids in moved.values() for uid in ids))
+        self.assertEqual(sorted(deleted), sorted((port, uid) for port, ids in moved.items() for uid in ids))
+
     def testReindex(self):
         """
         Test cluster reindex
@@ -190,6 +264,24 @@ class TestCluster(unittest.TestCase):
 
         self.assertEqual(self.client.post("reindex", json={"config": {"path": "sentence-transformers/nli-mpnet-base-v2"}}).status_code, 200)
 
+    def testRing(self):
+        """
+        Test consistent hash ring
+        """
+
+        ring = Ring(["shard1", "shard2", "shard3"])
+
+        # Numeric and string ids map to the same node
+        self.assertEqual(ring(10), ring("10"))
+
+        # Keys are distributed across all nodes
+        positions = [ring(x) for x in range(1000)]
+        self.assertEqual(set(positions), {0, 1, 2})
+
+        # Adding a node only moves keys to the new node
+        ring = Ring(["shard1", "shard2", "shard3", "shard4"])
+        self.assertTrue(all(ring(x) in (position, 3) for x, position in enumerate(positions)))
+
     def testSearch(self):
         """
         Test cluster search
@@ -202,6 +294,84 @@ class TestCluster(unittest.TestCase):
         uid = self.client.get(f"search?query={query}&limit=1&weights=0.5&index=default&parameters={params}&graph=False").json()[0]["id"]
         self.assertEqual(uid, 4)
 
+    def testSearchDegraded(self):
+        """
+        Test cluster search with a failed shard and a shard that misses the search deadline
+        """
+
+        # Failed shard returns partial results
+        response = self.client.get("search?query=error+query&limit=1")
+        self.assertEqual(response.json()[0]["id"], 4)
+        self.assertEqual(response.headers.get("X-Degraded"), "true")
+
+        response = self.client.get("search?query=feel+good+story&limit=1")
+        self.assertIsNone(response.headers.get("X-Degraded"))
+
+        # Slow shard misses deadline
+        cluster = Cluster({"shards": ["http://127.0.0.1:8002", "http://127.0.0.1:8003"], "timeout": 0.25})
+        self.assertEqual(cluster.search("slow query", 1)[0]["id"], 4)
+        self.assertTrue(cluster.degraded())
+        self.assertEqual(cluster.metrics()["http://127.0.0.1:8003"]["timeouts"], 1)
+
+        # All shards failed
+        with self.assertRaises(Exception):
+            cluster.execute("get", "search?query=error", shards=["http://127.0.0.1:8003"], partial=True)
+
+        cluster.close()
+
+    def testSearchHedged(self):
+        """
+        Test cluster search with hedged requests to replicas
+        """
+
+        config = {
+            "shards": ["http://127.0.0.1:8002", "http://127.0.0.1:8003"],
+            "timeout": 0.75,
+            "replicas": {"http://127.0.0.1:8003": ["http://127.0.0.1:8002"]},
+            "hedge": 95,
+        }
+
+        cluster = Cluster(config)
+
+        # Failed request is sent to replica
+        self.assertEqual(cluster.search("error query", 1)[0]["id"], 4)
+        self.assertFalse(cluster.degraded())
+
+        # Build shard latency histograms
+        for _ in range(Cluster.SAMPLES):
+            cluster.search("feel good story", 1)
+
+        # Slow request is hedged to replica after the latency percentile
+        start = time.time()
+        self.assertEqual(cluster.search("slow query", 1)[0]["id"], 4)
+        self.assertFalse(cluster.degraded())
+        self.assertLess(time.time() - start, 0.75)
+
+        metrics = cluster.metrics()["http://127.0.0.1:8003"]
+        self.assertEqual(metrics["hedged"], 2)
+        self.assertEqual(sum(metrics["histogram"].values()), metrics["responses"])
+
+        cluster.close()
+
+    def testSearchAsync(self):
+        """
+        Test cluster async search
+        """
+
+        cluster = application.get().cluster
+
+        # Run async searches from a separate event loop
+        results = asyncio.run(cluster.asearch("feel good story", 1))
+        self.assertEqual(results[0]["id"], 4)
+
+        results = asyncio.run(cluster.abatchsearch(["feel good story", "climate change"], 1))
+        self.assertEqual([result[0]["id"] for result in results], [4, 1])
+
+        # Session is reused across requests
+        session = cluster.session
+        cluster.count()
+        self.assertIs(cluster.session, session)
+
     def testSearchBatch(self):
         """
         Test cluster batch search
@@ -222,6 +392,31 @@ class TestCluster(unittest.TestCase):
         uids = [result[0]["id"] for result in results]
         self.assertEqual(uids, [4, 1])
 
+    @patch.dict(os.environ, {"CONFIG": os.path.join(tempfile.gettempdir(), "testapi.yml"), "API_CLASS": "txtai.api.API"})
+    def testShutdown(self):
+        """
+        Test the cluster is closed when the application shuts down
+        """
+
+        instance = application.get()
+
+        # Run startup events and open cluster connections
+        lifespan = application.lifespan(application.create())
+        next(lifespan)
+
+        cluster = application.get().cluster
+        self.assertEqual(cluster.search("feel good story", 1)[0]["id"], 4)
+        self.assertIsNotNone(cluster.loop)
+
+        # Run shutdown events
+        with self.assertRaises(StopIteration):
+            next(lifespan)
+
+        self.assertIsNone(cluster.loop)
+        self.assertIsNone(cluster.session)
+
+        application.INSTANCE = instance
+
     def testSQL(self):
         """
         Test cluster SQL statement
@@ -247,6 +442,53 @@ class TestCluster(unittest.TestCase):
         query = urllib.parse.quote("select count(*) from txtai group by id order by count(*)")
         self.assertEqual(self.client.get(f"search?query={query}").json(), [{"count(*)": 52}])
 
+    def testSQLMerge(self):
+        """
+        Test cluster SQL statement with partial shard results
+        """
+
+        # Weighted average across shards
+        query = urllib.parse.quote("select avg(score) from txtai")
+        self.assertEqual(self.client.get(f"search?query={query}").json(), [{"avg(score)": 0.275}])
+
+        # Limit pushed down to shards, offset applied to merged results
+        query = urllib.parse.quote("select id from txtai order by id limit 2 offset 1")
+        self.assertEqual(self.client.get(f"search?query={query}").json(), [{"id": 1}, {"id": 2}])
+
+        query = urllib.parse.quote("select id from txtai order by id desc limit 2 offset 1")
+        self.assertEqual(self.client.get(f"search?query={query}&columnar=true").json(), {"id": [8, 7]})
+
+        # Limit removed from shard queries when groups are ordered by an aggregate value
+        aggregate = Aggregate()
+        self.assertEqual(
+            aggregate.partial("select count(*), text from txtai group by text order by count(*) desc limit 5", 10),
+            "select count(*), text from txtai group by text order by count(*) desc",
+        )
+        self.assertEqual(
+            aggregate.partial("select count(*), text from txtai group by text order by text limit 5 offset 2", 10),
+            "select count(*), text from txtai group by text order by text limit 7",
+        )
+
+    def testSQLColumnar(self):
+        """
+        Test cluster SQL statement with columnar results
+        """
+
+        query = urllib.parse.quote("select count(*), min(indexid), max(indexid), avg(indexid) from txtai where text='This is a test'")
+        self.assertEqual(
+            self.client.get(f"search?query={query}&columnar=true").json(),
+            {"count(*)": [28], "min(indexid)": [0], "max(indexid)": [14], "avg(indexid)": [6.5]},
+        )
+
+        query = urllib.parse.quote("select count(*), text txt from txtai group by txt order by count(*) desc")
+        self.assertEqual(
+            self.client.get(f"search?query={query}&columnar=true").json(),
+            {"count(*)": [28, 24], "txt": ["And another test", "This is a test"]},
+        )
+
+        query = urllib.parse.quote("feel good story")
+        self.assertEqual(self.client.get(f"search?query={query}&limit=1&columnar=true").json(), {"id": [4], "score": [0.40]})
+
     def testUpsert(self):
         """
         Test cluster upsert
@@ -9,6 +9,7 @@ import tempfile
 import unittest
 
 from txtai.embeddings import Embeddings, IndexNotFoundError
+from txtai.embeddings.search import Search
 from txtai.database import Embedded, RDBMS, SQLError
 
 
@@ -325,6 +326,29 @@ class Common:
                 self.embeddings.info()
 
             self.assertIn("txtai", output.getvalue())
+            self.assertIn("statements", output.getvalue())
+
+        def testInsertBuffer(self):
+            """
+            Test inserting rows with multiple buffer flushes
+            """
+
+            buffer = RDBMS.BUFFER
+
+            try:
+                # Flush buffers every 2 rows
+                RDBMS.BUFFER = 2
+
+                # Create an index for the list of text and update the last row
+                self.embeddings.index([(uid, {"text": text, "row": uid}, None) for uid, text in enumerate(self.data)])
+                self.embeddings.upsert([(5, {"text": "Feel good story: baby panda born", "row": 5}, None)])
+
+                # Check all rows are stored
+                result = self.embeddings.search("select id, text, row from txtai order by row", 10)
+                self.assertEqual([int(x["id"]) for x in result], list(range(len(self.data))))
+                self.assertEqual(result[-1]["text"], "Feel good story: baby panda born")
+            finally:
+                RDBMS.BUFFER = buffer
 
         def testInstructions(self):
             """
@@ -651,6 +675,99 @@ class Common:
             with self.assertRaises(SQLError):
                 self.embeddings.search("select * from txtai where bad,query")
 
+        def testSQLBatch(self):
+            """
+            Test running a batch of SQL queries
+            """
+
+            # Create an index for the list of text
+            self.embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+            # Queries with the same shape run as a single statement
+            queries = [
+                "feel good story",
+                "lottery ticket",
+                "select id, text, score from txtai where similar('feel good story') and text is not null limit 1",
+                "select id, text, score from txtai where similar('lottery ticket') and text is not null limit 1",
+                "select id, text, score from txtai where similar('feel good story') and text is null limit 1",
+                "select text from txtai where text like '%iceberg%'",
+            ]
+
+            results = self.embeddings.batchsearch(queries, 1)
+            self.assertEqual(
+                [result[0]["text"] if result else None for result in results], [self.data[x] for x in [4, 4, 4, 4]] + [None, self.data[1]]
+            )
+
+            # Test indexids are returned for a batch of queries
+            results = Search(self.embeddings, indexids=True)(queries[:2], 1)
+            self.assertEqual([result[0][0] for result in results], [4, 4])
+
+        def testSQLColumnar(self):
+            """
+            Test returning query results as columns
+            """
+
+            # Create an index for the list of text
+            self.embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+            # Columns match row results
+            query = "select id, text, score, id from txtai where similar('feel good story') or text like '%iceberg%'"
+            rows = self.embeddings.search(query, 10)
+            columns = self.embeddings.search(query, 10, columnar=True)
+            self.assertEqual(columns, {column: [row[column] for row in rows] for column in rows[0]})
+
+            # Test columns for a batch of queries with the same shape
+            queries = ["select id, text from txtai where similar('feel good story')", "select id, text from txtai where similar('lottery ticket')"]
+            results = self.embeddings.batchsearch(queries, 1, columnar=True)
+            self.assertEqual([result["text"] for result in results], [[self.data[4]], [self.data[4]]])
+
+            # Test empty results
+            self.assertEqual(self.embeddings.search("select id, text from txtai where id = -1", columnar=True), {"id": [], "text": []})
+
+            # Test objects are decoded
+            embeddings = Embeddings({"defaults": False, "content": self.backend, "objects": True})
+            embeddings.index([{"object": "binary data".encode("utf-8")}])
+
+            obj = embeddings.search("select object from txtai where id = 0", columnar=True)["object"][0]
+            self.assertEqual(str(obj.getvalue(), "utf-8"), "binary data")
+
+        def testSQLFilter(self):
+            """
+            Test pushing SQL filters down into index searches
+            """
+
+            try:
+                self.embeddings.config["filter"] = True
+
+                # Create an index for the list of text
+                self.embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+                # Filters that scan the full table run as standard searches, the single candidate doesn't match
+                result = self.embeddings.search("select id, text from txtai where similar('feel good story', 1) and text like '%iceberg%'", 1)
+                self.assertEqual(result, [])
+
+                # Test filter with bind parameters
+                query = "select id, text from txtai where similar('feel good story') and text like :x"
+                result = self.embeddings.search(query, 1, parameters={"x": "%lottery%"})
+                self.assertEqual(result[0]["text"], self.data[4])
+
+                # Similar clauses that aren't top level AND conditions run without filters
+                result = self.embeddings.search("select id, text from txtai where similar('feel good story', 1) or text like '%iceberg%'", 10)
+                self.assertEqual(sorted(x["text"] for x in result), sorted([self.data[1], self.data[4]]))
+
+                # Filtered hybrid searches fuse the same candidates as standard searches
+                embeddings = Embeddings({"path": "sentence-transformers/nli-mpnet-base-v2", "hybrid": True, "content": self.backend})
+                embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+                query = "select id from txtai where similar('feel good story lottery') and indexid > 1"
+                expected = embeddings.search(query, 2)
+
+                embeddings.config["filter"] = True
+                self.assertEqual(embeddings.search(query, 2), expected)
+                embeddings.close()
+            finally:
+                del self.embeddings.config["filter"]
+
         def testSQLBind(self):
             """
             Test SQL statements with bind parameters
@@ -90,6 +90,35 @@ class TestSQL(unittest.TestCase):
         self.assertSql("groupby", "select * from txtai group by [a]", "json_extract(data, '$.a')")
         self.assertSql("orderby", "select * from txtai where order by [a]", "json_extract(data, '$.a')")
 
+    def testCache(self):
+        """
+        Test parsed query and statement caches
+        """
+
+        sql = SQL(self.db, cachesize=10)
+
+        # Cached queries return a copy of parsed clauses
+        query = "select id, text from txtai where similar('abc') and a = :x"
+        clauses = sql(query)
+        clauses["where"], clauses["similar"][0][0] = None, "def"
+        self.assertEqual(sql(query), self.sql(query))
+
+        info = sql.cache.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+        # Repeated queries reuse query statements
+        db = DatabaseFactory.create({"content": True, "querycache": 10})
+        db.insert([(0, {"text": "abc", "a": 1}, None)])
+        for _ in range(3):
+            self.assertEqual(db.search("select id, text from txtai where a = :x", parameters={"x": 1}), [{"id": "0", "text": "abc"}])
+
+        metrics = db.metrics()
+        self.assertEqual((metrics["queries"]["hits"], metrics["queries"]["misses"]), (2, 1))
+        self.assertEqual((metrics["statements"]["hits"], metrics["statements"]["misses"]), (2, 1))
+
+        # Caches are disabled
+        self.assertEqual(DatabaseFactory.create({"content": True, "querycache": 0}).metrics(), {})
+
     def testDistinct(self):
         """
         Test distinct expressions
@@ -2,6 +2,10 @@
 SQLite module tests
 """
 
+import os
+import tempfile
+
+from txtai.database import RDBMS, SQLite
 from txtai.embeddings import Embeddings
 
 from .testrdbms import Common
@@ -43,6 +47,82 @@ class TestSQLite(Common.TestRDBMS):
         if cls.embeddings:
             cls.embeddings.close()
 
+    def testCopy(self):
+        """
+        Test copying a database with pending changes
+        """
+
+        # Copy database in single page backup steps
+        pages, SQLite.PAGES = SQLite.PAGES, 1
+
+        try:
+            # Create an index for the list of text
+            self.embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+            # Save original index
+            index = os.path.join(tempfile.gettempdir(), "embeddings.sqlite.copy")
+            self.embeddings.save(index)
+
+            # Search leaves uncommitted changes in temporary tables
+            self.embeddings.search("feel good story", 1)
+
+            # Save to a different location and check progress is logged
+            indexcopy = os.path.join(tempfile.gettempdir(), "embeddings.sqlite.copy.search")
+            with self.assertLogs("txtai.database.sqlite", level="INFO"):
+                self.embeddings.save(indexcopy)
+
+            # Modify index and save to a different location, pending changes are committed and copied with the backup API
+            self.embeddings.upsert([(0, "Looking out into the dreadful abyss", None)])
+            indexupdate = os.path.join(tempfile.gettempdir(), "embeddings.sqlite.copy.update")
+            with self.assertLogs("txtai.database.sqlite", level="INFO"):
+                self.embeddings.save(indexupdate)
+
+            # Test copies
+            self.embeddings.load(indexcopy)
+            self.assertEqual(self.embeddings.search("select text from txtai where id = 0")[0]["text"], self.data[0])
+
+            self.embeddings.load(indexupdate)
+            self.assertEqual(self.embeddings.search("select text from txtai where id = 0")[0]["text"], "Looking out into the dreadful abyss")
+        finally:
+            SQLite.PAGES = pages
+
+    def testFilter(self):
+        """
+        Test pushing SQL filters resolved through indexes down into index searches
+        """
+
+        try:
+            self.embeddings.config["filter"] = True
+
+            # Create an index for the list of text
+            self.embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+            # Index search only returns a single candidate, which must match the filter
+            result = self.embeddings.search("select id, text from txtai where similar('feel good story', 1) and indexid = 1", 1)
+            self.assertEqual(result[0]["text"], self.data[1])
+
+            # Test filter with bind parameters
+            query = "select id, text from txtai where similar('feel good story', 1) and id = :x"
+            result = self.embeddings.search(query, 1, parameters={"x": "2"})
+            self.assertEqual(result[0]["text"], self.data[2])
+
+            # Filters resolve matching index ids
+            database = self.embeddings.database
+            query = database.parse("select id from txtai where similar('feel good story') and indexid > 1")
+            self.assertEqual(database.filter(query), [2, 3, 4, 5])
+
+            # Filters that scan the full table aren't resolved
+            self.assertIsNone(database.filter(database.parse("select id from txtai where similar('feel good story') and text like '%iceberg%'")))
+
+            # Filters that match more than the maximum number of ids aren't resolved
+            maximum, RDBMS.FILTER = RDBMS.FILTER, 3
+            try:
+                self.assertIsNone(database.filter(query))
+            finally:
+                RDBMS.FILTER = maximum
+        finally:
+            del self.embeddings.config["filter"]
+
     def testFunction(self):
         """
         Test custom functions
@@ -64,6 +144,35 @@ class TestSQLite(Common.TestRDBMS):
 
         self.assertEqual(result["length"], 39)
 
+    def testIndexed(self):
+        """
+        Test indexed document fields
+        """
+
+        embeddings = Embeddings({"path": "sentence-transformers/nli-mpnet-base-v2", "content": self.backend, "indexed": ["flag"]})
+
+        # Create an index for the list of text
+        embeddings.index([{"id": uid, "text": text, "flag": uid % 2} for uid, text in enumerate(self.data)])
+
+        # Test filters on indexed fields
+        query = "select id, flag from txtai where flag = 1 order by id"
+        self.assertEqual(embeddings.search(query, 10), [{"id": str(uid), "flag": 1} for uid in [1, 3, 5]])
+        self.assertEqual(embeddings.search("select id from txtai where similar('lottery ticket') and flag = 0", 1)[0]["id"], "4")
+
+        # Test filter runs as an index search
+        column = embeddings.database.resolve("flag")
+        plan = embeddings.database.cursor.execute(f"EXPLAIN QUERY PLAN SELECT id FROM documents d WHERE {column} = 1").fetchall()
+        self.assertTrue(any("documents_data.flag" in row[-1] for row in plan))
+
+        # Test indexed fields are resolved after load and maintained with upserts
+        index = os.path.join(tempfile.gettempdir(), "embeddings.sqlite.indexed")
+        embeddings.save(index)
+        embeddings.load(index)
+        embeddings.upsert([{"id": 6, "text": "Feel good story: baby panda born", "flag": 1}])
+        self.assertEqual([row["id"] for row in embeddings.search(query, 10)], ["1", "3", "5", "6"])
+
+        embeddings.close()
+
 
 def length(text):
     """
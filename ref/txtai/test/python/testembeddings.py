@@ -11,7 +11,8 @@ from unittest.mock import patch
 
 import numpy as np
 
-from txtai.embeddings import Embeddings, Reducer
+from txtai.embeddings import Embeddings, IndexIds, Reducer
+from txtai.embeddings.search import Fusion
 from txtai.vectors import WordVectors
 
 
@@ -176,6 +177,28 @@ class TestEmbeddings(unittest.TestCase):
         uid = embeddings.search(data[4], 1)[0][0]
         self.assertEqual(uid, 4)
 
+    def testFusion(self):
+        """
+        Test hybrid score fusion
+        """
+
+        dense, sparse = [[(1, 0.9), (2, 0.5)], []], [[(2, 12.0), (3, 3.0)], [(4, 1.0)]]
+
+        # Reciprocal Rank Fusion
+        self.assertEqual(Fusion("rrf", [0.5, 0.5])([dense, sparse], 3), [[(2, 0.75), (1, 0.5), (3, 0.25)], [(4, 0.5)]])
+
+        # Convex Combination
+        self.assertEqual(Fusion("convex", [1.0, 0.0])([dense, sparse], 3), [[(1, 0.9), (2, 0.5)], []])
+
+        # Distribution-Based Score Fusion
+        results = Fusion("dbsf", [0.5, 0.5])([dense, sparse], 1)
+        self.assertEqual(results[0][0][0], 2)
+        self.assertEqual(results[1], [(4, 0.5)])
+
+        # Test unsupported method
+        with self.assertRaises(ValueError):
+            Fusion("sum", [0.5, 0.5])
+
     def testHybrid(self):
         """
         Test hybrid search
@@ -211,6 +234,12 @@ class TestEmbeddings(unittest.TestCase):
         uid = embeddings.search("feel good story", 1)[0][0]
         self.assertEqual(uid, 4)
 
+        # Test fusion methods
+        for method in ["convex", "dbsf", "rrf"]:
+            embeddings.config["fusion"] = method
+            uid = embeddings.search("feel good story", 1)[0][0]
+            self.assertEqual(uid, 4)
+
         # Test upsert
         data[0] = (0, "Feel good story: baby panda born", None)
         embeddings.upsert([data[0]])
@@ -250,6 +279,58 @@ class TestEmbeddings(unittest.TestCase):
         # Check that ids is not in config
         self.assertTrue("ids" not in self.embeddings.config)
 
+    def testIdsIndex(self):
+        """
+        Test ids reverse index when content is disabled
+        """
+
+        # Create an index for the list of text
+        self.embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+        # Upsert existing id and delete another id
+        self.embeddings.upsert([(0, "Feel good story: baby panda born", None)])
+        self.assertEqual(self.embeddings.delete([1, 100]), [1])
+
+        # Validate reverse index
+        self.assertEqual(self.embeddings.ids.find([0, 1]), [(6, 0)])
+        self.assertEqual(self.embeddings.count(), 5)
+
+        # Generate temp file path
+        index = os.path.join(tempfile.gettempdir(), "embeddings.idsindex")
+
+        # Save and reload index
+        self.embeddings.save(index)
+        self.embeddings.load(index)
+
+        # Validate reverse index is restored
+        self.assertEqual(self.embeddings.ids.find([0, 1]), [(6, 0)])
+        self.assertEqual(self.embeddings.search("feel good story", 1)[0][0], 0)
+
+    def testIdsStorage(self):
+        """
+        Test columnar ids storage
+        """
+
+        for ids in [list(range(10)), [f"id{x}" for x in range(10)], [0, "id1", 2.0]]:
+            # Create ids and delete an id
+            indexids = IndexIds(Embeddings({"defaults": False}), ids)
+            indexids[1] = None
+
+            # Generate temp file path
+            path = os.path.join(tempfile.gettempdir(), "embeddings.idsstorage")
+
+            # Save and reload ids
+            indexids.save(path)
+            indexids.load(path)
+
+            # Validate ids
+            self.assertEqual(list(indexids), [ids[0], None] + ids[2:])
+            self.assertEqual(indexids.find([ids[0], ids[1], ids[2]]), [(0, ids[0]), (2, ids[2])])
+            self.assertEqual(indexids.count(), len(ids) - 1)
+
+            # Integer and string ids are stored as arrays
+            self.assertEqual(indexids.stored is not None, not isinstance(ids[2], float))
+
     def testIndex(self):
         """
         Test index
@@ -301,6 +382,50 @@ class TestEmbeddings(unittest.TestCase):
         uid = embeddings.search("feel good story", 1)[0][0]
         self.assertEqual(uid, 0)
 
+    def testLazy(self):
+        """
+        Test lazy component loading
+        """
+
+        # Index data with sparse vectors and content
+        embeddings = Embeddings({"keyword": True, "content": True})
+        embeddings.index([(uid, text, None) for uid, text in enumerate(self.data)])
+
+        # Generate temp file path
+        index = os.path.join(tempfile.gettempdir(), "embeddings.lazy")
+
+        # Save and reload index with lazy loading
+        embeddings.save(index)
+        embeddings.load(index, config={"lazy": True})
+
+        # SQL queries only load the database
+        result = embeddings.search("select id from txtai where id = 4")[0]
+        self.assertEqual(result["id"], "4")
+        self.assertIn("scoring", embeddings.loaders)
+        self.assertNotIn("database", embeddings.loaders)
+
+        # Keyword search loads scoring
+        result = embeddings.search("lottery ticket", 1)[0]
+        self.assertEqual(result["id"], "4")
+        self.assertNotIn("scoring", embeddings.loaders)
+
+        # Reload index and prefetch all components in a background thread
+        embeddings.load(index, config={"lazy": True, "prefetch": True})
+
+        result = embeddings.search("lottery ticket", 1)[0]
+        self.assertEqual(result["id"], "4")
+        self.assertEqual(embeddings.count(), len(self.data))
+
+        # Accessing a component while it is loading raises an error
+        embeddings.load(index, config={"lazy": True})
+        embeddings.loaders["graph"] = lambda: embeddings.graph
+        with self.assertRaises(RuntimeError):
+            getattr(embeddings, "graph")
+
+        # Pending components are discarded on close
+        embeddings.close()
+        self.assertIsNone(embeddings.scoring)
+
     def testQuantize(self):
         """
         Test scalar quantization
@@ -3,9 +3,10 @@ Custom module tests
 """
 
 import os
-import pickle
 import unittest
 
+import numpy as np
+
 from txtai.vectors import VectorsFactory
 
 
@@ -38,8 +39,7 @@ class TestCustom(unittest.TestCase):
         self.assertIsNotNone(os.path.exists(stream))
 
         # Test shape of serialized embeddings
-        with open(stream, "rb") as queue:
-            self.assertEqual(pickle.load(queue).shape, (500, 768))
+        self.assertEqual(np.fromfile(stream, dtype=np.float32).reshape(-1, dimension).shape, (1000, 768))
 
     def testNotFound(self):
         """
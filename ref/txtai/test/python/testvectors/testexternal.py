@@ -3,7 +3,6 @@ External module tests
 """
 
 import os
-import pickle
 import unittest
 
 import numpy as np
@@ -43,8 +42,7 @@ class TestExternal(unittest.TestCase):
         self.assertIsNotNone(os.path.exists(stream))
 
         # Test shape of serialized embeddings
-        with open(stream, "rb") as queue:
-            self.assertEqual(pickle.load(queue).shape, (500, 768))
+        self.assertEqual(np.fromfile(stream, dtype=np.float32).reshape(-1, dimension).shape, (1000, 768))
 
     def testMethod(self):
         """
@@ -3,12 +3,13 @@ WordVectors module tests
 """
 
 import os
-import pickle
 import tempfile
 import unittest
 
 from unittest.mock import patch
 
+import numpy as np
+
 from txtai.vectors import WordVectors, VectorsFactory
 
 
@@ -69,8 +70,7 @@ class TestWordVectors(unittest.TestCase):
         self.assertIsNotNone(os.path.exists(stream))
 
         # Test shape of serialized embeddings
-        with open(stream, "rb") as queue:
-            self.assertEqual(pickle.load(queue).shape, (1, 10))
+        self.assertEqual(np.fromfile(stream, dtype=np.float32).reshape(-1, dimension).shape, (1000, 10))
 
     @patch("os.cpu_count")
     def testIndexBatch(self, cpucount):
@@ -94,9 +94,7 @@ class TestWordVectors(unittest.TestCase):
         self.assertIsNotNone(os.path.exists(stream))
 
         # Test shape of serialized embeddings
-        with open(stream, "rb") as queue:
-            self.assertEqual(pickle.load(queue).shape, (512, 10))
-            self.assertEqual(pickle.load(queue).shape, (488, 10))
+        self.assertEqual(np.fromfile(stream, dtype=np.float32).reshape(-1, dimension).shape, (1000, 10))
 
     def testIndexSerial(self):
         """
@@ -116,8 +114,7 @@ class TestWordVectors(unittest.TestCase):
         self.assertIsNotNone(os.path.exists(stream))
 
         # Test shape of serialized embeddings
-        with open(stream, "rb") as queue:
-            self.assertEqual(pickle.load(queue).shape, (1, 10))
+        self.assertEqual(np.fromfile(stream, dtype=np.float32).reshape(-1, dimension).shape, (1000, 10))
 
     def testIndexSerialBatch(self):
         """
@@ -137,9 +134,7 @@ class TestWordVectors(unittest.TestCase):
         self.assertIsNotNone(os.path.exists(stream))
 
         # Test shape of serialized embeddings
-        with open(stream, "rb") as queue:
-            self.assertEqual(pickle.load(queue).shape, (512, 10))
-            self.assertEqual(pickle.load(queue).shape, (488, 10))
+        self.assertEqual(np.fromfile(stream, dtype=np.float32).reshape(-1, dimension).shape, (1000, 10))
 
     def testLookup(self):
         """
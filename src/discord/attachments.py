@@ -0,0 +1,88 @@
+# attachments.py
+# Text extraction for files attached to imported ChatGPT conversations.
+# Only standard library imports here, so process pool workers start quickly.
+
+import html
+import io
+import json
+import mimetypes
+import re
+import zipfile
+
+
+# Files larger than these limits (by MIME type, then by top-level type) are not extracted
+MAX_ATTACHMENT_BYTES = {
+    "application/pdf": 50 * 1024 * 1024,
+    "application/json": 20 * 1024 * 1024,
+    "text": 10 * 1024 * 1024,
+}
+DEFAULT_MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024
+
+# Extracted text beyond this many characters is dropped before chunking
+MAX_EXTRACTED_CHARS = 2_000_000
+
+
+def _extract_text(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def _extract_json(data: bytes) -> str:
+    try:
+        return json.dumps(json.loads(data), indent=2, ensure_ascii=False)
+    except ValueError:
+        return _extract_text(data)
+
+
+def _extract_html(data: bytes) -> str:
+    text = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", _extract_text(data))
+    text = re.sub(r"(?s)<[^>]+>", " ", text)
+    return re.sub(r"[ \t]+", " ", html.unescape(text)).strip()
+
+
+def _extract_pdf(data: bytes):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("PDF extraction requires the 'pypdf' package")
+
+    reader = PdfReader(io.BytesIO(data))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+EXTRACTORS = {
+    "application/json": _extract_json,
+    "application/pdf": _extract_pdf,
+    "text/html": _extract_html,
+}
+
+
+def attachment_file_type(filename: str, declared_type: str = None) -> str:
+    """Returns the declared MIME type, falling back to a guess from the file name."""
+    return declared_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def extractor_for(file_type: str):
+    """Returns the text extractor for a MIME type, or None if the type is unsupported."""
+    return EXTRACTORS.get(file_type) or (_extract_text if file_type.startswith("text/") else None)
+
+
+def size_limit(file_type: str) -> int:
+    """Returns the maximum size in bytes that will be extracted for a MIME type."""
+    return MAX_ATTACHMENT_BYTES.get(file_type, MAX_ATTACHMENT_BYTES.get(file_type.split("/")[0], DEFAULT_MAX_ATTACHMENT_BYTES))
+
+
+# Open archives, one per worker process, so the ZIP directory is only parsed once
+_archives = {}
+
+
+def extract_attachment(zip_path: str, member: str, file_type: str):
+    """
+    Reads a ZIP member and extracts its text. Runs in a worker process; the member is
+    read straight from the archive without extracting it to disk.
+    """
+    archive = _archives.get(zip_path)
+    if archive is None:
+        archive = _archives[zip_path] = zipfile.ZipFile(zip_path)
+
+    text = extractor_for(file_type)(archive.read(member))
+    return text[:MAX_EXTRACTED_CHARS] if text and text.strip() else None
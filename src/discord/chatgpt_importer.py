@@ -0,0 +1,979 @@
+# chatgpt_importer.py
+# Streams a ChatGPT data export (the ZIP from "Settings > Data controls > Export")
+# into the bot memory database without extracting it or loading it whole.
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from attachments import attachment_file_type, extract_attachment, extractor_for, size_limit
+from config import MAX_TOKENS_FOR_RESPONSE, MEMORY_SHARD_DIR
+from memory_manager import (
+    _embedding_model_name_for_tokenizer,
+    _load_embedding_model_once,
+    get_token_count,
+    initialize_memory_database,
+    invalidate_memory_shard,
+    memory_db_path,
+)
+from memory_shards import shard_db_paths
+from utils import log_message
+
+
+CONVERSATIONS_MEMBER = "conversations.json"
+READ_SIZE = 1 << 16
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = 2
+DEFAULT_EXTRACT_WORKERS = os.cpu_count() or 1
+PROGRESS_EVERY = 100
+ENCODE_RETRIES = 1
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+class _CountingReader(io.RawIOBase):
+    """Wraps a ZIP member stream and counts the uncompressed bytes read from it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.raw.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def iter_json_array(stream, read_size: int = READ_SIZE):
+    """
+    Incrementally yields the elements of a top-level JSON array read from a text stream.
+    Only the element currently being decoded is held in memory, so the size of the
+    array does not matter.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def fill(size):
+        nonlocal buffer, position, eof
+        chunk = stream.read(size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    # Locate the opening bracket
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position < len(buffer):
+            break
+        if eof:
+            return
+        fill(read_size)
+
+    if buffer[position] != "[":
+        raise ValueError("Expected a JSON array at the top level of the export")
+    position += 1
+
+    while True:
+        position = _SEPARATORS.match(buffer, position).end()
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("Unterminated JSON array in export")
+            fill(read_size)
+            continue
+
+        if buffer[position] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Grow reads geometrically so a single huge element is decoded in linear time
+            fill(max(read_size, len(buffer)))
+            continue
+
+        # A value ending exactly at the buffer boundary may be truncated (e.g. a number)
+        if end >= len(buffer) and not eof:
+            fill(read_size)
+            continue
+
+        position = end
+        yield item
+
+
+def message_attachments(message: dict) -> list:
+    """
+    Returns the attachment references of a message. Older exports list them under
+    content.attachments with a path into the ZIP, newer ones under metadata.attachments
+    with a file ID that prefixes the stored file name.
+    """
+    references = ((message.get("content") or {}).get("attachments") or []) + ((message.get("metadata") or {}).get("attachments") or [])
+    attachments = []
+    for reference in references:
+        name = reference.get("name") or reference.get("path") or reference.get("id")
+        if name:
+            attachments.append(
+                {
+                    "id": reference.get("id"),
+                    "name": os.path.basename(name),
+                    "path": reference.get("path"),
+                    "type": reference.get("type") or reference.get("mimeType") or reference.get("mime_type"),
+                }
+            )
+
+    return attachments
+
+
+def conversation_messages(conversation: dict) -> list:
+    """Flattens a ChatGPT conversation mapping into time-ordered memory messages."""
+    messages = []
+    for node_id, node in (conversation.get("mapping") or {}).items():
+        message = (node or {}).get("message")
+        if not message:
+            continue
+
+        role = (message.get("author") or {}).get("role")
+        if role not in ("user", "assistant"):
+            continue
+
+        content = message.get("content") or {}
+        parts = [part for part in content.get("parts") or [] if isinstance(part, str) and part.strip()]
+        attachments = message_attachments(message)
+        if not parts and not attachments:
+            continue
+
+        created = message.get("create_time") or conversation.get("create_time") or 0
+        messages.append(
+            (
+                created,
+                {
+                    "role": "model" if role == "assistant" else "user",
+                    "content": "\n".join(parts) or "[Attached: " + ", ".join(a["name"] for a in attachments) + "]",
+                    "author_id": role,
+                    "timestamp": datetime.datetime.fromtimestamp(created, tz=datetime.timezone.utc).isoformat(),
+                    "message_id": f"chat_{message.get('id') or node_id}",
+                    "attachments": attachments,
+                },
+            )
+        )
+
+    messages.sort(key=lambda pair: pair[0])
+    return [message for _, message in messages]
+
+
+def split_text(text: str, max_tokens: int, logger=None) -> list:
+    """Splits text on paragraph, then line, then word boundaries so each piece fits within max_tokens."""
+    if get_token_count(text, logger) <= max_tokens:
+        return [text]
+
+    for separator in ("\n\n", "\n", " "):
+        pieces = text.split(separator)
+        if len(pieces) > 1:
+            break
+    else:
+        # No boundary left to split on, fall back to a hard character split
+        middle = len(text) // 2
+        return split_text(text[:middle], max_tokens, logger) + split_text(text[middle:], max_tokens, logger)
+
+    parts, current = [], []
+    for piece in pieces:
+        candidate = separator.join(current + [piece])
+        if current and get_token_count(candidate, logger) > max_tokens:
+            parts.extend(split_text(separator.join(current), max_tokens, logger))
+            current = [piece]
+        else:
+            current.append(piece)
+
+    if current:
+        parts.extend(split_text(separator.join(current), max_tokens, logger))
+
+    return parts
+
+
+def chunk_messages(messages: list, bot_id: str, conversation_id: str, max_chunk_tokens: int, logger=None) -> list:
+    """
+    Groups imported messages into chunks ending at each assistant reply, mirroring
+    memory_manager.chunk_conversation. Imports skip LLM summarization: over-long
+    segments keep as many recent messages as fit and over-long replies are split.
+    """
+    chunks, segment = [], []
+
+    def close_segment():
+        reply = segment[-1]
+        keys = [f"{bot_id}_{msg['message_id']}_{msg['timestamp']}" for msg in segment]
+        pieces = split_text(reply["content"], max_chunk_tokens, logger)
+
+        # Fit as much of the preceding context as the token budget allows
+        remaining = max_chunk_tokens - get_token_count(pieces[0], logger)
+        context = []
+        for msg in reversed(segment[:-1]):
+            tokens = get_token_count(msg["content"], logger)
+            if remaining - tokens < 0:
+                break
+            context.insert(0, msg["content"])
+            remaining -= tokens
+
+        for piece in [("\n".join(context + [pieces[0]]))] + pieces[1:]:
+            chunks.append(
+                {
+                    "chunk_id": f"{bot_id}_chat_{conversation_id}_{len(chunks)}",
+                    "content": piece,
+                    "timestamp": reply["timestamp"],
+                    "bot_id": bot_id,
+                    "original_message_keys": keys,
+                    "summary_generated": False,
+                    "embedding_summary": None,
+                }
+            )
+
+    for message in messages:
+        segment.append(message)
+        if message["role"] == "model":
+            close_segment()
+            segment = []
+
+    # Trailing user messages with no reply are still part of the history
+    if segment:
+        close_segment()
+
+    return chunks
+
+
+class _EmbeddingPipeline:
+    """
+    Encodes chunks in fixed-size batches on a worker pool and writes them to the chunks table.
+    At most `workers` batches are in flight, which bounds memory regardless of export size.
+    Each batch is committed together with its chunk hashes and the `on_commit` callback,
+    so a checkpoint never gets ahead of the chunks it covers. A batch that fails to encode
+    is retried, then dropped and recorded in `errors`; callers must not checkpoint past it.
+    """
+
+    def __init__(self, model, connection, reasoning_text, batch_size, workers, on_commit=None, logger=None):
+        self.model = model
+        self.connection = connection
+        self.reasoning_text = reasoning_text
+        self.batch_size = batch_size
+        self.workers = workers
+        self.on_commit = on_commit
+        self.logger = logger
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.batch = []
+        self.pending = deque()
+        # Content hash -> chunk, for chunks added but not yet committed
+        self.hashes = {}
+        self.added = 0
+        self.embedded = 0
+        self.errors = []
+        self.closed = False
+
+    def add(self, chunk):
+        self.batch.append(chunk)
+        self.hashes[chunk["content_hash"]] = chunk
+        self.added += 1
+        if len(self.batch) >= self.batch_size:
+            self.submit()
+
+    def submit(self):
+        if not self.batch:
+            return
+
+        batch, self.batch = self.batch, []
+        self.pending.append((batch, self.executor.submit(self.encode, batch), 0))
+
+        while len(self.pending) > self.workers:
+            self.drain()
+
+    def encode(self, batch):
+        return self.model.encode([chunk["content"] for chunk in batch], batch_size=len(batch)).astype("float32")
+
+    def drain(self):
+        batch, future, attempts = self.pending[0]
+        try:
+            vectors = future.result()
+        except Exception as e:
+            if attempts < ENCODE_RETRIES:
+                self.pending[0] = (batch, self.executor.submit(self.encode, batch), attempts + 1)
+                return
+
+            # Give up on the batch; its chunks are not committed, so a re-run embeds them
+            self.pending.popleft()
+            for chunk in batch:
+                self.hashes.pop(chunk["content_hash"], None)
+            error = f"Failed to embed a batch of {len(batch)} chunks: {e}"
+            self.errors.append(error)
+            if self.logger:
+                self.logger(f"ERROR: {error}")
+            return
+
+        self.pending.popleft()
+        created = datetime.datetime.now().isoformat()
+
+        self.connection.executemany(
+            """
+            INSERT OR REPLACE INTO chunks (
+                chunk_id, bot_id, model_response_timestamp,
+                embedding_summary, embedding_vector, message_keys,
+                summary_generated, reasoning_text, created_at, content_text
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    chunk["chunk_id"],
+                    chunk["bot_id"],
+                    chunk["timestamp"],
+                    chunk["embedding_summary"],
+                    vector.tobytes(),
+                    json.dumps(chunk["original_message_keys"]),
+                    int(chunk["summary_generated"]),
+                    self.reasoning_text,
+                    created,
+                    chunk.get("content_text"),
+                )
+                for chunk, vector in zip(batch, vectors)
+            ],
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO chunk_hashes (bot_id, content_hash, chunk_id) VALUES (?, ?, ?)",
+            [(chunk["bot_id"], chunk["content_hash"], chunk["chunk_id"]) for chunk in batch],
+        )
+
+        self.connection.executemany(
+            "UPDATE attachments SET embedded=1 WHERE attachment_id=?",
+            [(chunk["attachment_id"],) for chunk in batch if chunk.get("attachment_last")],
+        )
+
+        self.embedded += len(batch)
+        for chunk in batch:
+            self.hashes.pop(chunk["content_hash"], None)
+        if self.on_commit:
+            self.on_commit()
+
+        self.connection.commit()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            self.submit()
+            while self.pending:
+                self.drain()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+
+def initialize_import_tables(connection):
+    """Creates the job checkpoint, chunk hash and attachment tables used by imports."""
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            job_id TEXT PRIMARY KEY,
+            bot_id TEXT NOT NULL,
+            zip_path TEXT NOT NULL,
+            status TEXT NOT NULL,
+            last_conversation_index INTEGER NOT NULL DEFAULT -1,
+            last_conversation_id TEXT,
+            conversations_processed INTEGER NOT NULL DEFAULT 0,
+            chunks_embedded INTEGER NOT NULL DEFAULT 0,
+            chunks_skipped INTEGER NOT NULL DEFAULT 0,
+            bytes_read INTEGER NOT NULL DEFAULT 0,
+            total_bytes INTEGER NOT NULL DEFAULT 0,
+            elapsed_seconds REAL NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chunk_hashes (
+            bot_id TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            PRIMARY KEY (bot_id, content_hash)
+        )
+        """
+    )
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS attachments (
+            attachment_id TEXT PRIMARY KEY,
+            message_id TEXT NOT NULL,
+            message_key TEXT NOT NULL,
+            bot_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            file_hash TEXT,
+            file_size INTEGER,
+            content_text TEXT,
+            embedded INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    connection.execute("CREATE INDEX IF NOT EXISTS attachments_message_id ON attachments (message_id)")
+    connection.execute(
+        """
+        CREATE TABLE IF NOT EXISTS attachment_text_cache (
+            file_hash TEXT PRIMARY KEY,
+            content_text TEXT
+        )
+        """
+    )
+    connection.commit()
+
+
+def import_job_id(zip_path: str, bot_id: str) -> str:
+    """Derives a stable job ID from the bot and export file, so re-running an import resumes it."""
+    stat = os.stat(zip_path)
+    key = f"{bot_id}:{os.path.abspath(zip_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(text: str) -> str:
+    """Hashes chunk text; chunk_hashes is keyed per bot so identical text is embedded once per bot."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _load_job(connection, job_id):
+    connection.row_factory = sqlite3.Row
+    try:
+        row = connection.execute("SELECT * FROM import_jobs WHERE job_id=?", (job_id,)).fetchone()
+    finally:
+        connection.row_factory = None
+    return dict(row) if row else None
+
+
+def _save_job(connection, job):
+    job["updated_at"] = datetime.datetime.now().isoformat()
+    columns = list(job.keys())
+    connection.execute(
+        f"INSERT OR REPLACE INTO import_jobs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        [job[column] for column in columns],
+    )
+
+
+def _store_messages(connection, messages, bot_id):
+    connection.executemany(
+        """
+        INSERT OR IGNORE INTO messages (
+            unique_key, message_id, author_id, timestamp, content, bot_observer_id, edited_from_id
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (f"{bot_id}_{msg['message_id']}_{msg['timestamp']}", msg["message_id"], msg["author_id"], msg["timestamp"], msg["content"], bot_id, None)
+            for msg in messages
+        ],
+    )
+
+
+def _hash_exists(connection, bot_id, digest):
+    return connection.execute("SELECT 1 FROM chunk_hashes WHERE bot_id=? AND content_hash=?", (bot_id, digest)).fetchone() is not None
+
+
+def _attachment_index(archive):
+    """Maps export file IDs ("file-<id>-<name>" members) to ZIP member names."""
+    index = {}
+    for member in archive.namelist():
+        base = os.path.basename(member)
+        if base.startswith("file-"):
+            index.setdefault("-".join(base.split("-")[:2]), member)
+        index.setdefault(base, member)
+    return index
+
+
+def _resolve_attachment(archive, index, attachment):
+    """Returns the ZipInfo for an attachment reference, or None if the file is not in the export."""
+    if attachment["path"]:
+        try:
+            return archive.getinfo(attachment["path"])
+        except KeyError:
+            pass
+
+    member = index.get(attachment["id"]) or index.get(attachment["name"])
+    return archive.getinfo(member) if member else None
+
+
+class _AttachmentExtractor:
+    """
+    Extracts attachment text on a process pool and feeds it, chunked with the message
+    chunker, into the shared embedding pipeline. Extracted text is cached by file hash
+    (the member's CRC-32 and size from the ZIP directory), so re-imports skip extraction.
+    """
+
+    def __init__(self, zip_path, connection, pipeline, bot_id, max_chunk_tokens, workers, logger, result):
+        self.zip_path = zip_path
+        self.connection = connection
+        self.pipeline = pipeline
+        self.bot_id = bot_id
+        self.max_chunk_tokens = max_chunk_tokens
+        self.workers = workers
+        self.logger = logger
+        self.result = result
+        # Spawned workers only import the lightweight attachments module, and forking a process that runs threads is avoided
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.pending = deque()
+
+    def add(self, archive, index, message, position, attachment, entry):
+        """Queues an attachment of message; entry is the checkpoint record of its conversation."""
+        info = _resolve_attachment(archive, index, attachment)
+        if info is None:
+            self.skip(f"Attachment '{attachment['name']}' of {message['message_id']} not found in export")
+            return
+
+        file_type = attachment_file_type(attachment["name"], attachment["type"])
+        context = {
+            "attachment_id": f"{self.bot_id}_{message['message_id']}_{position}",
+            "message": message,
+            "filename": attachment["name"],
+            "file_type": file_type,
+            "file_hash": f"{info.CRC:08x}{info.file_size:x}",
+            "file_size": info.file_size,
+            "entry": entry,
+        }
+
+        if extractor_for(file_type) is None:
+            self.finish(context, None)
+            return
+        if info.file_size > size_limit(file_type):
+            self.skip(f"Attachment '{attachment['name']}' is too large to extract ({info.file_size} bytes)")
+            self.finish(context, None)
+            return
+
+        cached = self.connection.execute("SELECT content_text FROM attachment_text_cache WHERE file_hash=?", (context["file_hash"],)).fetchone()
+        if cached:
+            self.finish(context, cached[0])
+            return
+
+        entry[3] += 1
+        self.pending.append((context, self.executor.submit(extract_attachment, self.zip_path, info.filename, file_type)))
+
+        # Bound the number of extractions in flight
+        while len(self.pending) > 2 * self.workers:
+            self.collect()
+        while self.pending and self.pending[0][1].done():
+            self.collect()
+
+    def collect(self):
+        context, future = self.pending.popleft()
+        context["entry"][3] -= 1
+        try:
+            text = future.result()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO attachment_text_cache (file_hash, content_text) VALUES (?, ?)", (context["file_hash"], text)
+            )
+        except Exception as e:
+            self.skip(f"Failed to extract attachment '{context['filename']}': {e}")
+            text = None
+
+        self.finish(context, text)
+
+    def finish(self, context, text):
+        message = context["message"]
+        message_key = f"{self.bot_id}_{message['message_id']}_{message['timestamp']}"
+
+        chunks = []
+        for piece in split_text(text, self.max_chunk_tokens) if text else []:
+            chunk = {
+                "chunk_id": f"{context['attachment_id']}_{len(chunks)}",
+                "content": f"[Attachment: {context['filename']}]\n{piece}",
+                "timestamp": message["timestamp"],
+                "bot_id": self.bot_id,
+                "original_message_keys": [message_key],
+                "summary_generated": False,
+                "embedding_summary": None,
+                "attachment_id": context["attachment_id"],
+            }
+            # Attachment text is not part of any message, so the chunk stores it for search results
+            chunk["content_text"] = chunk["content"]
+            chunk["content_hash"] = content_hash(chunk["content"])
+            if self.link(chunk["content_hash"], message_key):
+                self.result["chunks_skipped"] += 1
+            else:
+                chunks.append(chunk)
+
+        if chunks:
+            chunks[-1]["attachment_last"] = True
+
+        self.connection.execute(
+            """
+            INSERT OR REPLACE INTO attachments (
+                attachment_id, message_id, message_key, bot_id, filename, file_type,
+                file_hash, file_size, content_text, embedded, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                context["attachment_id"],
+                message["message_id"],
+                message_key,
+                self.bot_id,
+                context["filename"],
+                context["file_type"],
+                context["file_hash"],
+                context["file_size"],
+                text,
+                int(bool(text) and not chunks),
+                datetime.datetime.now().isoformat(),
+            ),
+        )
+
+        for chunk in chunks:
+            self.pipeline.add(chunk)
+
+        # The conversation can only be checkpointed once these chunks are committed
+        context["entry"][2] = max(context["entry"][2], self.pipeline.added)
+        self.result["attachments_processed"] += 1
+
+    def link(self, digest, message_key):
+        """
+        Links message_key to the chunk already holding this text, so an attachment shared by
+        several messages is embedded once but found from each of them. Returns False if no
+        chunk holds the text yet.
+        """
+        pending = self.pipeline.hashes.get(digest)
+        if pending is not None:
+            if message_key not in pending["original_message_keys"]:
+                pending["original_message_keys"].append(message_key)
+            return True
+
+        row = self.connection.execute("SELECT chunk_id FROM chunk_hashes WHERE bot_id=? AND content_hash=?", (self.bot_id, digest)).fetchone()
+        if row is None:
+            return False
+
+        keys = self.connection.execute("SELECT message_keys FROM chunks WHERE chunk_id=?", row).fetchone()
+        if keys:
+            keys = json.loads(keys[0])
+            if message_key not in keys:
+                self.connection.execute("UPDATE chunks SET message_keys=? WHERE chunk_id=?", (json.dumps(keys + [message_key]), row[0]))
+        return True
+
+    def skip(self, error):
+        self.result["attachments_skipped"] += 1
+        self.result["errors"].append(error)
+        self.logger(f"WARNING: {error}")
+
+    def close(self):
+        while self.pending:
+            self.collect()
+        self.executor.shutdown()
+
+
+def import_chatgpt_export_sync(
+    zip_path: str,
+    bot_id: str,
+    logger,
+    db_path: str = None,
+    max_chunk_tokens: int = MAX_TOKENS_FOR_RESPONSE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    extract_workers: int = DEFAULT_EXTRACT_WORKERS,
+    progress=None,
+) -> dict:
+    """
+    Imports every conversation in a ChatGPT export ZIP into the memory shard of bot_id
+    (or into db_path, if given).
+    conversations.json is decompressed and parsed as a stream, so memory use stays
+    bounded by one conversation plus the in-flight embedding batches.
+
+    The import runs as a persistent job: progress is checkpointed in import_jobs after
+    every committed batch, so an interrupted import resumes after the last fully embedded
+    conversation, and chunks already embedded (by content hash) are never embedded twice.
+
+    Attachment text is extracted on a pool of extract_workers processes and embedded in
+    the same batches as message chunks.
+    """
+    result = {
+        "status": "success",
+        "job_id": None,
+        "conversations_processed": 0,
+        "messages_stored": 0,
+        "chunks_embedded": 0,
+        "chunks_skipped": 0,
+        "attachments_processed": 0,
+        "attachments_skipped": 0,
+        "errors": [],
+    }
+
+    embedding_model = _load_embedding_model_once(_embedding_model_name_for_tokenizer)
+    if embedding_model is None:
+        logger("FATAL: Embedding model not loaded. Cannot import ChatGPT export.")
+        result["status"] = "error"
+        result["errors"].append("Embedding model not loaded")
+        return result
+
+    db_path = memory_db_path(bot_id, db_path)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    initialize_memory_database(db_path, logger)
+    connection = sqlite3.connect(db_path)
+    initialize_import_tables(connection)
+
+    job_id = import_job_id(zip_path, bot_id)
+    result["job_id"] = job_id
+    job = _load_job(connection, job_id)
+    if job and job["status"] == "completed":
+        logger(f"Import job {job_id} for '{zip_path}' already completed. Nothing to do.")
+        connection.close()
+        result.update({key: job[key] for key in ("conversations_processed", "chunks_embedded", "chunks_skipped")})
+        return result
+
+    if job:
+        logger(f"Resuming import job {job_id} after conversation #{job['last_conversation_index']} ({job['last_conversation_id']}).")
+    else:
+        now = datetime.datetime.now().isoformat()
+        job = {"job_id": job_id, "bot_id": bot_id, "zip_path": os.path.abspath(zip_path), "status": "running", "created_at": now}
+        job.update({"last_conversation_index": -1, "last_conversation_id": None, "conversations_processed": 0})
+        job.update({"chunks_embedded": 0, "chunks_skipped": 0, "bytes_read": 0, "total_bytes": 0, "elapsed_seconds": 0.0, "error": None})
+
+    job["status"], job["error"] = "running", None
+    _save_job(connection, job)
+    connection.commit()
+
+    # Conversations queued for embedding, as [index, id, chunks added once queued, attachments pending]
+    queued = deque()
+    start, elapsed = time.monotonic(), job["elapsed_seconds"]
+    counter = None
+
+    def checkpoint():
+        # Advance the checkpoint to the last conversation whose chunks are all committed.
+        # Once a batch has failed, the checkpoint stays before it so a re-run embeds its chunks.
+        while queued and not pipeline.errors and queued[0][3] == 0 and queued[0][2] <= pipeline.embedded:
+            index, conversation_id, _, _ = queued.popleft()
+            job["last_conversation_index"], job["last_conversation_id"] = index, conversation_id
+            job["conversations_processed"] = index + 1
+
+        job["chunks_embedded"] += pipeline.embedded - checkpoint.embedded
+        checkpoint.embedded = pipeline.embedded
+        job["chunks_skipped"] = skipped_base + result["chunks_skipped"]
+        job["bytes_read"] = counter.bytes_read if counter else job["bytes_read"]
+        job["elapsed_seconds"] = elapsed + time.monotonic() - start
+        _save_job(connection, job)
+
+    checkpoint.embedded = 0
+    skipped_base = job["chunks_skipped"]
+    pipeline = _EmbeddingPipeline(
+        embedding_model, connection, "Imported from ChatGPT export.", batch_size, workers, on_commit=checkpoint, logger=logger
+    )
+    extractor = _AttachmentExtractor(zip_path, connection, pipeline, bot_id, max_chunk_tokens, extract_workers, logger, result)
+
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            job["total_bytes"] = archive.getinfo(CONVERSATIONS_MEMBER).file_size
+            index = _attachment_index(archive)
+            counter = _CountingReader(archive.open(CONVERSATIONS_MEMBER))
+            with io.TextIOWrapper(io.BufferedReader(counter), encoding="utf-8") as stream:
+                for position, conversation in enumerate(iter_json_array(stream)):
+                    # Conversations up to the checkpoint are already stored
+                    if position <= job["last_conversation_index"]:
+                        continue
+
+                    # Conversations without an ID fall back to their array position, so their chunk IDs stay unique
+                    conversation_id = conversation.get("id") or conversation.get("conversation_id") or f"pos{position}"
+                    entry = [position, conversation_id, 0, 0]
+                    try:
+                        messages = conversation_messages(conversation)
+                        _store_messages(connection, messages, bot_id)
+                        result["messages_stored"] += len(messages)
+
+                        for chunk in chunk_messages(messages, bot_id, conversation_id, max_chunk_tokens):
+                            chunk["content_hash"] = content_hash(chunk["content"])
+                            if chunk["content_hash"] in pipeline.hashes or _hash_exists(connection, bot_id, chunk["content_hash"]):
+                                result["chunks_skipped"] += 1
+                            else:
+                                pipeline.add(chunk)
+
+                        for message in messages:
+                            for number, attachment in enumerate(message["attachments"]):
+                                extractor.add(archive, index, message, number, attachment, entry)
+                    except Exception as e:
+                        result["errors"].append(f"Conversation {conversation_id}: {e}")
+                        logger(f"ERROR: Failed to import conversation {conversation_id}: {e}")
+
+                    entry[2] = max(entry[2], pipeline.added)
+                    queued.append(entry)
+                    result["conversations_processed"] += 1
+
+                    # Conversations that produced no new chunks can be checkpointed right away
+                    if not pipeline.batch and not pipeline.pending and not extractor.pending:
+                        checkpoint()
+                        connection.commit()
+
+                    if result["conversations_processed"] % PROGRESS_EVERY == 0:
+                        checkpoint()
+                        connection.commit()
+
+                        status = import_status(job)
+                        eta = f"{status['eta_seconds']:.0f}s" if status["eta_seconds"] is not None else "unknown"
+                        logger(
+                            f"Import progress: {status['conversations_processed']} conversations, "
+                            f"{status['chunks_embedded']} chunks embedded, {status['percent']:.1f}% read, "
+                            f"{status['chunks_per_second']:.1f} chunks/s, ETA {eta}."
+                        )
+                        if progress:
+                            progress(status)
+
+            extractor.close()
+
+        pipeline.close()
+        checkpoint()
+        if pipeline.errors:
+            # Leave the job resumable: a re-run continues from the checkpoint and embeds the failed chunks
+            job["status"], job["error"] = "failed", pipeline.errors[-1]
+            result["status"] = "error"
+            result["errors"].extend(pipeline.errors)
+        else:
+            job["status"] = "completed"
+    except (KeyError, ValueError, zipfile.BadZipFile) as e:
+        job["status"], job["error"] = "failed", str(e)
+        result["status"] = "error"
+        result["errors"].append(str(e))
+        logger(f"FATAL: Could not read ChatGPT export '{zip_path}': {e}")
+    finally:
+        # Keep everything embedded so far; a "running" job left behind by a crash resumes on restart
+        if job["status"] != "completed":
+            extractor.executor.shutdown(cancel_futures=True)
+            if not pipeline.closed:
+                try:
+                    pipeline.close()
+                except Exception as e:
+                    logger(f"ERROR: Failed to flush embedding batches: {e}")
+            checkpoint()
+        _save_job(connection, job)
+        connection.commit()
+        connection.close()
+
+        # Chunks were written around the shard cache, so its vector index must be rebuilt
+        invalidate_memory_shard(bot_id, db_path)
+
+    result["chunks_embedded"] = pipeline.embedded
+    logger(
+        f"Import job {job_id}: {result['conversations_processed']} conversations ({result['chunks_embedded']} chunks embedded, "
+        f"{result['chunks_skipped']} skipped) in {time.monotonic() - start:.1f}s."
+    )
+    return result
+
+
+def import_status(job: dict) -> dict:
+    """Summarizes a job row with throughput and an ETA estimated from the share of conversations.json read."""
+    elapsed = job["elapsed_seconds"] or 0.0
+    fraction = job["bytes_read"] / job["total_bytes"] if job["total_bytes"] else 0.0
+    if job["status"] == "completed":
+        eta = 0.0
+    else:
+        eta = elapsed * (1 - fraction) / fraction if fraction else None
+
+    return {
+        "job_id": job["job_id"],
+        "bot_id": job["bot_id"],
+        "status": job["status"],
+        "conversations_processed": job["conversations_processed"],
+        "last_conversation_id": job["last_conversation_id"],
+        "chunks_embedded": job["chunks_embedded"],
+        "chunks_skipped": job["chunks_skipped"],
+        "percent": 100 * fraction,
+        "conversations_per_second": job["conversations_processed"] / elapsed if elapsed else 0.0,
+        "chunks_per_second": job["chunks_embedded"] / elapsed if elapsed else 0.0,
+        "elapsed_seconds": elapsed,
+        "eta_seconds": eta,
+        "error": job["error"],
+    }
+
+
+def get_import_status(job_id: str, bot_id: str, db_path: str = None):
+    """Returns the status of an import job, or None if the job is unknown."""
+    connection = sqlite3.connect(memory_db_path(bot_id, db_path))
+    try:
+        initialize_import_tables(connection)
+        job = _load_job(connection, job_id)
+    finally:
+        connection.close()
+    return import_status(job) if job else None
+
+
+async def import_chatgpt_export(zip_path: str, bot_id: str, logger, db_path: str = None, **kwargs) -> dict:
+    """Async wrapper around import_chatgpt_export_sync that runs the import off the event loop."""
+    return await asyncio.to_thread(import_chatgpt_export_sync, zip_path, bot_id, logger, db_path, **kwargs)
+
+
+# Background import tasks, referenced here so they are not garbage collected while running
+_running_jobs = set()
+
+
+def start_import_job(zip_path: str, bot_id: str, logger, db_path: str = None, **kwargs) -> str:
+    """Starts an import as a background task on the running event loop and returns its job ID."""
+    task = asyncio.create_task(import_chatgpt_export(zip_path, bot_id, logger, db_path, **kwargs))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return import_job_id(zip_path, bot_id)
+
+
+def resume_import_jobs(logger, db_path: str = None) -> list:
+    """
+    Restarts every job left "running" by a crash or restart, in db_path or in every memory
+    shard. Must be called from a running event loop.
+    """
+    rows = []
+    for path in [db_path] if db_path else shard_db_paths(MEMORY_SHARD_DIR):
+        connection = sqlite3.connect(path)
+        try:
+            initialize_import_tables(connection)
+            rows.extend((*row, db_path) for row in connection.execute("SELECT job_id, zip_path, bot_id FROM import_jobs WHERE status='running'"))
+        finally:
+            connection.close()
+
+    job_ids = []
+    for job_id, zip_path, bot_id, db_path in rows:
+        if not os.path.exists(zip_path):
+            logger(f"WARNING: Cannot resume import job {job_id}: '{zip_path}' no longer exists.")
+            continue
+        logger(f"Resuming interrupted import job {job_id} for '{zip_path}'.")
+        job_ids.append(start_import_job(zip_path, bot_id, logger, db_path))
+
+    return job_ids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a ChatGPT data export ZIP into bot memory.")
+    parser.add_argument("zip_path", help="Path to the ChatGPT export ZIP")
+    parser.add_argument("--bot-id", required=True, help="Discord user ID of the bot that owns the imported memory")
+    parser.add_argument("--db", default=None, help="Memory database path (defaults to the bot's memory shard)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent embedding batches")
+    parser.add_argument("--extract-workers", type=int, default=DEFAULT_EXTRACT_WORKERS, help="Attachment extraction processes")
+    parser.add_argument("--status", action="store_true", help="Print the status of this export's import job and exit")
+    args = parser.parse_args()
+
+    if args.status:
+        print(json.dumps(get_import_status(import_job_id(args.zip_path, args.bot_id), args.bot_id, args.db), indent=2))
+    else:
+        summary = import_chatgpt_export_sync(
+            args.zip_path,
+            args.bot_id,
+            lambda msg: log_message("Importer", msg),
+            db_path=args.db,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            extract_workers=args.extract_workers,
+        )
+        print(json.dumps(summary, indent=2))
@@ -19,6 +19,12 @@ BASE_TEMPERATURE = 0.8
 # --- File Paths ---
 SERVER_CONTEXT_FILE = "server-context.txt"
 
+# --- Memory Shards ---
+# Each bot's memory lives in its own SQLite file and FAISS index under this folder
+MEMORY_SHARD_DIR = "memory"
+# Open shards are evicted (least recently used first) once their indexes exceed this size
+MEMORY_SHARD_CACHE_MB = 512
+
 # --- Bot Configuration ---
 BOT_CONFIG = {
     "CASSIUS": {
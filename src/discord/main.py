@@ -35,7 +35,8 @@ from config import (
 )
 from llm_handler import get_llm_response
 from discord_actions import send_bot_reply, process_special_commands
-from memory_manager import get_chat_history, initialize_memory_database, process_and_store_memory # chunk_conversation removed for this version
+from memory_manager import get_chat_history, migrate_shared_database, close_memory_shards, process_and_store_memory # chunk_conversation removed for this version
+from chatgpt_importer import resume_import_jobs
 from utils import log_message, check_keyword_trigger, parse_llm_response_robustly
 
 
@@ -234,9 +235,12 @@ async def main():
     except Exception as e:
         log_message("System", f"Warning: Could not load server context: {e}.")
 
-    db_path = "memory.db"
+    # Memory is sharded per bot; split up a legacy shared database on first start
     logger_func = lambda msg: log_message("System", msg)
-    initialize_memory_database(db_path, logger_func)
+    migrate_shared_database("memory.db", logger_func)
+
+    # Pick up any ChatGPT history imports interrupted by a crash or restart
+    resume_import_jobs(logger_func)
 
     tasks = []
     log_message("System", "Preparing to configure bots...")
@@ -265,3 +269,5 @@ if __name__ == "__main__":
         asyncio.run(main())
     except KeyboardInterrupt:
         print("\nBots shutting down.")
+    finally:
+        close_memory_shards()
@@ -1,7 +1,9 @@
 # memory_manager.py
 import datetime
 import asyncio
+import base64
 import json
+import os
 import sqlite3
 from collections import deque
 import numpy as np
@@ -11,7 +13,8 @@ from sentence_transformers import SentenceTransformer
 
 # Import components for LLM calls for summarization
 from llm_handler import get_llm_response
-from config import BOT_CONFIG, MAX_TOKENS_FOR_RESPONSE # Ensure MAX_TOKENS_FOR_RESPONSE is imported from config
+from config import BOT_CONFIG, MAX_TOKENS_FOR_RESPONSE, MEMORY_SHARD_DIR, MEMORY_SHARD_CACHE_MB # Ensure MAX_TOKENS_FOR_RESPONSE is imported from config
+from memory_shards import ShardCache, shard_db_path
 
 
 # --- Global tokenizer instance ---
@@ -21,6 +24,34 @@ _embedding_model_name_for_tokenizer = "NovaSearch/stella_en_1.5B_v5" # Corrected
 # --- Global embedding model instance ---
 _embedding_model = None
 
+# --- Per-bot memory shards (one SQLite file and FAISS index each) ---
+_shards = ShardCache(
+    MEMORY_SHARD_DIR,
+    MEMORY_SHARD_CACHE_MB * 1024 * 1024,
+    initialize=lambda path: initialize_memory_database(path, lambda msg: print(f"DEBUG: {msg}")),
+    logger=print,
+)
+
+
+def get_memory_shard(bot_id: str, db_path: str = None):
+    """Returns the open memory shard for a bot. db_path overrides the shard location."""
+    return _shards.get(bot_id, db_path)
+
+
+def memory_db_path(bot_id: str, db_path: str = None) -> str:
+    """Resolves the SQLite file holding a bot's memory: its shard unless db_path is given."""
+    return db_path or shard_db_path(bot_id, MEMORY_SHARD_DIR)
+
+
+def invalidate_memory_shard(bot_id: str, db_path: str = None):
+    """Forces a shard's vector index to be rebuilt after its database was written directly."""
+    _shards.invalidate(memory_db_path(bot_id, db_path))
+
+
+def close_memory_shards():
+    """Flushes every open shard index to disk."""
+    _shards.close()
+
 def _load_embedding_model_once(model_name: str):
     global _embedding_model
     if _embedding_model is None:
@@ -64,72 +95,128 @@ def get_token_count(text: str, logger=None) -> int:
         return len(text.split())
 
 
-async def search_similar_chunks(query_text: str, bot_id: str, top_k: int = 3, logger=None, db_path: str = "memory.db") -> list:
-    """Retrieve up to top_k similar chunks from the database using FAISS."""
+# Fields that search_memory_batch can return for each result
+MEMORY_SEARCH_FIELDS = ("chunk_id", "score", "content", "summary", "message_keys", "timestamp")
+
+
+def encode_search_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode("utf-8")).decode("ascii")
+
+
+def decode_search_cursor(cursor: str) -> int:
+    try:
+        return max(int(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")), 0)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid search cursor: {cursor!r}")
+
+
+async def search_memory_batch(
+    queries: list,
+    bot_id: str,
+    top_k: int = 3,
+    cursor: str = None,
+    fields: list = None,
+    logger=None,
+    db_path: str = None,
+) -> dict:
+    """
+    Runs several memory queries at once: all queries are embedded in one encode call and
+    searched with one FAISS call against the bot's shard.
+
+    Returns {"results": [{"query", "results": [...]}, ...], "next_cursor"}, where each result
+    is a dict restricted to `fields` (default: all of MEMORY_SEARCH_FIELDS). Pass next_cursor
+    back as `cursor` to fetch the following top_k results of every query.
+    """
+    fields = list(fields or MEMORY_SEARCH_FIELDS)
+    unknown = set(fields) - set(MEMORY_SEARCH_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown memory search fields: {sorted(unknown)}")
+
+    offset = decode_search_cursor(cursor) if cursor else 0
+    response = {"results": [{"query": query, "results": []} for query in queries], "next_cursor": None}
+    if not queries:
+        return response
 
     embedding_model = _load_embedding_model_once(_embedding_model_name_for_tokenizer)
     if embedding_model is None:
         if logger:
             logger("FATAL: Embedding model not loaded. Cannot perform similarity search.")
-        return []
+        return response
+
+    shard = await asyncio.to_thread(get_memory_shard, bot_id, db_path)
+    query_vecs = (await asyncio.to_thread(embedding_model.encode, list(queries))).astype("float32")
+
+    # One extra result per query tells whether another page exists
+    distances, retrieved_ids = await asyncio.to_thread(shard.search, query_vecs, offset + top_k + 1)
+    pages = []
+    for query_distances, query_ids in zip(distances, retrieved_ids):
+        hits = [(int(i), float(d)) for i, d in zip(query_ids, query_distances) if i >= 0]
+        if len(hits) > offset + top_k:
+            response["next_cursor"] = encode_search_cursor(offset + top_k)
+        pages.append(hits[offset : offset + top_k])
+
+    rowids = sorted({rowid for page in pages for rowid, _ in page})
+    if not rowids:
+        return response
 
     def _fetch_chunks():
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(shard.db_path)
         cursor = conn.cursor()
+        placeholders = ",".join(["?" for _ in rowids])
         cursor.execute(
-            "SELECT chunk_id, embedding_summary, embedding_vector, message_keys, summary_generated FROM chunks WHERE bot_id=?",
-            (bot_id,),
+            f"SELECT rowid, chunk_id, embedding_summary, message_keys, summary_generated, model_response_timestamp, content_text FROM chunks WHERE rowid IN ({placeholders})",
+            rowids,
         )
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
+        rows = {r[0]: r[1:] for r in cursor.fetchall()}
 
-    rows = await asyncio.to_thread(_fetch_chunks)
-    if not rows:
-        return []
+        # Message text is only loaded when content is requested, with one query for every chunk
+        messages = {}
+        keys = sorted({k for r in rows.values() for k in json.loads(r[2])}) if "content" in fields else []
+        for i in range(0, len(keys), 500):
+            batch = keys[i : i + 500]
+            placeholders = ",".join(["?" for _ in batch])
+            cursor.execute(f"SELECT unique_key, content FROM messages WHERE unique_key IN ({placeholders})", batch)
+            messages.update(cursor.fetchall())
 
-    vectors = [np.frombuffer(r[2], dtype="float32") for r in rows]
-    dimension = vectors[0].shape[0]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(np.vstack(vectors))
+        conn.close()
+        return rows, messages
 
-    query_vec = embedding_model.encode([query_text]).astype("float32")
-    _d, retrieved_idx = index.search(query_vec, min(top_k, len(vectors)))
+    rows, messages = await asyncio.to_thread(_fetch_chunks)
 
-    similar_chunks = []
+    for entry, page in zip(response["results"], pages):
+        for rowid, distance in page:
+            # Chunks replaced since the index was written no longer exist
+            if rowid not in rows:
+                continue
 
-    for idx in retrieved_idx[0]:
-        chunk_id, embedding_summary, _vec, message_keys_json, summary_generated = rows[idx]
-        message_keys = json.loads(message_keys_json)
+            chunk_id, embedding_summary, message_keys_json, summary_generated, timestamp, content_text = rows[rowid]
+            message_keys = json.loads(message_keys_json)
+            summary = embedding_summary if summary_generated else None
 
-        def _fetch_messages(keys):
-            if not keys:
-                return []
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            placeholders = ",".join(["?" for _ in keys])
-            cursor.execute(
-                f"SELECT unique_key, content FROM messages WHERE unique_key IN ({placeholders})",
-                keys,
-            )
-            data = cursor.fetchall()
-            conn.close()
-            mapping = {k: v for k, v in data}
-            return [mapping.get(k, "") for k in keys]
+            result = {
+                "chunk_id": chunk_id,
+                "score": 1.0 / (1.0 + distance),
+                "summary": summary,
+                "message_keys": message_keys,
+                "timestamp": timestamp,
+            }
+            if "content" in fields:
+                # Attachment chunks keep their own text after the messages that carry the attachment
+                parts = ([summary] if summary else []) + [messages.get(k, "") for k in message_keys] + ([content_text] if content_text else [])
+                result["content"] = "\n".join(parts)
 
-        messages = await asyncio.to_thread(_fetch_messages, message_keys)
+            entry["results"].append({field: result[field] for field in fields})
 
-        chunk_parts = []
-        if summary_generated and embedding_summary:
-            chunk_parts.append(embedding_summary)
-        chunk_parts.extend(messages)
+    return response
 
-        similar_chunks.append("\n".join(chunk_parts))
 
-    return similar_chunks
+async def search_similar_chunks(query_text: str, bot_id: str, top_k: int = 3, logger=None, db_path: str = None) -> list:
+    """Retrieve up to top_k similar chunks from the bot's memory shard using FAISS."""
+    response = await search_memory_batch([query_text], bot_id, top_k=top_k, fields=["content"], logger=logger, db_path=db_path)
+    return [result["content"] for result in response["results"][0]["results"]]
 
 
-async def get_chat_history(message, limit=10, logger=None, bot_id=None, db_path: str = "memory.db", retrieval_k: int = 3):
+async def get_chat_history(message, limit=10, logger=None, bot_id=None, db_path: str = None, retrieval_k: int = 3):
     """Return recent Discord history combined with relevant past memory."""
     history_messages = []
     try:
@@ -218,10 +305,16 @@ def initialize_memory_database(db_path: str, logger):
                 message_keys TEXT NOT NULL,
                 summary_generated INTEGER NOT NULL,
                 reasoning_text TEXT,
-                created_at TEXT NOT NULL
+                created_at TEXT NOT NULL,
+                content_text TEXT
             )
         """)
 
+        # content_text holds the text of chunks not rebuilt from messages (e.g. attachment text)
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(chunks)")}
+        if "content_text" not in columns:
+            cursor.execute("ALTER TABLE chunks ADD COLUMN content_text TEXT")
+
         conn.commit()
         logger(f"Memory database '{db_path}' initialized successfully.")
 
@@ -232,11 +325,56 @@ def initialize_memory_database(db_path: str, logger):
             conn.close()
 
 
-async def store_messages_to_db(messages: list, bot_id: str, logger, db_path: str = "memory.db"):
-    """Persist a list of message dictionaries into the messages table."""
+LEGACY_CHUNK_COLUMNS = (
+    "chunk_id, bot_id, model_response_timestamp, embedding_summary, embedding_vector, "
+    "message_keys, summary_generated, reasoning_text, created_at"
+)
+
+
+def migrate_shared_database(db_path: str, logger):
+    """
+    Splits a legacy shared memory database into per-bot shards. The shared file is
+    renamed to '<db_path>.migrated' once every bot's rows have been copied.
+    """
+    if not os.path.exists(db_path):
+        return
+
+    conn = sqlite3.connect(db_path)
+    try:
+        bot_ids = [r[0] for r in conn.execute("SELECT DISTINCT bot_id FROM chunks UNION SELECT DISTINCT bot_observer_id FROM messages") if r[0] is not None]
+
+        # Rows without an owning bot cannot be assigned to a shard; they stay in the renamed shared file
+        orphans = conn.execute(
+            "SELECT (SELECT count(*) FROM chunks WHERE bot_id IS NULL) + (SELECT count(*) FROM messages WHERE bot_observer_id IS NULL)"
+        ).fetchone()[0]
+        if orphans:
+            logger(f"WARNING: {orphans} memory rows in '{db_path}' have no bot ID and were not migrated.")
+        for bot_id in bot_ids:
+            path = memory_db_path(bot_id)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            initialize_memory_database(path, logger)
+
+            conn.execute("ATTACH DATABASE ? AS shard", (path,))
+            conn.execute("INSERT OR IGNORE INTO shard.messages SELECT * FROM messages WHERE bot_observer_id=?", (bot_id,))
+            conn.execute(f"INSERT OR IGNORE INTO shard.chunks ({LEGACY_CHUNK_COLUMNS}) SELECT {LEGACY_CHUNK_COLUMNS} FROM chunks WHERE bot_id=?", (bot_id,))
+            conn.commit()
+            conn.execute("DETACH DATABASE shard")
+            invalidate_memory_shard(bot_id)
+            logger(f"Migrated memory for bot {bot_id} into shard '{path}'.")
+    except sqlite3.Error as e:
+        logger(f"FATAL: Could not migrate shared memory database '{db_path}': {e}")
+        return
+    finally:
+        conn.close()
+
+    os.replace(db_path, f"{db_path}.migrated")
+
+
+async def store_messages_to_db(messages: list, bot_id: str, logger, db_path: str = None):
+    """Persist a list of message dictionaries into the messages table of the bot's shard."""
 
     def _store():
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(get_memory_shard(bot_id, db_path).db_path)
         cursor = conn.cursor()
         for msg in messages:
             unique_key = f"{bot_id}_{msg['message_id']}_{msg['timestamp']}"
@@ -263,20 +401,25 @@ async def store_messages_to_db(messages: list, bot_id: str, logger, db_path: str
     logger(f"DEBUG: Stored {len(messages)} messages to DB.")
 
 
-async def store_chunks_to_db(chunks: list, bot_id: str, logger, reasoning_text: str, db_path: str = "memory.db"):
-    """Generate embeddings and store chunks into the database."""
+async def store_chunks_to_db(chunks: list, bot_id: str, logger, reasoning_text: str, db_path: str = None):
+    """Generate embeddings and store chunks into the bot's shard, keeping its vector index in sync."""
 
     embedding_model = _load_embedding_model_once(_embedding_model_name_for_tokenizer)
     if embedding_model is None:
         logger("FATAL: Embedding model not loaded. Skipping chunk storage.")
         return
 
+    shard = await asyncio.to_thread(get_memory_shard, bot_id, db_path)
+
     def _store():
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(shard.db_path)
         cursor = conn.cursor()
+        replaced, rowids, vectors = [], [], []
         for chunk in chunks:
             chunk_id = f"{bot_id}_{chunk['timestamp']}"
             vector = embedding_model.encode(chunk["content"]).astype("float32")
+            cursor.execute("SELECT rowid FROM chunks WHERE chunk_id=?", (chunk_id,))
+            replaced.extend(r[0] for r in cursor.fetchall())
             cursor.execute(
                 """
                 INSERT OR REPLACE INTO chunks (
@@ -297,9 +440,15 @@ async def store_chunks_to_db(chunks: list, bot_id: str, logger, reasoning_text:
                     datetime.datetime.now().isoformat(),
                 ),
             )
+            rowids.append(cursor.lastrowid)
+            vectors.append(vector)
         conn.commit()
         conn.close()
 
+        shard.remove(replaced)
+        if rowids:
+            shard.add(rowids, np.vstack(vectors))
+
     await asyncio.to_thread(_store)
     logger(f"DEBUG: Stored {len(chunks)} chunks to DB.")
 
@@ -420,7 +569,7 @@ async def process_and_store_memory(
     response_to_send_discord: str, # The actual content sent to discord
     reasoning_to_store: str, # The reasoning generated by the LLM
     message_id: str, # Original Discord message ID that triggered response
-    db_path: str = "memory.db"
+    db_path: str = None
 ):
     """
     Encapsulates the full memory processing pipeline for a single bot interaction:
@@ -0,0 +1,157 @@
+# memory_shards.py
+# Per-tenant memory shards. Each bot gets its own SQLite file and FAISS index, so a
+# search only ever touches one tenant's data. Shards are opened lazily and kept in an
+# LRU cache bounded by the memory their vector indexes use.
+
+import glob
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+
+def shard_db_path(tenant_id: str, root: str) -> str:
+    """Returns the SQLite path of a tenant's shard."""
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(tenant_id))
+    return os.path.join(root, f"{safe_id}.db")
+
+
+def shard_db_paths(root: str) -> list:
+    """Returns the SQLite paths of every shard under root."""
+    return sorted(glob.glob(os.path.join(root, "*.db")))
+
+
+class MemoryShard:
+    """
+    One tenant's memory: the chunks/messages SQLite file plus a FAISS index over the chunk
+    vectors, keyed by chunk rowid. The index is persisted next to the database and rebuilt
+    from SQLite whenever it is missing or out of date.
+    """
+
+    def __init__(self, tenant_id: str, db_path: str):
+        self.tenant_id = tenant_id
+        self.db_path = db_path
+        self.index_path = os.path.splitext(db_path)[0] + ".faiss"
+        self.lock = threading.RLock()
+        self.index = None
+        self.dirty = False
+
+    def load(self, logger=None):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            count, max_rowid = conn.execute("SELECT count(*), max(rowid) FROM chunks WHERE embedding_vector IS NOT NULL").fetchone()
+        finally:
+            conn.close()
+
+        if os.path.exists(self.index_path):
+            index = faiss.read_index(self.index_path)
+            ids = faiss.vector_to_array(index.id_map) if index.ntotal else np.array([], dtype="int64")
+            if index.ntotal == count and (not count or int(ids.max()) == max_rowid):
+                self.index = index
+                return
+
+            if logger:
+                logger(f"WARNING: FAISS index for shard '{self.tenant_id}' is out of date. Rebuilding.")
+
+        self.rebuild()
+
+    def rebuild(self, batch_size: int = 10000):
+        """Rebuilds the vector index from the chunks table, streaming rows in batches."""
+        with self.lock:
+            self.index = None
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.execute("SELECT rowid, embedding_vector FROM chunks WHERE embedding_vector IS NOT NULL")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    self.add([r[0] for r in rows], np.vstack([np.frombuffer(r[1], dtype="float32") for r in rows]))
+            finally:
+                conn.close()
+
+            self.dirty = True
+
+    def add(self, rowids: list, vectors: np.ndarray):
+        with self.lock:
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+            self.index.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), np.array(rowids, dtype="int64"))
+            self.dirty = True
+
+    def remove(self, rowids: list):
+        with self.lock:
+            if self.index is not None and rowids:
+                self.index.remove_ids(np.array(rowids, dtype="int64"))
+                self.dirty = True
+
+    def search(self, vectors: np.ndarray, top_k: int):
+        """Returns (distances, rowids) for each query vector; rowids of missing results are -1."""
+        with self.lock:
+            if self.index is None or not self.index.ntotal:
+                return np.zeros((len(vectors), 0), dtype="float32"), np.zeros((len(vectors), 0), dtype="int64")
+            return self.index.search(np.ascontiguousarray(vectors, dtype="float32"), min(top_k, self.index.ntotal))
+
+    @property
+    def nbytes(self) -> int:
+        return self.index.ntotal * self.index.d * 4 if self.index is not None else 0
+
+    def flush(self):
+        with self.lock:
+            if self.dirty and self.index is not None:
+                faiss.write_index(self.index, self.index_path)
+            self.dirty = False
+
+
+class ShardCache:
+    """LRU of open shards. Least recently used shards are flushed and closed once their indexes exceed budget_bytes."""
+
+    def __init__(self, root: str, budget_bytes: int, initialize=None, logger=None):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.initialize = initialize
+        self.logger = logger
+        self.shards = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, tenant_id: str, db_path: str = None) -> MemoryShard:
+        """Returns the open shard for a tenant, creating and loading it on first use."""
+        db_path = db_path or shard_db_path(tenant_id, self.root)
+        with self.lock:
+            shard = self.shards.pop(db_path, None)
+            if shard is None:
+                os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+                if self.initialize:
+                    self.initialize(db_path)
+                shard = MemoryShard(tenant_id, db_path)
+                shard.load(self.logger)
+
+            self.shards[db_path] = shard
+            self.evict()
+            return shard
+
+    def evict(self):
+        # Always keep the most recently used shard open, even if it alone exceeds the budget
+        while len(self.shards) > 1 and sum(shard.nbytes for shard in self.shards.values()) > self.budget_bytes:
+            _, shard = self.shards.popitem(last=False)
+            shard.flush()
+            if self.logger:
+                self.logger(f"DEBUG: Evicted memory shard '{shard.tenant_id}' from cache.")
+
+    def invalidate(self, db_path: str):
+        """Drops a shard whose database was changed outside the cache, forcing an index rebuild on next use."""
+        with self.lock:
+            self.shards.pop(db_path, None)
+            index_path = os.path.splitext(db_path)[0] + ".faiss"
+            if os.path.exists(index_path):
+                os.remove(index_path)
+
+    def close(self):
+        with self.lock:
+            for shard in self.shards.values():
+                shard.flush()
+            self.shards.clear()
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "discord"))
+
+import attachments
+from attachments import attachment_file_type, extract_attachment, extractor_for, size_limit
+
+
+class TestAttachmentLimits:
+    """Test attachment type detection, size limits and text extraction."""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        path = tmp_path / "export.zip"
+        with zipfile.ZipFile(path, "w") as output:
+            output.writestr("notes.txt", "line one\nline two")
+            output.writestr("data.json", json.dumps({"name": "value", "items": [1, 2]}))
+            output.writestr("page.html", "<html><style>p {}</style><script>var x;</script><p>Hello &amp; welcome</p></html>")
+            output.writestr("blank.txt", "   \n  ")
+            output.writestr("long.txt", "x" * 100)
+        yield str(path)
+        attachments._archives.pop(str(path), None).close()
+
+    def test_file_type(self):
+        assert attachment_file_type("notes.txt") == "text/plain"
+        assert attachment_file_type("notes.txt", "text/markdown") == "text/markdown"
+        assert attachment_file_type("unknown.zzz") == "application/octet-stream"
+
+    def test_size_limit(self):
+        assert size_limit("application/pdf") == 50 * 1024 * 1024
+        assert size_limit("application/json") == 20 * 1024 * 1024
+        # Falls back to the top-level type, then to the default
+        assert size_limit("text/markdown") == attachments.MAX_ATTACHMENT_BYTES["text"]
+        assert size_limit("image/png") == attachments.DEFAULT_MAX_ATTACHMENT_BYTES
+
+    def test_unsupported_types(self):
+        assert extractor_for("image/png") is None
+        assert extractor_for("application/octet-stream") is None
+        assert extractor_for("text/csv") is not None
+
+    def test_extract_text_and_json(self, archive):
+        assert extract_attachment(archive, "notes.txt", "text/plain") == "line one\nline two"
+        assert json.loads(extract_attachment(archive, "data.json", "application/json")) == {"name": "value", "items": [1, 2]}
+
+    def test_extract_html(self, archive):
+        assert extract_attachment(archive, "page.html", "text/html") == "Hello & welcome"
+
+    def test_blank_text(self, archive):
+        assert extract_attachment(archive, "blank.txt", "text/plain") is None
+
+    def test_extracted_text_is_truncated(self, archive, monkeypatch):
+        monkeypatch.setattr(attachments, "MAX_EXTRACTED_CHARS", 10)
+        assert extract_attachment(archive, "long.txt", "text/plain") == "x" * 10
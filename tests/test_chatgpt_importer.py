@@ -0,0 +1,223 @@
+import io
+import json
+import os
+import sqlite3
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "discord"))
+
+import chatgpt_importer
+from chatgpt_importer import import_chatgpt_export_sync, iter_json_array
+
+
+class TestIterJsonArray:
+    """Test streaming the top-level array of conversations.json."""
+
+    @pytest.mark.parametrize("read_size", [1, 3, 7, 1 << 16])
+    def test_yields_each_element(self, read_size):
+        items = [{"id": "conv1", "title": "Hello [world]"}, 12345, "text with \"quotes\"", [1, 2, {"a": None}], 1.5e10]
+        stream = io.StringIO(json.dumps(items, indent=2))
+        assert list(iter_json_array(stream, read_size=read_size)) == items
+
+    def test_number_at_buffer_boundary(self):
+        # A read size that splits the number must not yield a truncated value
+        assert list(iter_json_array(io.StringIO("[123456, 7]"), read_size=4)) == [123456, 7]
+
+    def test_element_larger_than_read_size(self):
+        items = [{"text": "x" * 10000}, {"text": "y"}]
+        assert list(iter_json_array(io.StringIO(json.dumps(items)), read_size=8)) == items
+
+    @pytest.mark.parametrize("text", ["", "   ", "[]", " \n [ \n ] "])
+    def test_empty_input(self, text):
+        assert list(iter_json_array(io.StringIO(text), read_size=2)) == []
+
+    def test_rejects_non_array(self):
+        with pytest.raises(ValueError, match="Expected a JSON array"):
+            list(iter_json_array(io.StringIO('{"id": 1}')))
+
+    def test_rejects_unterminated_array(self):
+        with pytest.raises(ValueError, match="Unterminated JSON array"):
+            list(iter_json_array(io.StringIO('[{"id": 1}, '), read_size=4))
+
+    def test_rejects_truncated_element(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array(io.StringIO('[{"id": 1}, {"id": '), read_size=4))
+
+
+class FakeModel:
+    """Embedding model stand-in that fails on chunks containing a marker."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def encode(self, texts, batch_size=None):
+        self.calls += 1
+        if self.fail_on and any(self.fail_on in text for text in texts):
+            raise RuntimeError("encoder unavailable")
+        return np.ones((len(texts), 4))
+
+
+class TestImportResume:
+    """Test that a failed embedding batch leaves the import job resumable."""
+
+    @pytest.fixture
+    def export_zip(self, tmp_path):
+        conversations = []
+        for number in range(5):
+            mapping = {}
+            for key, role, text in ((f"q{number}", "user", f"question {number}"), (f"a{number}", "assistant", f"answer {number}")):
+                mapping[key] = {
+                    "message": {"id": key, "author": {"role": role}, "content": {"parts": [text]}, "create_time": 1000 + 10 * number + len(mapping)}
+                }
+            conversations.append({"id": f"conv{number}", "mapping": mapping})
+
+        path = tmp_path / "export.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("conversations.json", json.dumps(conversations))
+        return str(path)
+
+    @pytest.fixture
+    def run_import(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(chatgpt_importer, "get_token_count", lambda text, logger=None: len(text.split()))
+        monkeypatch.setattr(chatgpt_importer, "invalidate_memory_shard", lambda bot_id, db_path=None: None)
+        db_path = str(tmp_path / "memory.db")
+
+        def run(zip_path, model):
+            monkeypatch.setattr(chatgpt_importer, "_load_embedding_model_once", lambda name: model)
+            result = import_chatgpt_export_sync(
+                zip_path, "bot", lambda message: None, db_path=db_path, batch_size=1, workers=1, extract_workers=1
+            )
+            connection = sqlite3.connect(db_path)
+            try:
+                job = connection.execute("SELECT status, last_conversation_index FROM import_jobs").fetchone()
+                chunks = sorted(row[0] for row in connection.execute("SELECT chunk_id FROM chunks"))
+            finally:
+                connection.close()
+            return result, job, chunks
+
+        return run
+
+    def test_failed_batch_is_retried_then_reported(self, export_zip, run_import):
+        model = FakeModel(fail_on="answer 2")
+        result, (status, last_index), chunks = run_import(export_zip, model)
+
+        assert result["status"] == "error"
+        assert any("Failed to embed a batch of 1 chunks" in error for error in result["errors"])
+        assert status == "failed"
+        # One batch per conversation, the failing batch is retried before it is dropped
+        assert model.calls == 5 + chatgpt_importer.ENCODE_RETRIES
+        # The checkpoint never moves past the conversation whose batch failed
+        assert last_index < 2
+        assert "bot_chat_conv2_0" not in chunks
+
+    def test_resume_embeds_failed_chunks(self, export_zip, run_import):
+        run_import(export_zip, FakeModel(fail_on="answer 2"))
+        result, (status, last_index), chunks = run_import(export_zip, FakeModel())
+
+        assert result["status"] == "success"
+        assert status == "completed"
+        assert last_index == 4
+        assert chunks == [f"bot_chat_conv{number}_0" for number in range(5)]
+        # Chunks committed after the failed batch are skipped by content hash, not embedded again
+        assert (result["chunks_embedded"], result["chunks_skipped"]) == (1, 2)
+
+
+class TestImportConversationIds:
+    """Test chunk IDs of conversations exported without an ID."""
+
+    def test_conversations_without_id(self, monkeypatch, tmp_path):
+        conversations = []
+        for number in range(2):
+            mapping = {}
+            for key, role, text in ((f"q{number}", "user", f"question {number}"), (f"a{number}", "assistant", f"answer {number}")):
+                mapping[key] = {
+                    "message": {"id": key, "author": {"role": role}, "content": {"parts": [text]}, "create_time": 1000 + 10 * number + len(mapping)}
+                }
+            conversations.append({"title": f"untitled {number}", "mapping": mapping})
+
+        zip_path = str(tmp_path / "export.zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            archive.writestr("conversations.json", json.dumps(conversations))
+
+        monkeypatch.setattr(chatgpt_importer, "get_token_count", lambda text, logger=None: len(text.split()))
+        monkeypatch.setattr(chatgpt_importer, "invalidate_memory_shard", lambda bot_id, db_path=None: None)
+        monkeypatch.setattr(chatgpt_importer, "_load_embedding_model_once", lambda name: FakeModel())
+
+        db_path = str(tmp_path / "memory.db")
+        result = import_chatgpt_export_sync(zip_path, "bot", lambda message: None, db_path=db_path, extract_workers=1)
+        assert result["status"] == "success"
+
+        connection = sqlite3.connect(db_path)
+        try:
+            chunks = sorted(row[0] for row in connection.execute("SELECT chunk_id FROM chunks"))
+        finally:
+            connection.close()
+
+        # Each conversation keeps its own chunks instead of overwriting the previous one
+        assert chunks == ["bot_chat_pos0_0", "bot_chat_pos1_0"]
+
+
+class TestImportAttachments:
+    """Test importing attachment text alongside conversation messages."""
+
+    @pytest.fixture
+    def export_zip(self, tmp_path):
+        def message(key, role, text, created, files=()):
+            content = {"parts": [text], "attachments": [{"name": name, "path": f"attachments/{name}"} for name in files]}
+            return {"message": {"id": key, "author": {"role": role}, "content": content, "create_time": created}}
+
+        conversations = [
+            {
+                "id": "conv0",
+                "mapping": {
+                    "q0": message("q0", "user", "see notes", 1000, ["notes.txt", "big.txt"]),
+                    "a0": message("a0", "assistant", "read them", 1001),
+                },
+            },
+            {
+                "id": "conv1",
+                "mapping": {
+                    "q1": message("q1", "user", "same notes again", 1010, ["copy/notes.txt"]),
+                    "a1": message("a1", "assistant", "still read", 1011),
+                },
+            },
+        ]
+
+        path = tmp_path / "export.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("conversations.json", json.dumps(conversations))
+            archive.writestr("attachments/notes.txt", "meeting notes about the garden")
+            archive.writestr("attachments/copy/notes.txt", "meeting notes about the garden")
+            archive.writestr("attachments/big.txt", "x " * 100)
+        return str(path)
+
+    def test_limits_and_shared_attachments(self, export_zip, monkeypatch, tmp_path):
+        monkeypatch.setattr(chatgpt_importer, "get_token_count", lambda text, logger=None: len(text.split()))
+        monkeypatch.setattr(chatgpt_importer, "invalidate_memory_shard", lambda bot_id, db_path=None: None)
+        monkeypatch.setattr(chatgpt_importer, "_load_embedding_model_once", lambda name: FakeModel())
+        monkeypatch.setattr(chatgpt_importer, "size_limit", lambda file_type: 100)
+
+        db_path = str(tmp_path / "memory.db")
+        result = import_chatgpt_export_sync(export_zip, "bot", lambda message: None, db_path=db_path, extract_workers=1)
+
+        assert result["status"] == "success"
+        assert result["attachments_processed"] == 3
+        assert result["attachments_skipped"] == 1
+        assert any("'big.txt' is too large" in error for error in result["errors"])
+
+        connection = sqlite3.connect(db_path)
+        try:
+            rows = connection.execute("SELECT message_keys, content_text FROM chunks WHERE content_text IS NOT NULL").fetchall()
+        finally:
+            connection.close()
+
+        # The shared attachment is embedded once, stores its text and links both messages
+        assert len(rows) == 1
+        keys, text = rows[0]
+        assert text == "[Attachment: notes.txt]\nmeeting notes about the garden"
+        assert sorted(key.split("_")[2] for key in json.loads(keys)) == ["q0", "q1"]
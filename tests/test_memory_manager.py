@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "discord"))
+
+import memory_manager
+from memory_manager import initialize_memory_database, migrate_shared_database, search_memory_batch
+from memory_shards import ShardCache
+
+
+class TestMigrateSharedDatabase:
+    """Test splitting the legacy shared memory database into per-bot shards."""
+
+    @pytest.fixture
+    def shared_db(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(memory_manager, "MEMORY_SHARD_DIR", str(tmp_path / "memory"))
+
+        path = str(tmp_path / "memory.db")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE messages (unique_key TEXT PRIMARY KEY, message_id TEXT, author_id TEXT, timestamp TEXT, "
+            "content TEXT, bot_observer_id TEXT, edited_from_id TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE chunks (chunk_id TEXT PRIMARY KEY, bot_id TEXT, model_response_timestamp TEXT, embedding_summary TEXT, "
+            "embedding_vector BLOB, message_keys TEXT, summary_generated INTEGER, reasoning_text TEXT, created_at TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO messages VALUES (?, ?, 'user', '2024-01-01', ?, ?, NULL)",
+            [("a_1", "1", "hello a", "a"), ("b_2", "2", "hello b", "b"), ("x_3", "3", "hello nobody", None)],
+        )
+        conn.executemany(
+            "INSERT INTO chunks VALUES (?, ?, '2024-01-01', NULL, NULL, '[]', 0, NULL, '2024-01-01')",
+            [("a_chunk", "a"), ("x_chunk", None)],
+        )
+        conn.commit()
+        conn.close()
+        return path
+
+    def test_rows_are_split_by_bot(self, shared_db, tmp_path):
+        messages = []
+        migrate_shared_database(shared_db, messages.append)
+
+        assert sorted(os.listdir(tmp_path / "memory")) == ["a.db", "b.db"]
+        assert os.path.exists(f"{shared_db}.migrated")
+        assert not os.path.exists(shared_db)
+
+        conn = sqlite3.connect(str(tmp_path / "memory" / "a.db"))
+        try:
+            assert conn.execute("SELECT unique_key FROM messages").fetchall() == [("a_1",)]
+            assert conn.execute("SELECT chunk_id, content_text FROM chunks").fetchall() == [("a_chunk", None)]
+        finally:
+            conn.close()
+
+    def test_rows_without_bot_are_not_migrated(self, shared_db, tmp_path):
+        messages = []
+        migrate_shared_database(shared_db, messages.append)
+
+        # No shard named "None" is created, the rows stay in the renamed shared file
+        assert "None.db" not in os.listdir(tmp_path / "memory")
+        assert any("2 memory rows" in message and "have no bot ID" in message for message in messages)
+
+        conn = sqlite3.connect(f"{shared_db}.migrated")
+        try:
+            assert conn.execute("SELECT count(*) FROM messages WHERE bot_observer_id IS NULL").fetchone() == (1,)
+        finally:
+            conn.close()
+
+
+class FakeModel:
+    """Embedding model stand-in that maps every query to the origin."""
+
+    def encode(self, texts, batch_size=None):
+        return np.zeros((len(texts), 4))
+
+
+class TestSearchMemoryBatch:
+    """Test batch memory search results, field projection and pagination."""
+
+    @pytest.fixture
+    def db_path(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(memory_manager, "_load_embedding_model_once", lambda name: FakeModel())
+        shards = ShardCache(str(tmp_path), 1 << 20, initialize=lambda path: initialize_memory_database(path, lambda message: None))
+        monkeypatch.setattr(memory_manager, "_shards", shards)
+
+        path = str(tmp_path / "bot.db")
+        initialize_memory_database(path, lambda message: None)
+        conn = sqlite3.connect(path)
+        conn.executemany(
+            "INSERT INTO messages VALUES (?, ?, 'user', '2024-01-01', ?, 'bot', NULL)",
+            [(f"key{x}", str(x), f"message {x}") for x in range(5)],
+        )
+        # Chunk x is at distance x from the query vector, so results are ordered by chunk number
+        conn.executemany(
+            "INSERT INTO chunks VALUES (?, 'bot', '2024-01-01', NULL, ?, ?, 0, NULL, '2024-01-01', ?)",
+            [
+                (f"chunk{x}", np.array([x, 0, 0, 0], dtype="float32").tobytes(), json.dumps([f"key{x}"]), "attached text" if x == 0 else None)
+                for x in range(5)
+            ],
+        )
+        conn.commit()
+        conn.close()
+        return path
+
+    def search(self, db_path, **kwargs):
+        return asyncio.run(search_memory_batch(["first", "second"], "bot", top_k=2, db_path=db_path, **kwargs))
+
+    def test_pages_through_results(self, db_path):
+        pages, cursor = [], None
+        while True:
+            response = self.search(db_path, cursor=cursor, fields=["chunk_id"])
+            assert [entry["query"] for entry in response["results"]] == ["first", "second"]
+            pages.append([result["chunk_id"] for result in response["results"][0]["results"]])
+            assert response["results"][1]["results"] == response["results"][0]["results"]
+
+            cursor = response["next_cursor"]
+            if not cursor:
+                break
+
+        assert pages == [["chunk0", "chunk1"], ["chunk2", "chunk3"], ["chunk4"]]
+
+    def test_results_and_fields(self, db_path):
+        result = self.search(db_path)["results"][0]["results"][0]
+        assert result == {
+            "chunk_id": "chunk0",
+            "score": 1.0,
+            "content": "message 0\nattached text",
+            "summary": None,
+            "message_keys": ["key0"],
+            "timestamp": "2024-01-01",
+        }
+
+        result = self.search(db_path, fields=["chunk_id", "score"])["results"][0]["results"][1]
+        assert result == {"chunk_id": "chunk1", "score": 0.5}
+
+    def test_invalid_arguments(self, db_path):
+        with pytest.raises(ValueError, match="Unknown memory search fields"):
+            self.search(db_path, fields=["embedding_vector"])
+        with pytest.raises(ValueError, match="Invalid search cursor"):
+            self.search(db_path, cursor="not a cursor")
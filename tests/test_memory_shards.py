@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "discord"))
+
+from memory_shards import MemoryShard, ShardCache, shard_db_path
+
+
+DIMENSIONS = 4
+
+
+def create_shard(db_path, rows=2):
+    """Creates a shard database holding `rows` chunk vectors."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, embedding_vector BLOB)")
+    conn.executemany(
+        "INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+        [(f"chunk{x}", np.full(DIMENSIONS, x, dtype="float32").tobytes()) for x in range(rows)],
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestShardCache:
+    """Test the LRU of open memory shards."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        messages = []
+        # Each shard index holds 2 vectors of 4 floats (32 bytes), the budget fits two shards
+        cache = ShardCache(str(tmp_path), 64, initialize=create_shard, logger=messages.append)
+        cache.messages = messages
+        yield cache
+        cache.close()
+
+    def test_get_reuses_open_shard(self, cache):
+        shard = cache.get("a")
+        assert cache.get("a") is shard
+        assert shard.db_path == shard_db_path("a", cache.root)
+        assert shard.index.ntotal == 2
+
+    def test_evicts_least_recently_used(self, cache):
+        a = cache.get("a")
+        cache.get("b")
+        cache.get("a")
+        cache.get("c")
+
+        # "b" was used least recently, so it is flushed and closed
+        assert list(cache.shards) == [shard_db_path(x, cache.root) for x in ("a", "c")]
+        assert any("Evicted memory shard 'b'" in message for message in cache.messages)
+        assert os.path.exists(shard_db_path("b", cache.root).replace(".db", ".faiss"))
+        assert cache.get("a") is a
+
+    def test_keeps_single_shard_over_budget(self, tmp_path):
+        cache = ShardCache(str(tmp_path), 1, initialize=create_shard)
+        shard = cache.get("a")
+        assert list(cache.shards.values()) == [shard]
+        cache.close()
+
+    @pytest.fixture
+    def rebuilds(self, monkeypatch):
+        calls = []
+        rebuild = MemoryShard.rebuild
+
+        def counted(shard, *args, **kwargs):
+            calls.append(shard.tenant_id)
+            return rebuild(shard, *args, **kwargs)
+
+        monkeypatch.setattr(MemoryShard, "rebuild", counted)
+        return calls
+
+    def test_evicted_shard_reloads_flushed_index(self, cache, rebuilds):
+        a = cache.get("a")
+        cache.get("b")
+        cache.get("c")
+
+        # The index flushed on eviction is current, so it is loaded instead of rebuilt
+        shard = cache.get("a")
+        assert shard is not a
+        assert shard.index.ntotal == 2
+        assert rebuilds == ["a", "b", "c"]
+
+    def test_invalidate_forces_rebuild(self, cache, rebuilds):
+        cache.get("a")
+        cache.close()
+
+        index_path = shard_db_path("a", cache.root).replace(".db", ".faiss")
+        assert os.path.exists(index_path)
+
+        cache.invalidate(shard_db_path("a", cache.root))
+        assert not os.path.exists(index_path)
+        assert cache.get("a").index.ntotal == 2
+        assert rebuilds == ["a", "a"]